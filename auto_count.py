@@ -1,13 +1,30 @@
 import time
+import itertools
+import threading
 import urllib.parse
 from collections import deque
-from utils import Scraper
-from count import count_words_from_html, update_word_counts
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from utils import Scraper, article_url, get_html_from_url
+from fetcher import get_default_fetcher, FetchError
+from page_cache import normalize_cache_key, get_default_cache
+from bs4 import Tag
+from parsers import walk_content, get_default_parser
+from count import IGNORED_TAGS, WORD_COUNTS_FILE
+from count_store import open_count_store, load_json_counts, remove_count_store
+from checkpoint import CrawlCheckpoint, CheckpointError, reconcile_state
+from titles import canonical_title, title_from_href, dedupe_titles, RedirectMap
+from profiling import span, count_page, disable_profiling
+from shards import shard_of, write_shard, default_shard_path, shard_store_path
+from page_ledger import PageLedger, PageRecord, content_digest, count_delta
+from frontier import (SpillingFrontier, BestFirstFrontier, HashedTitleSet, make_title_set, DEFAULT_FRONTIER_MEMORY,
+                      DEFAULT_BLOOM_CAPACITY, DEFAULT_BLOOM_ERROR_RATE)
 
-def extract_wiki_links(soup):
+def extract_wiki_links(soup, exclude_tags=None):
     """
     Extracts wiki links from the main content area.
     Only includes links that point to other /wiki/ articles and are not special pages.
+    Links inside elements named in exclude_tags (e.g. tables) are skipped.
+    Titles are returned in canonical form (see titles.canonical_title), each once.
     """
     if not soup:
         return []
@@ -16,45 +33,439 @@ def extract_wiki_links(soup):
     if not content:
         return []
     
+    if exclude_tags:
+        anchors = (node for node in walk_content(content, exclude_tags)
+                   if isinstance(node, Tag) and node.name == 'a' and node.has_attr('href'))
+    else:
+        anchors = content.find_all('a', href=True)
+
+    # Keep only links to other articles, decoded and without anchors
+    titles = (title_from_href(a['href']) for a in anchors)
+    return dedupe_titles(title for title in titles if title)
+
+def parse_and_count(html, parser, with_links):
+    """
+    Parses one page and returns (word_counter, links, canonical_title).
+    Module-level so that it can run in a ProcessPoolExecutor worker.
+    """
+    scraper = Scraper("", "", html_content=html, parser=parser)
+    word_counter = scraper.count_words()
     links = []
-    for a in content.find_all('a', href=True):
-        href = a['href']
-        # Check if it's a wiki link
-        if href.startswith('/wiki/') and ':' not in href:
-            # Extract the phrase from the URL and decode it
-            phrase_quoted = href.replace('/wiki/', '')
-            phrase = urllib.parse.unquote(phrase_quoted).replace('_', ' ')
-            # Handle anchor links
-            phrase = phrase.split('#')[0]
-            if phrase and phrase not in links:
-                links.append(phrase)
-    
-    return links
+    if with_links:
+        # Skip links inside tables and scripts, like the text that was counted
+        links = scraper.get_links(exclude_tags=IGNORED_TAGS)
+    return word_counter, links, scraper.get_canonical_title()
+
+class RateLimiter:
+    """
+    Per-host request budget shared by all crawl workers.
+    Guarantees at least `min_interval` seconds between the starts of two
+    requests to the same host, no matter how many workers are running.
+    """
+    def __init__(self, min_interval):
+        self.min_interval = max(min_interval, 0.0)
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """Blocks until the caller may send the next request to `host`."""
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+class Crawler:
+    """
+    BFS crawl engine used by --auto-count-words.
+
+    Pages are fetched by a pool of `concurrency` workers, but results are
+    merged strictly in the order the pages left the queue. Because newly
+    found links always go to the tail of the queue, the set of visited pages
+    and the resulting word counts are identical to a one-page-at-a-time crawl.
+
+    Pages are keyed by canonical title. When a fetched page turns out to be
+    a redirect to an article that was already counted (its canonical link
+    points elsewhere), it is skipped, and the redirect is remembered in
+    the RedirectMap so later links resolve to the target directly.
+
+    With `workers` > 0 the threads only fetch pages and hand the HTML to a
+    pool of worker processes that parse it, count words and extract links,
+    so parsing scales with the number of cores. Each fetch thread waits for
+    the parse of its own page, so the crawl runs at least `workers` fetch
+    threads; the rate limiter still spaces the requests to one host.
+
+    With a checkpoint the crawl state is saved every few seconds, and an
+    interrupted crawl can be continued with crawl(..., resume=True).
+
+    Memory stays small on deep crawls: the queue keeps at most
+    `frontier_memory` titles in memory and spills the rest to disk
+    (see frontier.SpillingFrontier), and visited titles are kept as 64-bit
+    hashes (8 bytes per title, appended to the checkpoint's visited log) or,
+    with visited='bloom', in a fixed-size Bloom filter (which may skip a
+    small fraction of pages, see frontier.BloomTitleSet).
+    With `max_pages` no new pages are fetched once that many were fetched,
+    and with `time_budget` none after that many seconds.
+
+    With a `scorer` the crawl is best-first instead of BFS: the queue is a
+    frontier.BestFirstFrontier, and the next page is the queued title with the
+    highest scorer(title, depth, inlinks, position) (see frontier.LinkScorer).
+    Combined with a page or time budget this spends the requests on the most
+    linked-to articles instead of navigation boilerplate.
+
+    With `shard` = (K, N) the crawl is one of N nodes splitting the title
+    space by hash (shards.shard_of). Pages that still need their links
+    (depth < max_depth) are fetched by every node, so all nodes walk the same
+    graph, but words are counted only for pages whose canonical title belongs
+    to shard K; pages at max_depth are fetched only by their owner. A leaf
+    that redirects to a title owned by another node is therefore not counted
+    unless that node reaches the target directly (a shared redirect map
+    makes this rare).
+
+    With a `ledger` (page_ledger.PageLedger) the crawl is an incremental
+    recount. Every counted page is recorded with its content hash, HTTP
+    validators, word counts and links. On the next crawl a page is fetched
+    conditionally (If-None-Match / If-Modified-Since, or through the page
+    cache), and if its content did not change it is neither parsed nor
+    counted again; its links come from the ledger. A changed page adds only
+    the difference between its new and old counts to the store. Pages that
+    are no longer reached keep their counts. The crawl does not start
+    (page_ledger.LedgerError) if the stored counts are not the ones the ledger
+    recorded at its last commit, e.g. after a crash between the two.
+    """
+    def __init__(self, base_url, max_depth, wait_time=0.1, concurrency=1, fetcher=None, store=None,
+                 checkpoint=None, parser=None, workers=0, redirects=None, max_pages=None, visited='hashed',
+                 bloom_capacity=DEFAULT_BLOOM_CAPACITY, bloom_error_rate=DEFAULT_BLOOM_ERROR_RATE,
+                 frontier_memory=DEFAULT_FRONTIER_MEMORY, frontier_dir=None, scorer=None, time_budget=None,
+                 shard=None, ledger=None):
+        self.base_url = base_url
+        self.max_depth = max_depth
+        # A fetch thread blocks on its page's parse, so fewer threads than workers would leave workers idle
+        self.concurrency = max(concurrency, workers, 1)
+        self.host = urllib.parse.urlsplit(base_url).netloc
+        self.rate_limiter = RateLimiter(wait_time)
+        self.fetcher = fetcher or get_default_fetcher()
+        self.store = store or open_count_store(WORD_COUNTS_FILE)
+        self.checkpoint = checkpoint
+        # Resolved here, worker processes do not see set_default_parser calls
+        self.parser = parser or get_default_parser()
+        self.workers = workers
+        self.process_pool = None
+        self.redirects = redirects or RedirectMap()
+        self.max_pages = max_pages
+        self.visited_kind = visited
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.frontier_memory = frontier_memory
+        self.frontier_dir = frontier_dir
+        self.scorer = scorer
+        self.time_budget = time_budget
+        self._deadline = None
+        self.shard = shard
+        self.ledger = ledger
+        if self.checkpoint or self.ledger:
+            # Counts are flushed only together with a checkpoint or the ledger, see flush
+            self.store.flush_interval = None
+
+    def fetch_html(self, phrase):
+        """Fetches the page HTML (through the page cache, if one is configured)."""
+        url = article_url(self.base_url, phrase)
+        return get_html_from_url(url, self.fetcher, get_default_cache(), normalize_cache_key(phrase))
 
-def auto_count_bfs(base_url, start_phrase, max_depth, wait_time):
+    def process_page(self, phrase, depth):
+        """
+        Fetches a single page and returns (word_counter, links, canonical_title, record).
+        record is the page's new PageRecord with a ledger and None without one;
+        for a page unchanged since the last crawl word_counter is None and
+        record is the one already in the ledger.
+        Runs inside a worker thread.
+        """
+        self.rate_limiter.acquire(self.host)
+        with_links = depth < self.max_depth
+        if self.ledger is not None:
+            return self._process_page_incremental(phrase, with_links)
+        html = self.fetch_html(phrase)
+        if not html:
+            return None, [], None, None
+        return (*self.parse(html, with_links), None)
+
+    def _process_page_incremental(self, phrase, with_links):
+        previous = self.ledger.get(phrase)
+        # A leaf recorded without links cannot stand in for a page whose links are needed now
+        reusable = previous is not None and (previous.links is not None or not with_links)
+        etag = last_modified = None
+        if get_default_cache() is not None:
+            # The page cache revalidates its copy itself
+            html = self.fetch_html(phrase)
+        else:
+            headers = {}
+            if reusable and previous.etag:
+                headers['If-None-Match'] = previous.etag
+            if reusable and previous.last_modified:
+                headers['If-Modified-Since'] = previous.last_modified
+            try:
+                response = self.fetcher.fetch(article_url(self.base_url, phrase), headers=headers or None)
+            except FetchError:
+                return None, [], None, None
+            if response.status_code == 304 and headers:
+                return None, previous.links if with_links else [], phrase, previous
+            with span('decode'):
+                html = response.text
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if not html:
+            return None, [], None, None
+
+        digest = content_digest(html)
+        if reusable and digest == previous.digest:
+            return None, previous.links if with_links else [], phrase, previous
+        word_counter, links, canonical = self.parse(html, with_links)
+        return word_counter, links, canonical, PageRecord(digest, etag, last_modified, word_counter,
+                                                          links if with_links else None)
+
+    def parse(self, html, with_links):
+        """Parses and counts one page, in a worker process if there is a pool."""
+        if self.process_pool is not None:
+            # Parsing and counting run in another process, so they show up here as a single span
+            with span('parse+count'):
+                result = self.process_pool.submit(parse_and_count, html, self.parser, with_links).result()
+            count_page()
+            return result
+        return parse_and_count(html, self.parser, with_links)
+
+    def _initial_state(self, start_phrase, resume):
+        if resume:
+            state = self.checkpoint.load()
+            if state is None:
+                raise CheckpointError(f"no checkpoint found at {self.checkpoint.path}")
+            state = reconcile_state(state, self.store.total())
+            self.max_depth = state['max_depth']
+            # Pages logged after the last successful flush are not counted
+            self.checkpoint.truncate_pages(state['pages_size'])
+            return state
+
+        start_phrase = self.redirects.resolve(canonical_title(start_phrase))
+        return {
+            'start_phrase': start_phrase,
+            'max_depth': self.max_depth,
+            'queue': [[start_phrase, 0]],
+            'visited': [start_phrase],
+            'pages_size': 0,
+        }
+
+    def save_checkpoint(self, state, queue, visited, in_flight, unflushed):
+        """
+        Logs the pages completed since the last checkpoint, writes the checkpoint
+        and then flushes the count store.
+        Pages still in flight go back to the head of the saved queue.
+        """
+        previous_total = self.store.flushed_total
+        state['previous_pages_size'] = state['pages_size']
+        if unflushed:
+            state['pages_size'] = self.checkpoint.append_pages(unflushed)
+        state['queue'] = itertools.chain(((phrase, depth) for _, phrase, depth in in_flight), queue)
+        if isinstance(visited, HashedTitleSet):
+            # Only the keys visited since the last checkpoint are appended to the log
+            state['visited'] = {'kind': 'hashed', 'log_size': self.checkpoint.append_visited(visited.take_new_keys())}
+        else:
+            state['visited'] = visited.to_state()
+        state['unflushed'] = [entry[:2] for entry in unflushed]
+        state['previous_total'] = previous_total
+        state['total'] = self.store.total()
+        self.checkpoint.save(state)
+        self.flush()
+
+    def flush(self):
+        """Flushes the count store and then commits the pages it now includes to the ledger."""
+        self.store.flush()
+        if self.ledger is not None:
+            self.ledger.commit(self.store)
+
+    def _make_visited(self, saved):
+        """
+        Builds the visited set from the checkpoint state. With a checkpoint, a hashed
+        set is backed by the checkpoint's append-only visited log.
+        """
+        if isinstance(saved, dict) and 'log_size' in saved:
+            # Keys logged after the last checkpoint was written are dropped
+            self.checkpoint.truncate_visited(saved['log_size'])
+            visited = HashedTitleSet.from_bytes(self.checkpoint.read_visited())
+        else:
+            visited = make_title_set(self.visited_kind, self.bloom_capacity, self.bloom_error_rate, saved)
+            if not self.checkpoint or not isinstance(visited, HashedTitleSet):
+                return visited
+            self.checkpoint.truncate_visited(0)
+            self.checkpoint.append_visited(visited.to_bytes())
+        visited.track_new_keys()
+        return visited
+
+    def crawl(self, start_phrase, resume=False):
+        if self.ledger is not None:
+            self.ledger.verify(self.store)
+        state = self._initial_state(start_phrase, resume)
+        queue = self._make_frontier(state['queue'])
+        state['queue'] = []
+        visited = self._make_visited(state['visited'])
+        state['visited'] = None
+        # Titles whose content is already counted, including redirect targets
+        done = make_title_set(self.visited_kind, self.bloom_capacity, self.bloom_error_rate)
+        fetched = 0
+        if resume:
+            for phrase, _, _, canonical in self.checkpoint.iter_pages():
+                done.add(phrase)
+                done.add(canonical)
+                fetched += 1
+            print(f"Wznawianie crawla od: {state['start_phrase']} ({fetched} stron już policzonych)")
+        elif self.checkpoint:
+            self.checkpoint.truncate_pages(0)
+        if self.time_budget is not None:
+            self._deadline = time.monotonic() + self.time_budget
+        in_flight = deque()
+        unflushed = []
+        completed = False
+
+        if self.workers > 0:
+            self.process_pool = ProcessPoolExecutor(max_workers=self.workers, initializer=disable_profiling)
+            # Start the worker processes before any fetch thread exists
+            self.process_pool.submit(int).result()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                while (queue and not self._budget_exhausted(fetched)) or in_flight:
+                    # Keep the pool full with pages from the head of the queue
+                    while queue and len(in_flight) < self.concurrency and not self._budget_exhausted(fetched):
+                        phrase, depth = queue.popleft()
+                        if phrase in done:
+                            continue
+                        if depth >= self.max_depth and not self.owns(phrase):
+                            # Leaf page of another shard: its links are not needed here
+                            continue
+                        print(f"Przetwarzanie: {phrase}")
+                        future = executor.submit(self.process_page, phrase, depth)
+                        in_flight.append((future, phrase, depth))
+                        fetched += 1
+                    if not in_flight:
+                        continue
+
+                    future, phrase, depth = in_flight[0]
+                    word_counter, links, canonical, record = future.result()
+                    in_flight.popleft()
+
+                    canonical = canonical or phrase
+                    self.redirects.add(phrase, canonical)
+                    if phrase in done or canonical in done:
+                        # Same article as one already counted, reached through a redirect
+                        word_counter, links = None, []
+                    elif not self.owns(canonical):
+                        word_counter = None
+                    done.add(phrase)
+                    done.add(canonical)
+                    visited.add(canonical)
+
+                    if word_counter is not None and record is not None:
+                        # Only the difference to the counts from the last crawl goes to the store
+                        previous = self.ledger.get(canonical)
+                        self.ledger.put(canonical, record)
+                        if previous is not None:
+                            word_counter = count_delta(previous.counts, word_counter)
+                    if word_counter:
+                        self.store.merge(word_counter)
+                    if self.checkpoint:
+                        unflushed.append([phrase, depth, sum(word_counter.values()) if word_counter else 0, canonical])
+
+                    for number, link in enumerate(links):
+                        link = self.redirects.resolve(link)
+                        position = number / len(links)
+                        if link not in visited:
+                            visited.add(link)
+                            queue.push(link, depth + 1, position)
+                        else:
+                            queue.relink(link, position)
+
+                    if self.checkpoint and self.checkpoint.due():
+                        self.save_checkpoint(state, queue, visited, in_flight, unflushed)
+                        unflushed = []
+                    elif not self.checkpoint and self.ledger is not None and self.ledger.due():
+                        self.flush()
+            if queue:
+                print(f"Wyczerpano budżet crawla ({fetched} stron), pominięto {len(queue)} stron z kolejki")
+            completed = True
+        finally:
+            if self.checkpoint and not completed:
+                self.save_checkpoint(state, queue, visited, in_flight, unflushed)
+            if self.process_pool is not None:
+                self.process_pool.shutdown()
+                self.process_pool = None
+            queue.close()
+            self.redirects.save()
+            self.store.close()
+            if self.ledger is not None:
+                self.ledger.commit(self.store)
+                self.ledger.close()
+            if self.checkpoint and completed:
+                self.checkpoint.remove()
+
+    def owns(self, title):
+        """Whether words of this title are counted by this node (always true without sharding)."""
+        return self.shard is None or shard_of(title, self.shard[1]) == self.shard[0]
+
+    def _make_frontier(self, items):
+        if self.scorer is not None:
+            return BestFirstFrontier(items, self.scorer)
+        return SpillingFrontier(items, self.frontier_memory, self.frontier_dir)
+
+    def _budget_exhausted(self, fetched):
+        """Whether the page (max_pages) or time (time_budget) budget is used up."""
+        if self.max_pages is not None and fetched >= self.max_pages:
+            return True
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+def auto_count_bfs(base_url, start_phrase, max_depth, wait_time, concurrency=1, fetcher=None,
+                   count_store='json', flush_interval=5.0, checkpoint_path=None, resume=False, workers=0,
+                   redirect_map_path=None, max_pages=None, visited='hashed', bloom_capacity=DEFAULT_BLOOM_CAPACITY,
+                   bloom_error_rate=DEFAULT_BLOOM_ERROR_RATE, frontier_memory=DEFAULT_FRONTIER_MEMORY,
+                   frontier_dir=None, scorer=None, time_budget=None, shard=None, shard_output=None,
+                   ledger_path=None):
     """
     Performs a BFS crawl starting from start_phrase up to max_depth.
+    Word counts are batched in a count store and flushed every flush_interval
+    seconds and when the crawl ends (also when it is interrupted).
+    With checkpoint_path the crawl state is saved at every flush and can be
+    continued later with resume=True. With workers > 0 parsing and counting
+    run in that many worker processes. Redirects learned during the crawl
+    are kept in redirect_map_path (if given) and reused by later crawls.
+    max_pages caps the number of fetched pages; visited, bloom_*, and
+    frontier_* bound the crawl's memory (see Crawler). With a scorer the
+    crawl is best-first, and time_budget stops it after that many seconds.
+    With shard=(K, N) only this node's part of the title space is counted, and
+    the counts are also written as a sorted shard file (shard_output, by default
+    word-counts.shard-K-of-N.tsv) for merging with shards.merge_shards. A sharded
+    crawl counts into its own store (word-counts.shard-K-of-N.json), which starts
+    empty unless the crawl is resumed or incremental, so the shard holds only
+    this crawl's counts and not those accumulated in word-counts.json.
+    With ledger_path the crawl recounts incrementally: pages unchanged since
+    the crawl that wrote the ledger are skipped, changed ones contribute only
+    the difference (see Crawler).
     """
-    queue = deque([(start_phrase, 0)])
-    visited = {start_phrase}
-    
-    while queue:
-        current_phrase, current_depth = queue.popleft()
-        print(f"Przetwarzanie: {current_phrase}")
-        
-        scraper = Scraper(base_url, current_phrase)
-        
-        if scraper.soup:
-            word_counter = count_words_from_html(scraper.soup)
-            if word_counter:
-                update_word_counts(word_counter)
-        
-        if current_depth < max_depth and scraper.soup:
-            new_links = extract_wiki_links(scraper.soup)
-            for link in new_links:
-                if link not in visited:
-                    visited.add(link)
-                    queue.append((link, current_depth + 1))
-        
-        if queue and wait_time > 0:
-            time.sleep(wait_time)
\ No newline at end of file
+    json_path = WORD_COUNTS_FILE
+    if shard is not None:
+        json_path = shard_store_path(shard)
+        if not resume and not ledger_path:
+            remove_count_store(json_path)
+    store = open_count_store(json_path, count_store, flush_interval)
+    checkpoint = CrawlCheckpoint(checkpoint_path, flush_interval) if checkpoint_path else None
+    ledger = PageLedger(ledger_path, flush_interval) if ledger_path else None
+    crawler = Crawler(base_url, max_depth, wait_time, concurrency, fetcher, store, checkpoint, workers=workers,
+                      redirects=RedirectMap(redirect_map_path), max_pages=max_pages, visited=visited,
+                      bloom_capacity=bloom_capacity, bloom_error_rate=bloom_error_rate,
+                      frontier_memory=frontier_memory, frontier_dir=frontier_dir, scorer=scorer,
+                      time_budget=time_budget, shard=shard, ledger=ledger)
+    crawler.crawl(start_phrase, resume)
+    if shard is not None:
+        path = shard_output or default_shard_path(shard)
+        # The store is closed by now; both backends have exported their JSON file
+        write_shard(path, load_json_counts(store.json_path), shard)
+        print(f"Zapisano shard {shard[0]}/{shard[1]}: {path}")
@@ -0,0 +1,97 @@
+import sys
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils import Scraper, write_dataframe_csv
+
+DEFAULT_BATCH_CONCURRENCY = 8
+
+def read_phrases(source):
+    """
+    Generator fraz (po jednej w linii) z pliku albo ze standardowego wejścia ('-').
+    Linie są czytane na bieżąco, więc długie listy nie trafiają w całości do pamięci.
+    Puste linie są pomijane.
+    """
+    if source == '-':
+        yield from _stripped_lines(sys.stdin)
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            yield from _stripped_lines(f)
+
+def _stripped_lines(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+def summary_record(base_url, phrase):
+    """Pobiera podsumowanie jednej frazy i zwraca rekord wyniku albo błędu."""
+    scraper = Scraper(base_url, phrase)
+    if not scraper.soup:
+        return {'phrase': phrase, 'error': "Could not load page."}
+    summary = scraper.get_summary()
+    if summary.startswith("Error: "):
+        return {'phrase': phrase, 'error': summary[len("Error: "):]}
+    return {'phrase': phrase, 'summary': summary}
+
+def table_record(base_url, phrase, table_number, first_row_is_header):
+    """Zapisuje tabelę jednej frazy do CSV i zwraca rekord wyniku albo błędu."""
+    scraper = Scraper(base_url, phrase)
+    if not scraper.soup:
+        return {'phrase': phrase, 'error': "Could not load page."}
+    tables = scraper.get_tables()
+    if not 1 <= table_number <= len(tables):
+        return {'phrase': phrase, 'error': f"Table {table_number} not found (page has {len(tables)} tables)."}
+    try:
+        df = scraper.get_table(table_number, first_row_is_header)
+    except ValueError as e:
+        return {'phrase': phrase, 'error': f"Could not read table {table_number}: {e}"}
+    filename = write_dataframe_csv(df, phrase)
+    return {'phrase': phrase, 'table': table_number, 'file': filename, 'rows': len(df)}
+
+def run_batch(phrases, task, out=None, concurrency=DEFAULT_BATCH_CONCURRENCY):
+    """
+    Wykonuje `task(phrase)` dla wszystkich fraz w `concurrency` wątkach
+    (ze współdzielonym Fetcherem) i wypisuje rekordy jako JSON Lines
+    w kolejności wejścia. Naraz przetwarzanych jest najwyżej 2 * concurrency
+    fraz, więc pamięć nie rośnie z długością listy.
+
+    Returns:
+        int: Liczba fraz zakończonych błędem
+    """
+    out = out or sys.stdout
+    errors = 0
+    phrases = iter(phrases)
+    in_flight = deque()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            while len(in_flight) < 2 * concurrency:
+                phrase = next(phrases, None)
+                if phrase is None:
+                    break
+                in_flight.append((phrase, executor.submit(task, phrase)))
+            if not in_flight:
+                break
+
+            phrase, future = in_flight.popleft()
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {'phrase': phrase, 'error': f"{type(e).__name__}: {e}"}
+            if 'error' in record:
+                errors += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+    return errors
+
+def batch_summaries(base_url, phrases, out=None, concurrency=DEFAULT_BATCH_CONCURRENCY):
+    """Podsumowania wielu fraz jako JSON Lines."""
+    return run_batch(phrases, lambda phrase: summary_record(base_url, phrase), out, concurrency)
+
+def batch_tables(base_url, phrases, table_number, first_row_is_header, out=None,
+                 concurrency=DEFAULT_BATCH_CONCURRENCY):
+    """Tabele wielu fraz, każda do osobnego pliku CSV; rekordy statusu jako JSON Lines."""
+    task = lambda phrase: table_record(base_url, phrase, table_number, first_row_is_header)
+    return run_batch(phrases, task, out, concurrency)
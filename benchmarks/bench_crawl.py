@@ -0,0 +1,60 @@
+"""
+Benchmark crawla --auto-count-words na lokalnym zamienniku Bulbapedii.
+
+Uruchomienie (z katalogu repozytorium):
+    python -m benchmarks.bench_crawl --start "Tao trio" --depth 1 --latency 0.05 --concurrency 1 8
+"""
+import argparse
+import json
+import os
+import time
+from benchmarks.stand_in_server import run_stand_in_server
+from auto_count import auto_count_bfs
+from count import WORD_COUNTS_FILE
+
+TEST_DIR = "test"
+
+def run_crawl(base_url, start, depth, wait, concurrency, workers=0):
+    """Uruchamia crawl i zwraca (czas w sekundach, wynikowe liczniki słów)."""
+    if os.path.exists(WORD_COUNTS_FILE):
+        os.remove(WORD_COUNTS_FILE)
+
+    started = time.perf_counter()
+    auto_count_bfs(base_url, start, depth, wait, concurrency, workers=workers)
+    elapsed = time.perf_counter() - started
+
+    counts = {}
+    if os.path.exists(WORD_COUNTS_FILE):
+        with open(WORD_COUNTS_FILE, 'r', encoding='utf-8') as f:
+            counts = json.load(f)
+        os.remove(WORD_COUNTS_FILE)
+    return elapsed, counts
+
+def main():
+    parser = argparse.ArgumentParser(description="BFS crawl benchmark")
+    parser.add_argument("--start", default="Tao trio", help="Start phrase (must exist in test/)")
+    parser.add_argument("--depth", type=int, default=1, help="Maximum depth for BFS crawl")
+    parser.add_argument("--wait", type=float, default=0.0, help="Minimum interval between requests")
+    parser.add_argument("--latency", type=float, default=0.05, help="Artificial server latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels to compare")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes for parsing (0 = parse in fetch threads)")
+    args = parser.parse_args()
+
+    if os.path.exists(WORD_COUNTS_FILE):
+        print(f"Error: {WORD_COUNTS_FILE} exists in the current directory, move it away first.")
+        return
+
+    results = []
+    with run_stand_in_server(TEST_DIR, latency=args.latency) as base_url:
+        for concurrency in args.concurrency:
+            elapsed, counts = run_crawl(base_url, args.start, args.depth, args.wait, concurrency, args.workers)
+            results.append((concurrency, elapsed, counts))
+
+    reference = results[0][2]
+    print(f"\n{'concurrency':>12} {'seconds':>10} {'speedup':>8} {'identical':>10}")
+    for concurrency, elapsed, counts in results:
+        speedup = results[0][1] / elapsed if elapsed else float('inf')
+        print(f"{concurrency:>12} {elapsed:>10.2f} {speedup:>8.2f} {str(counts == reference):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark rozpoznawania języka na plikach analysis/*.json.
+
+Porównuje dawny sposób (dla każdego języka budowa słownika top-k i osobne
+wywołanie lang_confidence_score) z LanguageDetector: budowa macierzy,
+wczytanie jej z cache na dysku i ocena wszystkich języków naraz.
+Sprawdza też, czy wyniki są identyczne.
+
+Uruchomienie (z katalogu repozytorium):
+    python -m benchmarks.bench_language --k 10 100 1000
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+import wordfreq
+from wordfreq import top_n_list, word_frequency, get_language_info
+from language_score import lang_confidence_score, LanguageDetector, available_detection_languages
+
+ANALYSIS_GLOB = os.path.join("analysis", "*.json")
+SCORE_REPEAT = 5
+
+def clear_wordfreq_caches():
+    """Czyści cache list słów wordfreq, żeby każdy pomiar startował na zimno."""
+    for function in (wordfreq.get_frequency_list, wordfreq.get_frequency_dict, wordfreq.top_n_list):
+        function.cache_clear()
+    wordfreq._wf_cache.clear()
+
+def score_per_language(text_counts, languages, k):
+    """Dawna metoda z notatnika: słownik top-k osobno dla każdego języka."""
+    results = {}
+    for lang in languages:
+        lang_dict = {w: word_frequency(w, lang) for w in top_n_list(lang, k)}
+        for name, counts in text_counts.items():
+            results[(lang, name)] = lang_confidence_score(counts, lang_dict)
+    return results
+
+def score_detector(detector, text_counts):
+    results = {}
+    for name, counts in text_counts.items():
+        for lang, score in detector.scores(counts).items():
+            results[(lang, name)] = score
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Language detection benchmark")
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 100, 1000], help="Top-k sizes to test")
+    parser.add_argument("--languages", help="Comma-separated language codes (default: all wordfreq languages with the regex tokenizer)")
+    args = parser.parse_args()
+
+    if args.languages:
+        languages = args.languages.split(",")
+    else:
+        # word_frequency dla ja/ko/zh wymaga MeCab/jieba, których dawna metoda nie ominie
+        languages = [lang for lang in available_detection_languages()
+                     if get_language_info(lang)['tokenizer'] == 'regex']
+    text_counts = {}
+    for path in sorted(glob.glob(ANALYSIS_GLOB)):
+        with open(path, 'r', encoding='utf-8') as f:
+            text_counts[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+
+    cache_dir = tempfile.mkdtemp(prefix="wiki-languages-")
+    try:
+        print(f"{len(languages)} languages, {len(text_counts)} texts")
+        print(f"{'k':>6} {'per-language s':>15} {'build s':>9} {'cached s':>9} {'score ms':>9} {'identical':>10}")
+        for k in args.k:
+            clear_wordfreq_caches()
+            started = time.perf_counter()
+            reference = score_per_language(text_counts, languages, k)
+            old_seconds = time.perf_counter() - started
+
+            clear_wordfreq_caches()
+            started = time.perf_counter()
+            LanguageDetector(languages, k, cache_dir=cache_dir)
+            build_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            detector = LanguageDetector(languages, k, cache_dir=cache_dir)
+            cached_seconds = time.perf_counter() - started
+
+            results = score_detector(detector, text_counts)
+            score_ms = float('inf')
+            for _ in range(SCORE_REPEAT):
+                started = time.perf_counter()
+                score_detector(detector, text_counts)
+                score_ms = min(score_ms, (time.perf_counter() - started) * 1000)
+
+            print(f"{k:>6} {old_seconds:>15.2f} {build_seconds:>9.2f} {cached_seconds:>9.3f} {score_ms:>9.1f} "
+                  f"{str(results == reference):>10}")
+
+        print("\nDetected languages (largest k):")
+        for name, counts in text_counts.items():
+            ranked = detector.detect(counts, 3)
+            print(f"  {name:<20} " + ", ".join(f"{lang} {score:.1f}" for lang, score in ranked))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Porównanie backendów parsera HTML na stronach z katalogu test/.
+Mierzy czas parsowania i sprawdza, czy podsumowanie, tabele, liczniki
+słów i linki są identyczne jak z 'html.parser'.
+
+Uruchomienie (z katalogu repozytorium):
+    python -m benchmarks.bench_parsers --repeat 5
+"""
+import argparse
+import os
+import statistics
+import time
+from parsers import available_parsers, DEFAULT_PARSER
+from utils import Scraper
+from count import IGNORED_TAGS
+
+TEST_DIR = "test"
+FIXTURES = ["Lugia.html", "Tao trio.html"]
+BASE_URL = "https://bulbapedia.bulbagarden.net/wiki/"
+
+def extract_outputs(scraper):
+    """Wszystkie wyniki, które program wyciąga z jednej sparsowanej strony."""
+    tables = [scraper.get_table(i + 1, first_row_is_header=False).values.tolist()
+              for i in range(len(scraper.get_tables()))]
+    return {
+        'summary': scraper.get_summary(),
+        'tables': tables,
+        'word_counts': scraper.count_words(),
+        'links': scraper.get_links(),
+        'crawl_links': scraper.get_links(exclude_tags=IGNORED_TAGS),
+    }
+
+def bench_fixture(html, parser, repeat):
+    """Zwraca (medianę czasu parsowania w ms, czas ekstrakcji w ms, wyniki)."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        scraper = Scraper(BASE_URL, "", html_content=html, parser=parser)
+        timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    outputs = extract_outputs(scraper)
+    extract_ms = (time.perf_counter() - started) * 1000
+    return statistics.median(timings) * 1000, extract_ms, outputs
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML parser backend benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Parses per fixture and backend")
+    args = parser.parse_args()
+
+    backends = available_parsers()
+    print(f"{'fixture':<16} {'parser':<12} {'parse ms':>10} {'extract ms':>11} {'identical':>10}")
+    for fixture in FIXTURES:
+        with open(os.path.join(TEST_DIR, fixture), 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        reference = None
+        for backend in [DEFAULT_PARSER] + [b for b in backends if b != DEFAULT_PARSER]:
+            parse_ms, extract_ms, outputs = bench_fixture(html, backend, args.repeat)
+            if reference is None:
+                reference = outputs
+            differing = [name for name in outputs if outputs[name] != reference[name]]
+            identical = "yes" if not differing else "no: " + ", ".join(differing)
+            print(f"{fixture:<16} {backend:<12} {parse_ms:>10.1f} {extract_ms:>11.1f} {identical:>10}")
+
+if __name__ == "__main__":
+    main()
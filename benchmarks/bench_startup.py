@@ -0,0 +1,173 @@
+"""
+Benchmark czasu startu CLI (zimny start) dla poszczególnych podkomend.
+
+Każda komenda jest uruchamiana jako osobny proces `python -X importtime
+wiki_scraper.py ...` w katalogu tymczasowym, z cache stron zasianym plikami
+z test/ (--offline, bez sieci). Mierzymy łączny czas importów, czas całego
+procesu i to, które ciężkie moduły zostały załadowane.
+
+Wyniki są porównywane z benchmarks/startup_baseline.json: komenda nie może
+załadować modułów z listy `forbidden`, a czas importów nie może przekroczyć
+zapisanego budżetu o więcej niż --tolerance. Przy regresji kod wyjścia to 1.
+
+Uruchomienie (z katalogu repozytorium):
+    python -m benchmarks.bench_startup --repeat 3
+    python -m benchmarks.bench_startup --update-baseline
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from page_cache import PageCache, normalize_cache_key
+from utils import article_url
+from wiki_scraper import BULBAPEDIA_URL
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = os.path.join(REPO_DIR, "test")
+BASELINE_FILE = os.path.join(REPO_DIR, "benchmarks", "startup_baseline.json")
+FIXTURES = {"Tao trio": "Tao trio.html", "Lugia": "Lugia.html"}
+
+HEAVY_MODULES = ["pandas", "numpy", "requests", "bs4", "lxml", "matplotlib", "wordfreq"]
+
+# Kolejność ma znaczenie: --count-words tworzy word-counts.json dla analizy częstotliwości.
+COMMANDS = [
+    ("help", ["--help"]),
+    ("summary", ["--summary", "Tao trio"]),
+    ("table", ["--table", "Tao trio", "--number", "5"]),
+    ("count-words", ["--count-words", "Tao trio"]),
+    ("relative", ["--analyze-relative-word-frequency", "--mode", "article", "--count", "5"]),
+    ("relative-chart", ["--analyze-relative-word-frequency", "--mode", "article", "--count", "5",
+                        "--chart", "chart.png"]),
+]
+OFFLINE_ARGS = ["--cache-dir", "cache", "--offline"]
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+def seed_cache(directory):
+    """Zapisuje strony z test/ do cache, żeby komendy działały offline."""
+    cache = PageCache(directory)
+    for phrase, filename in FIXTURES.items():
+        with open(os.path.join(TEST_DIR, filename), 'r', encoding='utf-8') as f:
+            cache.store(normalize_cache_key(phrase), article_url(BULBAPEDIA_URL, phrase), f.read())
+
+def parse_importtime(stderr):
+    """Zwraca (łączny czas importów w ms, zbiór załadowanych modułów najwyższego poziomu)."""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            total_us += int(match.group(1))
+            modules.add(match.group(4).split('.')[0])
+    return total_us / 1000, modules
+
+def run_command(args, cwd):
+    """Uruchamia jedną komendę CLI; zwraca (czas procesu w ms, czas importów w ms, moduły)."""
+    argv = list(args) if args == ["--help"] else list(args) + OFFLINE_ARGS
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, MPLBACKEND="Agg")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(REPO_DIR, "wiki_scraper.py")] + argv,
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} exited with {result.returncode}:\n{result.stdout[-2000:]}")
+    import_ms, modules = parse_importtime(result.stderr)
+    return wall_ms, import_ms, modules
+
+def measure(repeat):
+    """Zwraca {komenda: {'wall_ms', 'import_ms', 'heavy_modules'}} (mediany z `repeat` przebiegów)."""
+    samples = {name: [] for name, _ in COMMANDS}
+    loaded = {name: set() for name, _ in COMMANDS}
+    workdir = tempfile.mkdtemp(prefix="wiki-startup-")
+    try:
+        seed_cache(os.path.join(workdir, "cache"))
+        for _ in range(repeat):
+            for name, args in COMMANDS:
+                wall_ms, import_ms, modules = run_command(args, workdir)
+                samples[name].append((wall_ms, import_ms))
+                loaded[name] |= modules
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        name: {
+            'wall_ms': round(statistics.median(s[0] for s in samples[name]), 1),
+            'import_ms': round(statistics.median(s[1] for s in samples[name]), 1),
+            'heavy_modules': sorted(m for m in HEAVY_MODULES if m in loaded[name]),
+        }
+        for name, _ in COMMANDS
+    }
+
+def check_regressions(results, baseline, tolerance, slack_ms):
+    """Zwraca listę opisów regresji względem baseline (pusta = OK)."""
+    problems = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        unexpected = sorted(set(result['heavy_modules']) & set(expected.get('forbidden', [])))
+        if unexpected:
+            problems.append(f"{name}: imports {', '.join(unexpected)}")
+        budget = expected['import_ms'] * (1 + tolerance) + slack_ms
+        if result['import_ms'] > budget:
+            problems.append(f"{name}: imports took {result['import_ms']:.1f} ms (budget {budget:.1f} ms)")
+    return problems
+
+def update_baseline(results, baseline):
+    """Zapisuje nowe budżety czasu, zachowując listy zakazanych modułów."""
+    for name, result in results.items():
+        entry = baseline.setdefault(name, {'forbidden': []})
+        entry['import_ms'] = result['import_ms']
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=4)
+        f.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI cold-start benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per command (the median is reported)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative import time growth over the baseline")
+    parser.add_argument("--slack-ms", type=float, default=20.0, help="Allowed absolute import time growth in ms")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the measured import times as the new baseline")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = measure(args.repeat)
+
+    print(f"{'command':<16} {'wall ms':>9} {'import ms':>10} {'budget ms':>10}  heavy modules")
+    for name, result in results.items():
+        budget = baseline.get(name, {}).get('import_ms')
+        budget_text = f"{budget:.1f}" if budget is not None else "-"
+        print(f"{name:<16} {result['wall_ms']:>9.1f} {result['import_ms']:>10.1f} {budget_text:>10}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+
+    if args.update_baseline:
+        update_baseline(results, baseline)
+        print(f"Baseline written to {BASELINE_FILE}")
+        return
+
+    problems = check_regressions(results, baseline, args.tolerance, args.slack_ms)
+    if problems:
+        print("\nStartup regressions:", file=sys.stderr)
+        for problem in problems:
+            print(f"  {problem}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
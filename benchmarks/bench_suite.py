@@ -0,0 +1,229 @@
+"""
+Zestaw benchmarków offline na syntetycznym grafie stron (benchmarks.synthetic_wiki).
+
+Uruchamia lokalny serwer z grafem o zadanej liczbie stron, liczbie linków na
+stronę (fan-out) i opóźnieniu odpowiedzi, a następnie scenariusze:
+summary, table, count-words, bfs-1..bfs-3 (crawl do głębokości 1-3)
+i relative-frequency. Każdy scenariusz działa w osobnym procesie, więc
+szczytowe RSS dotyczy tylko jego (serwer działa w procesie nadrzędnym).
+
+Wynik (przepustowość, percentyle opóźnień, szczytowe RSS) trafia do pliku JSON,
+który można porównać z wynikiem z innego commita przez --compare.
+
+Uruchomienie (z katalogu repozytorium):
+    python -m benchmarks.bench_suite --pages 500 --fanout 8 --latency 0.01 --output bench.json
+    python -m benchmarks.bench_suite --output after.json --compare bench.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.stand_in_server import run_stand_in_server
+from benchmarks.synthetic_wiki import SyntheticWiki
+from profiling import percentile
+
+SUITE_VERSION = 1
+SCENARIOS = ('summary', 'table', 'count-words', 'bfs-1', 'bfs-2', 'bfs-3', 'relative-frequency')
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def peak_rss_mb():
+    """Szczytowe RSS bieżącego procesu w MB (None, gdy system tego nie udostępnia)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux podaje kilobajty, macOS bajty
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def timed_ops(titles, operation):
+    """Wykonuje operation(title) dla każdego tytułu; zwraca listę czasów w sekundach."""
+    latencies = []
+    for title in titles:
+        started = time.perf_counter()
+        operation(title)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def run_scenario(name, base_url, wiki, args):
+    """
+    Wykonuje scenariusz w bieżącym procesie i zwraca (liczba jednostek, nazwa jednostki,
+    czasy pojedynczych operacji w sekundach, czas całkowity w sekundach).
+    Import modułów programu nie wlicza się do czasu całkowitego.
+    """
+    titles = [wiki.title(i % wiki.pages) for i in range(args.ops)]
+
+    if name == 'summary':
+        from utils import Scraper
+        started = time.perf_counter()
+        latencies = timed_ops(titles, lambda title: Scraper(base_url, title).get_summary())
+        units, unit = len(titles), 'pages'
+    elif name == 'table':
+        from utils import Scraper
+        started = time.perf_counter()
+        latencies = timed_ops(titles, lambda title: Scraper(base_url, title).get_table_frames(typed=True))
+        units, unit = len(titles), 'pages'
+    elif name == 'count-words':
+        from count import count_words_for_phrase
+        started = time.perf_counter()
+        latencies = timed_ops(titles, lambda title: count_words_for_phrase(base_url, title))
+        units, unit = len(titles), 'pages'
+    elif name.startswith('bfs-'):
+        # Opóźnienie pojedynczej strony = czas etapu 'fetch' z profilera
+        from auto_count import auto_count_bfs
+        from profiling import enable_profiling
+        started = time.perf_counter()
+        profiler = enable_profiling()
+        auto_count_bfs(base_url, wiki.start_title(), int(name[len('bfs-'):]), 0.0, args.concurrency)
+        latencies = profiler.samples('fetch')
+        units, unit = profiler.pages, 'pages'
+    elif name == 'relative-frequency':
+        from count import WORD_COUNTS_FILE
+        from word_frequency import analyze_relative_frequency
+        # Liczniki o rozkładzie Zipfa dla słownika grafu
+        counts = {word: max(1_000_000 // (rank + 1), 1) for rank, word in enumerate(wiki.vocabulary)}
+        with open(WORD_COUNTS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(counts, f)
+        started = time.perf_counter()
+
+        def both_modes(_):
+            analyze_relative_frequency('article', args.count)
+            analyze_relative_frequency('language', args.count)
+
+        latencies = timed_ops(titles[:max(args.ops // 10, 1)], both_modes)
+        units, unit = len(latencies), 'runs'
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+
+    return units, unit, latencies, time.perf_counter() - started
+
+def child_main(args):
+    """Proces potomny: jeden scenariusz, wynik jako JSON na standardowe wyjście."""
+    wiki = SyntheticWiki(args.pages, args.fanout, args.words, args.vocabulary, args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        units, unit, latencies, elapsed = run_scenario(args.child, args.base_url, wiki, args)
+    latencies = sorted(latencies)
+    result = {
+        'units': units,
+        'unit': unit,
+        'elapsed_s': elapsed,
+        'throughput_per_s': units / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'count': len(latencies),
+            'mean': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+        },
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    print(json.dumps(result))
+
+def run_child(name, base_url, args):
+    """Uruchamia scenariusz w osobnym procesie (w pustym katalogu roboczym)."""
+    command = [
+        sys.executable, '-m', 'benchmarks.bench_suite', '--child', name, '--base-url', base_url,
+        '--pages', str(args.pages), '--fanout', str(args.fanout), '--words', str(args.words),
+        '--vocabulary', str(args.vocabulary), '--seed', str(args.seed), '--ops', str(args.ops),
+        '--concurrency', str(args.concurrency), '--count', str(args.count),
+    ]
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_DIR, env.get('PYTHONPATH')]))
+    with tempfile.TemporaryDirectory(prefix='wiki-bench-') as work_dir:
+        completed = subprocess.run(command, cwd=work_dir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario {name} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def git_commit():
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                   capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+def print_results(results):
+    print(f"{'scenario':<20} {'units':>7} {'throughput/s':>13} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>8}")
+    for name, result in results['scenarios'].items():
+        latency = result['latency_ms']
+        rss = result['peak_rss_mb']
+        print(f"{name:<20} {result['units']:>7} {result['throughput_per_s']:>13.2f} {latency['p50']:>9.2f} "
+              f"{latency['p95']:>9.2f} {latency['p99']:>9.2f} {rss if rss is None else round(rss, 1):>8}")
+
+def change(old, new):
+    if not old or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+def print_comparison(baseline, results):
+    print(f"\nComparison with {baseline.get('commit') or 'baseline'}:")
+    if baseline.get('config') != results['config']:
+        print("Warning: the baseline was recorded with a different configuration")
+    print(f"{'scenario':<20} {'throughput':>11} {'p50':>9} {'p95':>9} {'peak RSS':>9}")
+    for name, result in results['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            print(f"{name:<20} {'(new)':>11}")
+            continue
+        print(f"{name:<20} {change(old['throughput_per_s'], result['throughput_per_s']):>11} "
+              f"{change(old['latency_ms']['p50'], result['latency_ms']['p50']):>9} "
+              f"{change(old['latency_ms']['p95'], result['latency_ms']['p95']):>9} "
+              f"{change(old['peak_rss_mb'], result['peak_rss_mb']):>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite on a synthetic link graph")
+    parser.add_argument("--pages", type=int, default=500, help="Number of pages in the synthetic graph")
+    parser.add_argument("--fanout", type=int, default=8, help="Links to other pages on every page")
+    parser.add_argument("--words", type=int, default=800, help="Words of text on every page")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="Vocabulary size of the synthetic text")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic graph")
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial server latency in seconds")
+    parser.add_argument("--ops", type=int, default=50, help="Pages processed by the single-page scenarios")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent fetches in the BFS scenarios")
+    parser.add_argument("--count", type=int, default=50, help="Rows printed by the relative-frequency scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+                        help="Scenarios to run (default: all)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Compare the results with a JSON file from an earlier run")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args)
+        return
+
+    wiki = SyntheticWiki(args.pages, args.fanout, args.words, args.vocabulary, args.seed)
+    results = {
+        'version': SUITE_VERSION,
+        'commit': git_commit(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: getattr(args, key) for key in
+                   ('pages', 'fanout', 'words', 'vocabulary', 'seed', 'latency', 'ops', 'concurrency', 'count')},
+        'scenarios': {},
+    }
+    with run_stand_in_server(wiki, latency=args.latency) as base_url:
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            results['scenarios'][name] = run_child(name, base_url, args)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Mikro-benchmark zliczania słów na stronach z katalogu test/.
+Porównuje sklejenie całego tekstu naraz (get_text + lower + findall)
+z tokenizacją strumieniową (count_tokens) pod względem słów/s i szczytowej pamięci.
+
+Uruchomienie (z katalogu repozytorium):
+    python -m benchmarks.bench_tokenizer --repeat 5 --scale 50
+
+--scale powiela tekst artykułu, symulując bardzo długie strony.
+"""
+import argparse
+import os
+import re
+import time
+import tracemalloc
+from collections import Counter
+from utils import Scraper
+from count import iter_article_strings, count_tokens
+
+TEST_DIR = "test"
+FIXTURES = ["Lugia.html", "Tao trio.html"]
+
+def count_whole_text(strings):
+    """Dawna metoda: cały tekst artykułu jako jeden napis."""
+    text = ' '.join(strings)
+    return Counter(re.findall(r'\b\w+\b', text.lower()))
+
+def count_streaming(strings):
+    return count_tokens(strings)
+
+def measure(function, strings, repeat):
+    """Zwraca (najlepszy czas w s, szczytową pamięć w KiB, wynik)."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(strings)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    function(strings)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Word tokenizer micro-benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per fixture and method")
+    parser.add_argument("--scale", type=int, default=1, help="How many times to repeat the article text")
+    args = parser.parse_args()
+
+    print(f"{'fixture':<16} {'method':<10} {'tokens/s':>12} {'peak KiB':>10} {'identical':>10}")
+    for fixture in FIXTURES:
+        scraper = Scraper("", "", use_local_html_file=True, html_file_path=os.path.join(TEST_DIR, fixture))
+        content = scraper.soup.find('div', id='mw-content-text')
+        strings = [str(s) for s in iter_article_strings(content)] * args.scale
+
+        reference = None
+        for name, function in (("whole", count_whole_text), ("streaming", count_streaming)):
+            seconds, peak_kib, counts = measure(function, strings, args.repeat)
+            if reference is None:
+                reference = counts
+            tokens = sum(counts.values())
+            print(f"{fixture:<16} {name:<10} {tokens / seconds:>12.0f} {peak_kib:>10.1f} {str(counts == reference):>10}")
+
+if __name__ == "__main__":
+    main()
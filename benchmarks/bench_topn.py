@@ -0,0 +1,68 @@
+"""
+Benchmark wyboru top-N dla raportów częstości na syntetycznych danych.
+
+Porównuje pełne sortowanie (sort_values().head(n), value_counts().head(n))
+z top_n_items / top_n_counts: czas i zgodność wartości.
+Słownik ma rozkład Zipfa, więc remisów jest dużo, jak w prawdziwym crawlu.
+
+Uruchomienie (z katalogu repozytorium):
+    python -m benchmarks.bench_topn --words 1000000 --top 20
+"""
+import argparse
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+from top_n import top_n_items, top_n_counts
+
+def make_counts(words, seed):
+    """Counter `words` słów z licznikami z rozkładu Zipfa."""
+    rng = np.random.default_rng(seed)
+    counts = rng.zipf(1.3, size=words).clip(max=10**7)
+    return Counter({f"w{i}": int(c) for i, c in enumerate(counts)})
+
+def timed(function, repeat):
+    """Zwraca (najlepszy czas w ms, wynik)."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-N selection benchmark")
+    parser.add_argument("--words", type=int, default=1_000_000, help="Vocabulary size / number of table cells")
+    parser.add_argument("--top", type=int, default=20, help="N in top-N")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = make_counts(args.words, args.seed)
+    df = pd.DataFrame.from_dict(counts, orient='index', columns=['raw_count']).reset_index()
+    df.columns = ['word', 'raw_count']
+    cells = pd.Series(np.random.default_rng(args.seed).zipf(1.5, size=args.words).astype(str))
+    n = args.top
+
+    cases = [
+        ("article words", [
+            ("sort_values.head", lambda: df.sort_values(by='raw_count', ascending=False).head(n)['raw_count'].tolist()),
+            ("top_n_items", lambda: [c for _, c in top_n_items(counts, n)]),
+        ]),
+        ("table values", [
+            ("value_counts.head", lambda: cells.value_counts().head(n).tolist()),
+            ("top_n_counts", lambda: top_n_counts(cells, n).tolist()),
+        ]),
+    ]
+
+    print(f"{'data':<14} {'method':<18} {'ms':>10} {'speedup':>8} {'same values':>12}")
+    for data, methods in cases:
+        reference_ms = reference = None
+        for name, function in methods:
+            ms, result = timed(function, args.repeat)
+            if reference is None:
+                reference_ms, reference = ms, result
+            print(f"{data:<14} {name:<18} {ms:>10.1f} {reference_ms / ms:>7.1f}x {str(result == reference):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Lokalny zamiennik Bulbapedii do benchmarków i testów.
+Serwuje strony pod adresami /wiki/<Tytuł> - pliki HTML z katalogu albo
+strony z innego źródła (np. SyntheticWiki z benchmarks.synthetic_wiki).
+"""
+import os
+import threading
+import time
+import urllib.parse
+import email.utils
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class DirectoryPages:
+    """Źródło stron: <katalog>/<Tytuł>.html, ETag i Last-Modified z metadanych pliku."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def page(self, title):
+        """Zwraca (treść, etag, last_modified) albo None, gdy strony nie ma."""
+        filepath = os.path.join(self.directory, f"{title}.html")
+        if '/' in title or not os.path.isfile(filepath):
+            return None
+        stat = os.stat(filepath)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = email.utils.formatdate(int(stat.st_mtime), usegmt=True)
+        with open(filepath, 'rb') as f:
+            return f.read(), etag, last_modified
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Obsługuje GET /wiki/<Tytuł> zwracając stronę ze źródła serwera.
+    Wysyła ETag (i Last-Modified, jeśli źródło je zna) i odpowiada 304
+    na pasujące żądania warunkowe.
+    """
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if not path.startswith('/wiki/'):
+            self.send_error(404)
+            return
+
+        title = urllib.parse.unquote(path[len('/wiki/'):]).replace('_', ' ')
+
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        page = self.server.pages.page(title)
+        if page is None:
+            self.send_error(404)
+            return
+
+        body, etag, last_modified = page
+        if (self.headers.get('If-None-Match') == etag
+                or (last_modified and self.headers.get('If-Modified-Since') == last_modified)):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        if last_modified:
+            self.send_header('Last-Modified', last_modified)
+        self.send_header('Content-Type', 'text/html; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@contextmanager
+def run_stand_in_server(pages, latency=0.0):
+    """
+    Uruchamia serwer w wątku tła i zwraca bazowy URL (np. "http://127.0.0.1:PORT/wiki/").
+    `pages` to katalog z plikami HTML albo obiekt z metodą page(title).
+    `latency` dodaje sztuczne opóźnienie (w sekundach) do każdej odpowiedzi.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.pages = DirectoryPages(pages) if isinstance(pages, str) else pages
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address
+        yield f"http://{host}:{port}/wiki/"
+    finally:
+        server.shutdown()
+        server.server_close()
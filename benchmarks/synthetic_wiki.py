@@ -0,0 +1,123 @@
+"""
+Syntetyczny graf stron w stylu Bulbapedii do benchmarków.
+
+Strony są generowane deterministycznie (z ziarna) przy każdym żądaniu, więc
+rozmiar grafu nie wpływa na pamięć. Każda strona ma kanoniczny link, infobox
+(tabela z linkami, pomijana przy crawlu), akapity tekstu z linkami do `fanout`
+innych stron, tabelę ruchów z rowspan i blok <script>.
+"""
+import hashlib
+import random
+import urllib.parse
+
+TITLE_FORMAT = "Synthmon {:05d}"
+
+# Kilka częstych słów angielskich, żeby analiza względnej częstości miała co porównywać
+COMMON_WORDS = (
+    "the of and to in is was it for on that with as by at from his her this are be an which or "
+    "have not has had were but its they their one all also can more been other when into first "
+    "after only two new time type moves evolves level attack pokemon battle trainer region"
+).split()
+SYLLABLES = ["ka", "zu", "mo", "ri", "pe", "ta", "chu", "lo", "gar", "bi", "do", "xe", "nu", "fy", "sha"]
+
+def make_vocabulary(size, seed=0):
+    """Słownik: częste słowa angielskie + deterministycznie generowane pseudo-słowa."""
+    rng = random.Random(seed)
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words[:size]
+
+class SyntheticWiki:
+    """
+    Źródło stron dla run_stand_in_server (page(title) -> (treść, etag, None) albo None).
+
+    Args:
+        pages: Liczba stron w grafie
+        fanout: Liczba linków w treści każdej strony
+        words_per_page: Przybliżona liczba słów tekstu na stronę
+        vocabulary_size: Rozmiar słownika (słowa losowane z rozkładu Zipfa)
+        seed: Ziarno - te same parametry dają identyczne strony
+    """
+
+    def __init__(self, pages=500, fanout=8, words_per_page=800, vocabulary_size=5000, seed=0):
+        self.pages = pages
+        self.fanout = min(fanout, max(pages - 1, 0))
+        self.words_per_page = words_per_page
+        self.seed = seed
+        self.vocabulary = make_vocabulary(vocabulary_size, seed)
+        # Wagi Zipfa dla słów (częste słowa na początku listy)
+        self._weights = [1.0 / (rank + 1) for rank in range(len(self.vocabulary))]
+
+    def title(self, number):
+        return TITLE_FORMAT.format(number)
+
+    def number(self, title):
+        """Numer strony z tytułu albo None, jeśli tytuł nie należy do grafu."""
+        prefix = TITLE_FORMAT.split("{")[0]
+        if not title.startswith(prefix) or not title[len(prefix):].isdigit():
+            return None
+        number = int(title[len(prefix):])
+        return number if number < self.pages else None
+
+    def links(self, number):
+        """Numery stron, do których linkuje strona `number` (bez niej samej)."""
+        rng = random.Random(f"{self.seed}-links-{number}")
+        others = rng.sample(range(self.pages - 1), self.fanout)
+        return [other if other < number else other + 1 for other in others]
+
+    def start_title(self):
+        return self.title(0)
+
+    def page(self, title):
+        number = self.number(title)
+        if number is None:
+            return None
+        body = self.render(number).encode('utf-8')
+        return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"', None
+
+    def _href(self, number):
+        return "/wiki/" + urllib.parse.quote(self.title(number).replace(' ', '_'))
+
+    def render(self, number):
+        rng = random.Random(f"{self.seed}-page-{number}")
+        title = self.title(number)
+        links = self.links(number)
+        words = rng.choices(self.vocabulary, weights=self._weights, k=self.words_per_page)
+
+        paragraphs = []
+        per_paragraph = max(len(words) // max(len(links), 1), 1)
+        for i in range(0, len(words), per_paragraph):
+            text = " ".join(words[i:i + per_paragraph])
+            link_index = i // per_paragraph
+            if link_index < len(links):
+                target = links[link_index]
+                text += f' <a href="{self._href(target)}" title="{self.title(target)}">{self.title(target)}</a>.'
+            paragraphs.append(f"<p>{text}</p>")
+        if paragraphs:
+            paragraphs[0] = paragraphs[0].replace("<p>", f"<p><b>{title}</b> is a synthetic Pokémon. ", 1)
+
+        infobox_link = links[0] if links else number
+        moves = "".join(
+            f'<tr><td rowspan="2">{rng.choice(self.vocabulary).title()}</td><td>{rng.randint(10, 150)}</td>'
+            f'<td>{rng.randint(50, 100)}%</td></tr><tr><td>{rng.randint(10, 150)}</td><td>100%</td></tr>'
+            for _ in range(4)
+        )
+        return (
+            "<!DOCTYPE html><html><head>"
+            f"<title>{title} - Bulbapedia, the community-driven Pokémon encyclopedia</title>"
+            f'<link rel="canonical" href="https://bulbapedia.bulbagarden.net{self._href(number)}">'
+            '</head><body><div id="mw-content-text"><div class="mw-parser-output">'
+            f'<table class="infobox"><tr><th colspan="2">{title}</th></tr>'
+            f'<tr><td>Related</td><td><a href="{self._href(infobox_link)}">{self.title(infobox_link)}</a></td></tr>'
+            '</table>'
+            + "".join(paragraphs) +
+            '<table class="roundy"><tr><th>Move</th><th>Power</th><th>Accuracy</th></tr>' + moves + '</table>'
+            "<script>var wgPageName = 'synthetic';</script>"
+            '<a href="/wiki/Special:Random">Random page</a>'
+            "</div></div></body></html>"
+        )
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+from count_store import atomic_write_text
+from profiling import span
+
+DEFAULT_CHECKPOINT_FILE = "crawl-checkpoint.json"
+
+class CheckpointError(Exception):
+    """Punkt kontrolny nie pasuje do stanu liczników słów."""
+
+class CrawlCheckpoint:
+    """
+    Punkt kontrolny crawla BFS: kolejka (frontier), zbiór odwiedzonych stron
+    i strony, których liczniki są już w magazynie słów.
+
+    Ukończone strony nie są trzymane w pamięci ani zapisywane od nowa przy
+    każdym punkcie kontrolnym: trafiają do dziennika `<path>.pages` (JSON
+    Lines, tylko dopisywanie), a stan zapamiętuje jego rozmiar w bajtach.
+    Tak samo klucze odwiedzonych tytułów (HashedTitleSet) trafiają do
+    dziennika `<path>.visited` (8 bajtów na tytuł), więc punkt kontrolny
+    dopisuje tylko tytuły odwiedzone od poprzedniego.
+
+    Zapis idzie w parze z flushem magazynu liczników: najpierw zapisywany
+    jest punkt kontrolny z sumą liczników przed i po flushu, potem flush.
+    Przy wznowieniu suma w magazynie mówi, czy flush zdążył się wykonać, więc
+    żadna strona nie zostanie policzona dwa razy ani pominięta.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_FILE, interval=5.0):
+        self.path = path
+        self.pages_path = f"{path}.pages"
+        self.visited_path = f"{path}.visited"
+        self.interval = interval
+        self._last_save = time.monotonic()
+
+    def due(self):
+        """Czy minął interwał od ostatniego zapisu."""
+        return time.monotonic() - self._last_save >= self.interval
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def save(self, state):
+        """
+        Zapisuje stan atomowo (plik tymczasowy + os.replace).
+        state['queue'] może być dowolnym iterowalnym obiektem (np. SpillingFrontier) -
+        jest zapisywany strumieniowo, bez budowania całej listy w pamięci.
+        """
+        with span('persist'):
+            atomic_write_text(self.path, lambda f: write_state(f, state))
+        self._last_save = time.monotonic()
+
+    def load(self):
+        """Wczytuje zapisany stan albo zwraca None, jeśli punktu kontrolnego nie ma."""
+        if not self.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def append_pages(self, entries):
+        """Dopisuje ukończone strony do dziennika i zwraca jego rozmiar w bajtach."""
+        with open(self.pages_path, 'ab') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def truncate_pages(self, size):
+        """Obcina dziennik do `size` bajtów (wpisy dopisane po punkcie kontrolnym znikają)."""
+        truncate_file(self.pages_path, size)
+
+    def iter_pages(self):
+        """Generator wpisów dziennika ukończonych stron."""
+        if not os.path.exists(self.pages_path):
+            return
+        with open(self.pages_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def append_visited(self, data):
+        """Dopisuje klucze odwiedzonych tytułów (bajty) i zwraca rozmiar dziennika."""
+        with open(self.visited_path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def truncate_visited(self, size):
+        """Obcina dziennik odwiedzonych do `size` bajtów."""
+        truncate_file(self.visited_path, size)
+
+    def read_visited(self):
+        """Zawartość dziennika odwiedzonych (pusta, jeśli go nie ma)."""
+        if not os.path.exists(self.visited_path):
+            return b""
+        with open(self.visited_path, 'rb') as f:
+            return f.read()
+
+    def remove(self):
+        for path in (self.path, self.pages_path, self.visited_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+def truncate_file(path, size):
+    """Obcina plik do `size` bajtów (tworzy pusty, jeśli go nie ma)."""
+    with open(path, 'ab') as f:
+        f.truncate(size)
+
+def write_state(f, state):
+    """Zapisuje stan jako zwarty JSON, pozycje kolejki po jednej."""
+    fields = {key: value for key, value in state.items() if key != 'queue'}
+    dumps = lambda value: json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    f.write(dumps(fields)[:-1])
+    f.write(',"queue":[' if fields else '"queue":[')
+    for i, item in enumerate(state.get('queue', ())):
+        if i:
+            f.write(',')
+        f.write(dumps(list(item)))
+    f.write(']}')
+
+def reconcile_state(state, store_total):
+    """
+    Uzgadnia wczytany stan z sumą liczników w magazynie.
+    Jeśli ostatni flush nie doszedł do skutku, strony z `unflushed` wracają
+    na początek kolejki i znikają z dziennika ukończonych stron (stan wskazuje
+    wtedy jego rozmiar sprzed tego punktu kontrolnego).
+    """
+    if 'pages_size' not in state:
+        raise CheckpointError("checkpoint was written by an older version, start the crawl again")
+    if store_total == state['total']:
+        return state
+    if store_total != state['previous_total']:
+        raise CheckpointError(
+            f"word counts total is {store_total}, checkpoint expects "
+            f"{state['previous_total']} or {state['total']}"
+        )
+
+    state['queue'] = [entry[:2] for entry in state['unflushed']] + state['queue']
+    state['pages_size'] = state['previous_pages_size']
+    state['unflushed'] = []
+    state['total'] = state['previous_total']
+    return state
@@ -1,11 +1,79 @@
-import json
 import re
-import os
 from collections import Counter
 from utils import Scraper
+from count_store import atomic_write_json, load_json_counts
+from parsers import walk_content
+from profiling import span
 
 WORD_COUNTS_FILE = "word-counts.json"
 
+# Elementy, które psują statystyki słów
+IGNORED_TAGS = ('script', 'style', 'table', 'noscript')
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+WHITESPACE_PATTERN = re.compile(r'\s')
+
+# Maksymalna długość kawałka tekstu tokenizowanego naraz
+TOKEN_CHUNK_SIZE = 8 * 1024
+
+def iter_article_strings(article_content):
+    """
+    Zwraca napisy z treści artykułu z pominięciem elementów z IGNORED_TAGS.
+    Drzewo nie jest modyfikowane (bez decompose), więc strona może być
+    dalej używana np. do wyciągania tabel i linków.
+    """
+    string_types = article_content.interesting_string_types or article_content.MAIN_CONTENT_STRING_TYPES
+    if isinstance(string_types, type):
+        string_types = (string_types,)
+    for node in walk_content(article_content, IGNORED_TAGS):
+        if type(node) in string_types:
+            yield node
+
+def split_long_string(text, limit=TOKEN_CHUNK_SIZE):
+    """
+    Dzieli bardzo długi napis na kawałki co najwyżej `limit` znaków (o ile się da),
+    tnąc tylko na białych znakach, więc żadne słowo nie zostanie rozdzielone.
+    """
+    while len(text) > limit:
+        cut = max(text.rfind(' ', 0, limit), text.rfind('\n', 0, limit))
+        if cut <= 0:
+            match = WHITESPACE_PATTERN.search(text, limit)
+            if not match:
+                break
+            cut = match.start()
+        yield text[:cut]
+        text = text[cut:]
+    yield text
+
+def iter_text_chunks(strings, chunk_size=TOKEN_CHUNK_SIZE):
+    """
+    Skleja kolejne napisy spacją w kawałki o długości około `chunk_size`.
+    Daje ten sam podział na słowa co sklejenie całego tekstu naraz.
+    """
+    chunk = []
+    size = 0
+    for string in strings:
+        for piece in split_long_string(string, chunk_size):
+            chunk.append(piece)
+            size += len(piece) + 1
+            if size >= chunk_size:
+                yield ' '.join(chunk)
+                chunk = []
+                size = 0
+    if chunk:
+        yield ' '.join(chunk)
+
+def count_tokens(strings, counter=None, chunk_size=TOKEN_CHUNK_SIZE):
+    """
+    Zlicza słowa (małymi literami) z ciągu napisów, kawałek po kawałku.
+    Pamięć zależy od `chunk_size`, a nie od długości całego tekstu.
+    """
+    if counter is None:
+        counter = Counter()
+    for chunk in iter_text_chunks(strings, chunk_size):
+        counter.update(WORD_PATTERN.findall(chunk.lower()))
+    return counter
+
 def count_words_from_html(soup):
     """
     Zlicza słowa w tekście artykułu z BeautifulSoup obiektu.
@@ -20,33 +88,22 @@ def count_words_from_html(soup):
     if not article_content:
         return Counter()
 
-    # Usuń elementy, które psują statystyki
-    for element in article_content(['script', 'style', 'table', 'noscript']):
-        element.decompose()
-
-    # Pobierz czysty tekst
-    text = article_content.get_text(separator=' ')
-    
-    # Oczyść i podziel na słowa (małe litery)
-    words = re.findall(r'\b\w+\b', text.lower())
-    
-    return Counter(words)
+    # Policz słowa (małe litery) w czystym tekście, pomijając elementy, które psują statystyki
+    with span('count'):
+        return count_tokens(iter_article_strings(article_content))
 
 def update_word_counts(new_counts):
     """
     Load, update, and save word counts.
+    The file is replaced atomically, so a crash never leaves it half-written.
+    For many pages use a CountStore, which batches the writes.
     """
-    counts = Counter()
-    if os.path.exists(WORD_COUNTS_FILE):
-        with open(WORD_COUNTS_FILE, 'r', encoding='utf-8') as f:
-            counts.update(json.load(f))
-    
-    counts.update(new_counts)
-    
-    with open(WORD_COUNTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(dict(counts), f, indent=4, ensure_ascii=False)
+    with span('merge'):
+        counts = load_json_counts(WORD_COUNTS_FILE)
+        counts.update(new_counts)
+    atomic_write_json(WORD_COUNTS_FILE, dict(counts))
 
-def count_words_for_phrase(base_url, phrase, use_local_html_file=False, html_file_path=None):
+def count_words_for_phrase(base_url, phrase, use_local_html_file=False, html_file_path=None, fetcher=None):
     """
     Główna funkcja: pobiera stronę, liczy słowa i aktualizuje word-counts.json
     """
@@ -54,7 +111,8 @@ def count_words_for_phrase(base_url, phrase, use_local_html_file=False, html_fil
         base_url=base_url,
         phrase=phrase,
         use_local_html_file=use_local_html_file,
-        html_file_path=html_file_path
+        html_file_path=html_file_path,
+        fetcher=fetcher
     )
     
     if not scraper.soup:
@@ -62,7 +120,7 @@ def count_words_for_phrase(base_url, phrase, use_local_html_file=False, html_fil
         return
     
     # Policz słowa
-    word_counter = count_words_from_html(scraper.soup)
+    word_counter = scraper.count_words()
     
     if not word_counter:
         print(f"Error: No words found in article '{phrase}'")
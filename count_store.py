@@ -0,0 +1,254 @@
+import io
+import os
+import abc
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+from collections import Counter
+from profiling import span
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+CHECKSUM_MASK = (1 << 64) - 1
+
+def atomic_write_json(filepath, data, indent=4):
+    """
+    Zapisuje JSON do pliku tymczasowego obok docelowego i podmienia go
+    atomowo (os.replace), więc przerwany zapis nie psuje istniejącego pliku.
+    Przy indent=None JSON zapisywany jest w zwartej postaci.
+    """
+    with span('persist'):
+        _atomic_write_json(filepath, data, indent)
+
+def _atomic_write_json(filepath, data, indent):
+    separators = (',', ':') if indent is None else None
+    atomic_write_text(filepath, lambda f: json.dump(data, f, indent=indent, separators=separators, ensure_ascii=False))
+
+def atomic_write_text(filepath, write, compress=False):
+    """
+    Atomowy zapis pliku tekstowego: write(f) pisze do pliku tymczasowego, potem os.replace.
+    Przy compress=True plik jest kompresowany (gzip).
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+    try:
+        if compress:
+            with os.fdopen(fd, 'wb') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as gz, io.TextIOWrapper(gz, encoding='utf-8') as f:
+                    write(f)
+                raw.flush()
+                os.fsync(raw.fileno())
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_json_counts(filepath):
+    """Wczytuje licznik słów z pliku JSON (pusty Counter, jeśli pliku nie ma)."""
+    counts = Counter()
+    if os.path.exists(filepath):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            counts.update(json.load(f))
+    return counts
+
+def counts_checksum(items):
+    """
+    Suma kontrolna par (słowo, licznik) niezależna od ich kolejności:
+    suma 64-bitowych skrótów słów razy liczniki, modulo 2^64. Można ją
+    aktualizować przyrostowo, dodając sumę kontrolną zmian.
+    """
+    checksum = 0
+    for word, count in items:
+        checksum += int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little') * count
+    return checksum & CHECKSUM_MASK
+
+class CountStore(abc.ABC):
+    """
+    Bazowa klasa magazynu liczników słów.
+
+    Wyniki kolejnych stron są sumowane w pamięci (merge) i zapisywane na dysk
+    co `flush_interval` sekund albo przy close(). Po każdym zapisie plik
+    JSON w dotychczasowym formacie jest aktualny. Przy `flush_interval=None`
+    zapis następuje tylko po jawnym wywołaniu flush().
+    """
+
+    def __init__(self, json_path, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.json_path = json_path
+        self.flush_interval = flush_interval
+        self.pending = Counter()
+        self.flushed_total = 0
+        self._checksum = None
+        self._last_flush = time.monotonic()
+
+    def merge(self, new_counts):
+        """
+        Dodaje liczniki strony i zapisuje je, jeśli minął interwał.
+        Liczniki mogą być ujemne (różnice przy przeliczeniu przyrostowym);
+        słowa, których licznik spadnie do zera, znikają z magazynu.
+        """
+        with span('merge'):
+            self.pending.update(new_counts)
+        if self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Zapisuje zbuforowane liczniki na dysk."""
+        if self.pending:
+            self._write(self.pending)
+            self.flushed_total += sum(self.pending.values())
+            if self._checksum is not None:
+                self._checksum = (self._checksum + counts_checksum(self.pending.items())) & CHECKSUM_MASK
+            self.pending = Counter()
+        self._last_flush = time.monotonic()
+
+    def total(self):
+        """Suma wszystkich liczników (zapisanych i zbuforowanych)."""
+        return self.flushed_total + sum(self.pending.values())
+
+    def checksum(self):
+        """
+        Suma kontrolna zapisanych liczników (counts_checksum). Liczona raz przy
+        pierwszym wywołaniu, potem aktualizowana przy każdym flush().
+        """
+        if self._checksum is None:
+            self._checksum = counts_checksum(self._flushed_items())
+        return self._checksum
+
+    def close(self):
+        self.flush()
+
+    @abc.abstractmethod
+    def counts(self):
+        """Zwraca wszystkie liczniki (zapisane i zbuforowane) jako Counter."""
+
+    @abc.abstractmethod
+    def _flushed_items(self):
+        """Pary (słowo, licznik) zapisane na dysku."""
+
+    @abc.abstractmethod
+    def _write(self, pending):
+        """Zapisuje zbuforowane liczniki na dysk (dodaje je do zapisanych)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class JsonCountStore(CountStore):
+    """
+    Magazyn trzymający całość liczników w pamięci i przepisujący
+    word-counts.json atomowo przy każdym zapisie.
+    """
+
+    def __init__(self, json_path, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        super().__init__(json_path, flush_interval)
+        self._counts = load_json_counts(json_path)
+        self.flushed_total = sum(self._counts.values())
+
+    def counts(self):
+        counts = Counter(self._counts)
+        counts.update(self.pending)
+        return +counts
+
+    def _flushed_items(self):
+        return self._counts.items()
+
+    def _write(self, pending):
+        self._counts.update(pending)
+        if any(count <= 0 for count in pending.values()):
+            self._counts = +self._counts
+        atomic_write_json(self.json_path, dict(self._counts))
+
+class SqliteCountStore(CountStore):
+    """
+    Magazyn w bazie SQLite (tabela word -> count aktualizowana przez upsert).
+    Zapis dotyczy tylko słów ze zbuforowanych stron, a word-counts.json
+    eksportowany jest dopiero przy close().
+
+    Baza pamięta rozmiar i czas modyfikacji pliku JSON z ostatniego eksportu.
+    Jeśli przy otwarciu plik wygląda inaczej (zmieniło go np. --count-words
+    albo został usunięty), liczniki w bazie są zastępowane jego zawartością,
+    żeby close() nie nadpisał tych zmian starymi sumami.
+    """
+
+    def __init__(self, json_path, db_path=None, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        super().__init__(json_path, flush_interval)
+        self.db_path = db_path or f"{os.path.splitext(json_path)[0]}.sqlite"
+        self._db = sqlite3.connect(self.db_path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS counts (word TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+        # Nowa baza albo JSON zmieniony poza magazynem: baza startuje od liczników z JSON
+        exported = self._db.execute("SELECT value FROM meta WHERE key = 'json_stamp'").fetchone()
+        if (exported[0] if exported else None) != self._json_stamp():
+            with self._db:
+                self._db.execute("DELETE FROM counts")
+            self._write(load_json_counts(json_path))
+            self._save_json_stamp()
+        self.flushed_total = self._db.execute("SELECT COALESCE(SUM(count), 0) FROM counts").fetchone()[0]
+
+    def counts(self):
+        counts = Counter(dict(self._db.execute("SELECT word, count FROM counts ORDER BY rowid")))
+        counts.update(self.pending)
+        return +counts
+
+    def _flushed_items(self):
+        return self._db.execute("SELECT word, count FROM counts")
+
+    def _write(self, pending):
+        with span('persist'), self._db:
+            self._db.executemany(
+                "INSERT INTO counts (word, count) VALUES (?, ?) "
+                "ON CONFLICT(word) DO UPDATE SET count = count + excluded.count",
+                pending.items()
+            )
+            if any(count <= 0 for count in pending.values()):
+                self._db.execute("DELETE FROM counts WHERE count <= 0")
+
+    def export_json(self):
+        """Eksportuje liczniki do word-counts.json (atomowo)."""
+        atomic_write_json(self.json_path, dict(self.counts()))
+        self._save_json_stamp()
+
+    def _json_stamp(self):
+        """Rozmiar i czas modyfikacji pliku JSON (None, jeśli go nie ma)."""
+        try:
+            stat = os.stat(self.json_path)
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _save_json_stamp(self):
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_stamp', ?)",
+                             (self._json_stamp(),))
+
+    def close(self):
+        self.flush()
+        self.export_json()
+        self._db.close()
+
+COUNT_STORE_BACKENDS = {
+    'json': JsonCountStore,
+    'sqlite': SqliteCountStore,
+}
+
+def remove_count_store(json_path):
+    """Usuwa plik JSON magazynu i domyślną bazę SQLite obok niego (jeśli istnieją)."""
+    for path in (json_path, f"{os.path.splitext(json_path)[0]}.sqlite"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def open_count_store(json_path, backend='json', flush_interval=DEFAULT_FLUSH_INTERVAL):
+    """Tworzy magazyn liczników wybranego typu ('json' lub 'sqlite')."""
+    return COUNT_STORE_BACKENDS[backend](json_path, flush_interval=flush_interval)
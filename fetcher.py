@@ -0,0 +1,194 @@
+import time
+import threading
+import email.utils
+import requests
+from requests.adapters import HTTPAdapter
+from profiling import span, add_bytes
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_AFTER_STATUSES = {429, 503}
+
+def _brotli_available():
+    """urllib3 dekoduje 'br' tylko gdy zainstalowany jest brotli lub brotlicffi."""
+    for module_name in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module_name)
+            return True
+        except ImportError:
+            pass
+    return False
+
+ACCEPT_ENCODING = "gzip, deflate, br" if _brotli_available() else "gzip, deflate"
+
+class FetchError(Exception):
+    """Strona nie została pobrana (błąd HTTP lub sieci po wyczerpaniu prób)."""
+    def __init__(self, url, message, status_code=None):
+        super().__init__(f"{url}: {message}")
+        self.url = url
+        self.status_code = status_code
+
+def parse_retry_after(value):
+    """
+    Zamienia nagłówek Retry-After (liczba sekund lub data HTTP) na liczbę sekund.
+    Zwraca None, jeśli nagłówka nie da się odczytać.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+class FetchStats:
+    """
+    Liczniki pobrań współdzielone przez wszystkie wątki.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.pages = 0
+        self.failures = 0
+        self.retries = 0
+        self.bytes_transferred = 0
+        self.bytes_decoded = 0
+        self.latency_total = 0.0
+
+    def record_request(self, latency):
+        with self._lock:
+            self.requests += 1
+            self.latency_total += latency
+
+    def record_page(self, bytes_transferred, bytes_decoded):
+        with self._lock:
+            self.pages += 1
+            self.bytes_transferred += bytes_transferred
+            self.bytes_decoded += bytes_decoded
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'pages': self.pages,
+                'failures': self.failures,
+                'retries': self.retries,
+                'bytes_transferred': self.bytes_transferred,
+                'bytes_decoded': self.bytes_decoded,
+                'avg_latency_ms': (self.latency_total / self.requests * 1000) if self.requests else 0.0,
+            }
+
+    def report(self):
+        """Zwraca czytelne podsumowanie liczników."""
+        stats = self.as_dict()
+        return (f"Requests: {stats['requests']}, pages: {stats['pages']}, failures: {stats['failures']}, "
+                f"retries: {stats['retries']}, transferred: {stats['bytes_transferred']} B "
+                f"(decoded {stats['bytes_decoded']} B), avg latency: {stats['avg_latency_ms']:.1f} ms")
+
+class Fetcher:
+    """
+    Współdzielony klient HTTP dla Scrapera, --count-words i crawla BFS.
+    Trzyma otwarte połączenia (keep-alive), negocjuje kompresję, ma timeout
+    i ponawia nieudane żądania z wykładniczym odstępem.
+    """
+
+    def __init__(self, timeout=10.0, max_retries=3, backoff_factor=0.5, max_backoff=60.0, pool_size=10):
+        """
+        Args:
+            timeout: Limit czasu (w sekundach) na połączenie i na odczyt odpowiedzi
+            max_retries: Ile razy ponowić żądanie po błędzie przejściowym
+            backoff_factor: Bazowy odstęp; kolejne próby czekają backoff_factor * 2**próba
+            max_backoff: Górny limit pojedynczego odstępu (również dla Retry-After)
+            pool_size: Liczba otwartych połączeń do jednego hosta
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.stats = FetchStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+    def _backoff(self, attempt, response=None):
+        delay = self.backoff_factor * (2 ** attempt)
+        if response is not None and response.status_code in RETRY_AFTER_STATUSES:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = retry_after
+        return min(delay, self.max_backoff)
+
+    def fetch(self, url, headers=None):
+        """
+        Pobiera URL i zwraca obiekt requests.Response.
+        Odpowiedzi 304 zwracane są bez błędu (żądania warunkowe).
+        Rzuca FetchError po wyczerpaniu prób lub przy błędzie, którego nie warto ponawiać.
+        """
+        with span('fetch'):
+            return self._fetch(url, headers)
+
+    def _fetch(self, url, headers):
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                self.stats.record_request(time.perf_counter() - started)
+                if attempt >= self.max_retries:
+                    self.stats.record_failure()
+                    raise FetchError(url, str(e)) from e
+                response = None
+            else:
+                self.stats.record_request(time.perf_counter() - started)
+                if response.status_code < 400:
+                    transferred = int(response.headers.get('Content-Length', len(response.content)))
+                    self.stats.record_page(transferred, len(response.content))
+                    add_bytes(transferred)
+                    return response
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    self.stats.record_failure()
+                    raise FetchError(url, f"HTTP {response.status_code}", response.status_code)
+
+            self.stats.record_retry()
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def get_text(self, url):
+        """Pobiera URL i zwraca treść odpowiedzi jako tekst."""
+        response = self.fetch(url)
+        with span('decode'):
+            return response.text
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+def configure_default_fetcher(**kwargs):
+    """Tworzy na nowo domyślny Fetcher z podanymi ustawieniami (np. z opcji CLI)."""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        _default_fetcher = Fetcher(**kwargs)
+        return _default_fetcher
+
+def get_default_fetcher():
+    """Zwraca domyślny Fetcher współdzielony w obrębie procesu."""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher()
+        return _default_fetcher
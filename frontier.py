@@ -0,0 +1,360 @@
+import os
+import re
+import math
+import array
+import heapq
+import itertools
+import base64
+import shutil
+import hashlib
+import tempfile
+from collections import deque
+import numpy as np
+
+DEFAULT_FRONTIER_MEMORY = 100_000
+DEFAULT_BLOOM_CAPACITY = 1_000_000
+DEFAULT_BLOOM_ERROR_RATE = 0.001
+TITLE_SET_KINDS = ('hashed', 'bloom')
+
+def title_key(title):
+    """64-bitowy klucz tytułu (blake2b); kolizja przy milionie tytułów ma szansę ~1e-8."""
+    return int.from_bytes(hashlib.blake2b(title.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class HashedTitleSet:
+    """
+    Zbiór tytułów przechowywany jako 64-bitowe klucze (title_key) zamiast napisów.
+
+    Nowe klucze trafiają do małego bufora (zwykły set), który po zapełnieniu
+    jest scalany z posortowaną tablicą uint64 - ok. 8 bajtów na tytuł, więc
+    pamięć rośnie liniowo z liczbą tytułów (stałą pamięć daje BloomTitleSet).
+    Po track_new_keys() zbiór zapamiętuje też klucze dodane od ostatniego
+    take_new_keys(), żeby punkt kontrolny dopisywał do dziennika tylko je.
+    """
+    BUFFER_SIZE = 65_536
+
+    def __init__(self):
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._buffer = set()
+        self._new_keys = None
+
+    def _has_key(self, key):
+        if key in self._buffer:
+            return True
+        position = np.searchsorted(self._keys, np.uint64(key))
+        return position < len(self._keys) and int(self._keys[position]) == key
+
+    def _add_key(self, key):
+        if self._has_key(key):
+            return
+        self._buffer.add(key)
+        if self._new_keys is not None:
+            self._new_keys.append(key)
+        if len(self._buffer) >= self.BUFFER_SIZE:
+            self._compact()
+
+    def _compact(self):
+        if self._buffer:
+            buffered = np.fromiter(self._buffer, dtype=np.uint64, count=len(self._buffer))
+            self._keys = np.union1d(self._keys, buffered)
+            self._buffer.clear()
+
+    def add(self, title):
+        self._add_key(title_key(title))
+
+    def __contains__(self, title):
+        return self._has_key(title_key(title))
+
+    def __len__(self):
+        return len(self._keys) + len(self._buffer)
+
+    def track_new_keys(self):
+        """Od teraz zapamiętuje dodawane klucze dla take_new_keys()."""
+        self._new_keys = array.array('Q')
+
+    def take_new_keys(self):
+        """Klucze dodane od poprzedniego wywołania jako bajty (uint64 little-endian)."""
+        keys, self._new_keys = self._new_keys, array.array('Q')
+        return np.frombuffer(keys, dtype=np.uint64).astype('<u8').tobytes()
+
+    def to_bytes(self):
+        """Wszystkie klucze jako bajty (uint64 little-endian)."""
+        self._compact()
+        return self._keys.astype('<u8').tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Zbiór z kluczy w formacie to_bytes() / take_new_keys() (w dowolnej kolejności)."""
+        title_set = cls()
+        title_set._keys = np.unique(np.frombuffer(data, dtype='<u8').astype(np.uint64))
+        return title_set
+
+    def to_state(self):
+        """Stan do punktu kontrolnego (klucze jako base64)."""
+        return {'kind': 'hashed', 'keys': base64.b64encode(self.to_bytes()).decode('ascii')}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls.from_bytes(base64.b64decode(state['keys']))
+
+class BloomTitleSet:
+    """
+    Filtr Blooma o stałym rozmiarze dla `capacity` tytułów z odsetkiem fałszywych
+    trafień `error_rate`. Pamięć nie rośnie z liczbą tytułów, ale fałszywe trafienie
+    oznacza, że crawl pominie stronę, której nie widział; powyżej `capacity`
+    tytułów odsetek fałszywych trafień rośnie.
+    """
+
+    def __init__(self, capacity=DEFAULT_BLOOM_CAPACITY, error_rate=DEFAULT_BLOOM_ERROR_RATE):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("Bloom filter needs capacity >= 1 and 0 < error_rate < 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def _positions(self, title):
+        digest = hashlib.blake2b(title.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        # Podwójne haszowanie (Kirsch-Mitzenmacher): k pozycji z dwóch skrótów
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, title):
+        added = False
+        for position in self._positions(title):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                added = True
+        if added:
+            self._count += 1
+
+    def __contains__(self, title):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(title))
+
+    def __len__(self):
+        """Przybliżona liczba dodanych tytułów (bez tych, które filtr uznał za znane)."""
+        return self._count
+
+    def to_state(self):
+        return {'kind': 'bloom', 'capacity': self.capacity, 'error_rate': self.error_rate,
+                'count': self._count, 'bits': base64.b64encode(bytes(self._bits)).decode('ascii')}
+
+    @classmethod
+    def from_state(cls, state):
+        title_set = cls(state['capacity'], state['error_rate'])
+        title_set._bits = bytearray(base64.b64decode(state['bits']))
+        title_set._count = state['count']
+        return title_set
+
+def make_title_set(kind='hashed', capacity=DEFAULT_BLOOM_CAPACITY, error_rate=DEFAULT_BLOOM_ERROR_RATE, saved=None):
+    """
+    Tworzy zbiór tytułów danego rodzaju ('hashed' albo 'bloom').
+
+    `saved` to stan z punktu kontrolnego: słownik z to_state() (odtwarzany
+    z zapisanym rodzajem i parametrami) albo lista tytułów ze starszych punktów
+    kontrolnych, dodawana do nowego zbioru.
+    """
+    if isinstance(saved, dict):
+        return {'hashed': HashedTitleSet, 'bloom': BloomTitleSet}[saved['kind']].from_state(saved)
+    if kind == 'hashed':
+        title_set = HashedTitleSet()
+    elif kind == 'bloom':
+        title_set = BloomTitleSet(capacity, error_rate)
+    else:
+        raise ValueError(f"Unknown title set kind: {kind}")
+    for title in saved or ():
+        title_set.add(title)
+    return title_set
+
+class SpillingFrontier:
+    """
+    Kolejka FIFO par (tytuł, głębokość) dla crawla BFS z ograniczoną pamięcią.
+
+    W pamięci jest najwyżej `memory_limit` pozycji: początek kolejki (head)
+    i koniec (tail). Gdy koniec się zapełni, jest zapisywany na dysk jako
+    segment (plik tekstowy "głębokość<TAB>tytuł" w linii), a segmenty są
+    wczytywane z powrotem po kolei, gdy początek kolejki się opróżni.
+    Kolejność jest taka sama jak w zwykłym deque.
+    """
+
+    def __init__(self, items=(), memory_limit=DEFAULT_FRONTIER_MEMORY, spill_dir=None):
+        self.chunk_size = max(memory_limit // 2, 1)
+        self.spill_dir = spill_dir
+        self._directory = None
+        self._head = deque()
+        self._segments = deque()
+        self._tail = deque()
+        self._length = 0
+        self._segment_number = 0
+        self.spilled_segments = 0
+        for item in items:
+            self.append(item[:2])
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def append(self, item):
+        title, depth = item
+        if self._segments or self._tail or len(self._head) >= self.chunk_size:
+            self._tail.append((title, depth))
+            if len(self._tail) >= self.chunk_size:
+                self._spill()
+        else:
+            self._head.append((title, depth))
+        self._length += 1
+
+    def push(self, title, depth, position=0.0):
+        """Dodaje nowy tytuł na koniec kolejki (pozycja linku nie ma znaczenia w BFS)."""
+        self.append((title, depth))
+
+    def relink(self, title, position=0.0):
+        """Kolejny link do znanego tytułu - w BFS bez znaczenia."""
+
+    def popleft(self):
+        if not self._head:
+            if self._segments:
+                self._head = self._read_segment(self._segments.popleft(), remove=True)
+            else:
+                self._head, self._tail = self._tail, deque()
+        item = self._head.popleft()
+        self._length -= 1
+        return item
+
+    def __iter__(self):
+        """Wszystkie pozycje w kolejności kolejki (segmenty czytane z dysku po jednym)."""
+        yield from self._head
+        for path in self._segments:
+            yield from self._read_segment(path)
+        yield from self._tail
+
+    def _spill(self):
+        if self._directory is None:
+            if self.spill_dir:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            self._directory = tempfile.mkdtemp(prefix='wiki-frontier-', dir=self.spill_dir)
+        path = os.path.join(self._directory, f"segment-{self._segment_number:08d}.txt")
+        self._segment_number += 1
+        with open(path, 'w', encoding='utf-8') as f:
+            # Tytuły kanoniczne nie zawierają tabulatorów ani końców linii
+            f.writelines(f"{depth}\t{title}\n" for title, depth in self._tail)
+        self._segments.append(path)
+        self._tail.clear()
+        self.spilled_segments += 1
+
+    def _read_segment(self, path, remove=False):
+        with open(path, 'r', encoding='utf-8') as f:
+            items = deque((line[line.index('\t') + 1:-1], int(line[:line.index('\t')])) for line in f)
+        if remove:
+            os.remove(path)
+        return items
+
+    def close(self):
+        """Usuwa pliki segmentów z dysku."""
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+            self._segments.clear()
+
+class LinkScorer:
+    """
+    Funkcja oceny linków dla BestFirstFrontier:
+    score = inlinks_weight * liczba_linków_do_tytułu + position_weight * (1 - pozycja)
+            + prefer_weight (jeśli tytuł pasuje do `prefer`).
+
+    Pozycja to względne miejsce linku w treści strony (0 = pierwszy link,
+    bliżej 1 = koniec strony, gdzie są zwykle navboxy); liczy się najlepsza
+    pozycja spośród wszystkich stron linkujących. Tytuły pasujące do
+    `exclude` nie trafiają do kolejki (score None).
+    """
+
+    def __init__(self, inlinks_weight=1.0, position_weight=1.0, prefer=None, prefer_weight=5.0, exclude=None):
+        self.inlinks_weight = inlinks_weight
+        self.position_weight = position_weight
+        self.prefer = re.compile(prefer) if prefer else None
+        self.prefer_weight = prefer_weight
+        self.exclude = re.compile(exclude) if exclude else None
+
+    def __call__(self, title, depth, inlinks, position):
+        if self.exclude is not None and self.exclude.search(title):
+            return None
+        score = self.inlinks_weight * inlinks + self.position_weight * (1.0 - position)
+        if self.prefer is not None and self.prefer.search(title):
+            score += self.prefer_weight
+        return score
+
+class BestFirstFrontier:
+    """
+    Kolejka priorytetowa tytułów dla crawla best-first z tym samym interfejsem
+    co SpillingFrontier (push, relink, popleft, iteracja, len).
+
+    `scorer(title, depth, inlinks, position)` ocenia tytuł (większy wynik =
+    wcześniej) albo zwraca None, żeby go pominąć. Kolejne linki do tytułu
+    czekającego w kolejce zwiększają jego licznik linków i mogą podnieść wynik;
+    stare wpisy w kopcu są pomijane przy zdejmowaniu (lazy deletion).
+    Przy równych wynikach wygrywa tytuł odkryty wcześniej, jak w BFS.
+    Kolejka jest w całości w pamięci.
+    """
+
+    def __init__(self, items=(), scorer=None):
+        self.scorer = scorer or LinkScorer()
+        self._heap = []
+        # tytuł -> [głębokość, linki, najlepsza pozycja, wynik, numer odkrycia]
+        self._pending = {}
+        self._sequence = itertools.count()
+        for item in items:
+            title, depth = item[0], item[1]
+            inlinks, position = (item[2], item[3]) if len(item) > 3 else (1, 0.0)
+            self._add(title, depth, inlinks, position)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __bool__(self):
+        return bool(self._pending)
+
+    def _add(self, title, depth, inlinks, position, sequence=None):
+        score = self.scorer(title, depth, inlinks, position)
+        if score is None:
+            self._pending.pop(title, None)
+            return
+        if sequence is None:
+            sequence = next(self._sequence)
+        self._pending[title] = [depth, inlinks, position, score, sequence]
+        heapq.heappush(self._heap, (-score, sequence, title))
+        if len(self._heap) > 2 * len(self._pending) + 1024:
+            # Usuń nieaktualne wpisy, żeby kopiec nie rósł z każdym linkiem
+            self._heap = [(-entry[3], entry[4], t) for t, entry in self._pending.items()]
+            heapq.heapify(self._heap)
+
+    def push(self, title, depth, position=0.0):
+        self._add(title, depth, 1, position)
+
+    def relink(self, title, position=0.0):
+        entry = self._pending.get(title)
+        if entry is not None:
+            depth, inlinks, best_position, _, sequence = entry
+            self._add(title, depth, inlinks + 1, min(best_position, position), sequence)
+
+    def popleft(self):
+        """Zdejmuje (tytuł, głębokość) o najwyższym wyniku."""
+        while True:
+            negative_score, sequence, title = heapq.heappop(self._heap)
+            entry = self._pending.get(title)
+            if entry is not None and entry[3] == -negative_score and entry[4] == sequence:
+                del self._pending[title]
+                return title, entry[0]
+
+    def __iter__(self):
+        """Pozycje (tytuł, głębokość, linki, pozycja) od najwyższego wyniku - do punktu kontrolnego."""
+        for title, entry in sorted(self._pending.items(), key=lambda item: (-item[1][3], item[1][4])):
+            yield title, entry[0], entry[1], entry[2]
+
+    def close(self):
+        pass
@@ -1,3 +1,8 @@
+import os
+import json
+import hashlib
+import numpy as np
+
 def lang_confidence_score(word_counts, language_words_with_frequency):
     """
     Oblicza stopień pewności języka na podstawie pokrycia słów.
@@ -23,3 +28,94 @@ def lang_confidence_score(word_counts, language_words_with_frequency):
     # Zwróć procent pokrycia
     coverage_score = (covered_count / total_words) * 100
     return coverage_score
+
+DEFAULT_TOP_K = 1000
+LANGUAGE_CACHE_PREFIX = "languages"
+
+def available_detection_languages():
+    """Języki, dla których wordfreq ma listę słów (posortowane kody)."""
+    from wordfreq import available_languages
+    return sorted(available_languages('best'))
+
+class LanguageDetector:
+    """
+    Rozpoznaje język liczników słów, oceniając je naraz względem wielu języków.
+
+    Dla każdego języka brane jest top-k słów z wordfreq (jak w lang_confidence_score);
+    słowa wszystkich języków tworzą wspólny słownik, a przynależność słowa do
+    top-k języka to macierz [język, słowo]. Pokrycie dla wszystkich języków to
+    wtedy jedno mnożenie macierzy przez wektor liczników.
+
+    Przy podanym `cache_dir` macierz jest zapisywana w pliku .npz i wczytywana
+    przy kolejnych uruchomieniach zamiast budowania list słów od nowa.
+    """
+
+    def __init__(self, languages=None, k=DEFAULT_TOP_K, cache_dir=None):
+        self.languages = list(languages) if languages else available_detection_languages()
+        self.k = k
+        self.cache_path = os.path.join(cache_dir, self._cache_name()) if cache_dir else None
+        if self.cache_path and os.path.exists(self.cache_path):
+            self._load()
+        else:
+            self._build()
+            if self.cache_path:
+                self._save()
+        import pandas as pd
+        self._word_index = pd.Index(self.vocabulary)
+
+    def _cache_name(self):
+        from importlib.metadata import version
+        key = json.dumps([self.languages, self.k, version('wordfreq')])
+        return f"{LANGUAGE_CACHE_PREFIX}-k{self.k}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.npz"
+
+    def _build(self):
+        from wordfreq import top_n_list
+        top_words = [top_n_list(lang, self.k) for lang in self.languages]
+        self.vocabulary = sorted(set().union(*top_words))
+        positions = {word: i for i, word in enumerate(self.vocabulary)}
+        self.membership = np.zeros((len(self.languages), len(self.vocabulary)), dtype=np.int64)
+        for row, words in enumerate(top_words):
+            self.membership[row, [positions[word] for word in words]] = 1
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, languages=np.array(self.languages), vocabulary=np.array(self.vocabulary),
+                            membership=self.membership.astype(np.bool_))
+        os.replace(tmp_path, self.cache_path)
+
+    def _load(self):
+        with np.load(self.cache_path) as data:
+            self.vocabulary = data['vocabulary'].tolist()
+            self.membership = data['membership'].astype(np.int64)
+
+    def count_vector(self, word_counts):
+        """Liczniki słów ułożone według wspólnego słownika (słowa spoza niego pomijane)."""
+        items = list(word_counts.items())
+        vector = np.zeros(len(self.vocabulary), dtype=np.int64)
+        if not items:
+            return vector
+        positions = self._word_index.get_indexer([word for word, _ in items])
+        counts = np.fromiter((count for _, count in items), dtype=np.int64, count=len(items))
+        known = positions >= 0
+        vector[positions[known]] = counts[known]
+        return vector
+
+    def scores(self, word_counts):
+        """
+        Pokrycie (0-100) dla każdego języka, identyczne z lang_confidence_score
+        dla zbioru top-k słów tego języka. Zwraca słownik język -> score.
+        """
+        total_words = sum(count for _, count in word_counts.items()) if word_counts else 0
+        if total_words == 0:
+            return {lang: 0.0 for lang in self.languages}
+        covered = self.membership @ self.count_vector(word_counts)
+        return {lang: (int(c) / total_words) * 100 for lang, c in zip(self.languages, covered)}
+
+    def detect(self, word_counts, top=None):
+        """
+        Zwraca listę par (język, score) od najlepiej dopasowanego języka
+        (przy remisie w kolejności self.languages), opcjonalnie tylko `top` pierwszych.
+        """
+        ranked = sorted(self.scores(word_counts).items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top] if top is not None else ranked
@@ -0,0 +1,183 @@
+import os
+import time
+import gzip
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+from fetcher import FetchError
+from titles import canonical_title
+from profiling import span
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+CacheEntry = namedtuple('CacheEntry', ['html', 'etag', 'last_modified', 'fetched_at'])
+
+def normalize_cache_key(title):
+    """Klucz cache dla tytułu artykułu: jego kanoniczna postać (jak w MediaWiki)."""
+    return canonical_title(title)
+
+class PageCache:
+    """
+    Trwały cache stron HTML na dysku.
+
+    Treść stron trzymana jest skompresowana (gzip) w plikach adresowanych
+    skrótem SHA-256 treści, a indeks SQLite wiąże znormalizowany tytuł
+    artykułu z plikiem i walidatorami HTTP (ETag / Last-Modified).
+    Wpisy starsze niż `ttl` są rewalidowane żądaniem warunkowym, a po
+    przekroczeniu `max_bytes` usuwane są najdawniej używane strony (LRU).
+    """
+
+    def __init__(self, directory, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+        """
+        Args:
+            directory: Katalog cache (tworzony, jeśli nie istnieje)
+            ttl: Czas (w sekundach), przez który strona jest używana bez rewalidacji
+            max_bytes: Limit rozmiaru skompresowanych stron na dysku
+            offline: Czy serwować strony wyłącznie z cache, bez dostępu do sieci
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY, url TEXT, digest TEXT, size INTEGER,"
+            " etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+        self._db.commit()
+        self._total_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM pages)"
+        ).fetchone()[0]
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.html.gz")
+
+    def lookup(self, key):
+        """Zwraca CacheEntry dla klucza albo None, jeśli strony nie ma w cache."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, etag, last_modified, fetched_at FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, etag, last_modified, fetched_at = row
+            try:
+                with span('decode'), gzip.open(self._object_path(digest), 'rb') as f:
+                    html = f.read().decode('utf-8')
+            except OSError:
+                self._delete(key, digest)
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return CacheEntry(html, etag, last_modified, fetched_at)
+
+    def is_fresh(self, entry):
+        """Czy wpis można użyć bez rewalidacji."""
+        return time.time() - entry.fetched_at < self.ttl
+
+    def store(self, key, url, html, etag=None, last_modified=None):
+        """Zapisuje stronę w cache i w razie potrzeby usuwa najdawniej używane wpisy."""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+
+            old = self._db.execute("SELECT digest FROM pages WHERE key = ?", (key,)).fetchone()
+            if old is not None and old[0] != digest:
+                self._delete(key, old[0])
+            if not self._has_digest(digest):
+                self._total_bytes += size
+
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (key, url, digest, size, etag, last_modified, fetched_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, digest, size, etag, last_modified, now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def touch(self, key):
+        """Oznacza wpis jako świeży po udanej rewalidacji (HTTP 304)."""
+        with self._lock:
+            now = time.time()
+            self._db.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._db.commit()
+
+    def _has_digest(self, digest):
+        return self._db.execute("SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)).fetchone() is not None
+
+    def _delete(self, key, digest):
+        self._db.execute("DELETE FROM pages WHERE key = ?", (key,))
+        if not self._has_digest(digest):
+            path = self._object_path(digest)
+            if os.path.exists(path):
+                self._total_bytes -= os.path.getsize(path)
+                os.remove(path)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            row = self._db.execute("SELECT key, digest FROM pages ORDER BY accessed_at LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._delete(*row)
+
+    def get_html(self, key, url, fetcher):
+        """
+        Zwraca HTML strony z cache, rewalidując go warunkowo (If-None-Match /
+        If-Modified-Since), gdy wpis jest starszy niż TTL. W trybie offline
+        nie wysyła żadnych żądań. Rzuca FetchError, gdy strony nie da się pobrać.
+        """
+        entry = self.lookup(key)
+        if self.offline:
+            if entry is None:
+                raise FetchError(url, "not in cache (offline mode)")
+            return entry.html
+        if entry is not None and self.is_fresh(entry):
+            return entry.html
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = fetcher.fetch(url, headers=headers or None)
+        if response.status_code == 304 and entry is not None:
+            self.touch(key)
+            return entry.html
+
+        with span('decode'):
+            html = response.text
+        with span('persist'):
+            self.store(key, url, html, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return html
+
+_default_cache = None
+
+def configure_default_cache(directory, **kwargs):
+    """Włącza cache stron dla całego procesu (np. z opcji CLI)."""
+    global _default_cache
+    _default_cache = PageCache(directory, **kwargs)
+    return _default_cache
+
+def get_default_cache():
+    """Zwraca domyślny cache stron albo None, jeśli cache jest wyłączony."""
+    return _default_cache
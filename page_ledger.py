@@ -0,0 +1,124 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import Counter, namedtuple
+from profiling import span
+
+DEFAULT_LEDGER_FILE = "word-counts.pages.sqlite"
+
+PageRecord = namedtuple('PageRecord', ['digest', 'etag', 'last_modified', 'counts', 'links'])
+
+def content_digest(html):
+    """Skrót SHA-1 treści strony (do wykrywania zmian między crawlami)."""
+    return hashlib.sha1(html.encode('utf-8')).hexdigest()
+
+def count_delta(old, new):
+    """
+    Różnica new - old jako Counter, który może zawierać wartości ujemne
+    (Counter.__sub__ je odrzuca). Słowa bez zmian są pomijane.
+    """
+    delta = Counter(new)
+    delta.subtract(old)
+    return Counter({word: count for word, count in delta.items() if count})
+
+class LedgerError(Exception):
+    """Księga stron nie pasuje do liczników słów w magazynie."""
+
+class PageLedger:
+    """
+    Księga stron policzonych przy poprzednich crawlach (SQLite obok word-counts.json).
+
+    Dla każdego artykułu (tytuł kanoniczny) trzyma skrót treści, walidatory
+    HTTP (ETag / Last-Modified), liczniki słów, które strona wniosła do sumy,
+    i jej linki (None, jeśli strona była liściem i linków nie wyciągano).
+    Dzięki temu ponowny crawl może pominąć niezmienione strony, a dla
+    zmienionych dodać do sumy tylko różnicę (count_delta).
+
+    Zmiany są buforowane i trafiają do bazy przy commit(), które Crawler
+    wywołuje zaraz po zapisie magazynu liczników, razem z sumą i sumą
+    kontrolną liczników po tym zapisie. verify() porównuje je z magazynem
+    przed crawlem: różnica oznacza, że liczniki zmieniły się poza księgą
+    (np. crawl przerwany między zapisem magazynu a commit()), i przeliczenie
+    przyrostowe policzyłoby część stron drugi raz. Księgę warto zacząć razem z pustym word-counts.json -
+    strony policzone wcześniej bez niej zostałyby dodane drugi raz.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_FILE, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self.pending = {}
+        self._last_commit = time.monotonic()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " title TEXT PRIMARY KEY, digest TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+            " counts TEXT NOT NULL, links TEXT)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+    def get(self, title):
+        """PageRecord dla tytułu (także niezapisany jeszcze w bazie) albo None."""
+        with self._lock:
+            record = self.pending.get(title)
+            if record is not None:
+                return record
+            row = self._db.execute(
+                "SELECT digest, etag, last_modified, counts, links FROM pages WHERE title = ?", (title,)
+            ).fetchone()
+        if row is None:
+            return None
+        digest, etag, last_modified, counts, links = row
+        return PageRecord(digest, etag, last_modified, Counter(json.loads(counts)),
+                          json.loads(links) if links is not None else None)
+
+    def put(self, title, record):
+        with self._lock:
+            self.pending[title] = record
+
+    def due(self):
+        """Czy minął interwał od ostatniego zapisu."""
+        return self.interval is not None and time.monotonic() - self._last_commit >= self.interval
+
+    def verify(self, store):
+        """
+        Sprawdza, czy zapisane liczniki magazynu to te z ostatniego commit()
+        (ta sama suma i suma kontrolna); jeśli nie, rzuca LedgerError.
+        Nowa księga (bez zapisanego stanu magazynu) przechodzi zawsze.
+        """
+        checksum = store.checksum()
+        with self._lock:
+            meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if 'store_total' not in meta:
+            return
+        if int(meta['store_total']) != store.flushed_total or int(meta['store_checksum']) != checksum:
+            raise LedgerError(
+                f"word counts (total {store.flushed_total}) are not the ones page ledger {self.path} "
+                f"recorded (total {meta['store_total']}); they changed without the ledger, "
+                f"remove both to recount from scratch"
+            )
+
+    def commit(self, store):
+        """Zapisuje zbuforowane wpisy i stan zapisanych liczników magazynu w jednej transakcji."""
+        with self._lock:
+            with span('persist'), self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO pages (title, digest, etag, last_modified, counts, links)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    ((title, record.digest, record.etag, record.last_modified,
+                      json.dumps(record.counts, ensure_ascii=False, separators=(',', ':')),
+                      json.dumps(record.links, ensure_ascii=False) if record.links is not None else None)
+                     for title, record in self.pending.items())
+                )
+                self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                     [('store_total', str(store.flushed_total)),
+                                      ('store_checksum', str(store.checksum()))])
+            self.pending = {}
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        """Zamyka bazę bez zapisu zbuforowanych wpisów (zapisuje je commit())."""
+        self._db.close()
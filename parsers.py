@@ -0,0 +1,55 @@
+import importlib.util
+
+# Nazwa backendu BeautifulSoup -> moduł, którego wymaga (None = biblioteka standardowa)
+PARSER_BACKENDS = {
+    'html.parser': None,
+    'lxml': 'lxml',
+    'html5lib': 'html5lib',
+}
+DEFAULT_PARSER = 'html.parser'
+
+_default_parser = DEFAULT_PARSER
+
+def available_parsers():
+    """Zwraca listę backendów, których biblioteki są zainstalowane."""
+    return [name for name, module in PARSER_BACKENDS.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+def set_default_parser(name):
+    """Ustawia backend używany przez make_soup, gdy nie podano go jawnie."""
+    global _default_parser
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser '{name}', choose one of: {', '.join(PARSER_BACKENDS)}")
+    if name not in available_parsers():
+        raise ValueError(f"Parser '{name}' is not installed (pip install {PARSER_BACKENDS[name]})")
+    _default_parser = name
+
+def get_default_parser():
+    return _default_parser
+
+def make_soup(html, parser=None):
+    """Parsuje HTML wybranym (lub domyślnym) backendem i zwraca obiekt BeautifulSoup."""
+    from bs4 import BeautifulSoup
+    from profiling import span
+    with span('parse'):
+        return BeautifulSoup(html, parser or _default_parser)
+
+def walk_content(element, skip_tags=()):
+    """
+    Przechodzi drzewo pod `element` w kolejności dokumentu, zwracając tagi
+    i napisy, ale pomijając całe poddrzewa tagów z `skip_tags`.
+    Nie modyfikuje drzewa, więc ta sama strona może być użyta wielokrotnie.
+    """
+    from bs4 import Tag
+    stack = [iter(element.contents)]
+    while stack:
+        for child in stack[-1]:
+            if isinstance(child, Tag):
+                if child.name in skip_tags:
+                    continue
+                yield child
+                stack.append(iter(child.contents))
+                break
+            yield child
+        else:
+            stack.pop()
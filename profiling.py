@@ -0,0 +1,231 @@
+import os
+import json
+import math
+import time
+import random
+import functools
+import threading
+
+# Etapy mierzone w programie (inne nazwy też są dozwolone)
+STAGES = ('fetch', 'decode', 'parse', 'extract', 'count', 'merge', 'persist')
+
+class _NullSpan:
+    """Span, który nic nie robi - zwracany, gdy profilowanie jest wyłączone."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'started')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, self.started, time.perf_counter())
+        return False
+
+def percentile(sorted_values, fraction):
+    """Percentyl metodą najbliższej rangi z posortowanej listy (0 dla pustej)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+# Rozmiar próbki czasów jednego etapu, z której liczone są percentyle
+SAMPLE_SIZE = 4096
+
+class StageStats:
+    """
+    Statystyki jednego etapu w stałej pamięci: dokładna liczba i suma czasów
+    oraz próbka co najwyżej `size` czasów (reservoir sampling, algorytm R).
+    Do `size` spanów próbka zawiera wszystkie czasy, więc percentyle są dokładne.
+    """
+    __slots__ = ('count', 'total', 'samples', 'size', '_random')
+
+    def __init__(self, size=SAMPLE_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.samples = []
+        self.size = size
+        self._random = random.Random(0)
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if len(self.samples) < self.size:
+            self.samples.append(duration)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.size:
+                self.samples[index] = duration
+
+class Profiler:
+    """
+    Zbiera czasy etapów (spany), liczbę stron i przesłane bajty.
+
+    Czasy spanów są inkluzywne: np. 'persist' wywołany z 'merge' liczy się
+    w obu etapach. Pamięć nie rośnie z długością crawla: dla etapu trzymane
+    są tylko StageStats. Przy podanym `trace_path` pojedyncze zdarzenia są
+    od razu dopisywane do pliku w formacie Chrome trace (chrome://tracing,
+    Perfetto); plik domyka close(). Bezpieczny dla wątków.
+    """
+
+    def __init__(self, trace_path=None, sample_size=SAMPLE_SIZE):
+        self.stages = {}
+        self.sample_size = sample_size
+        self.pages = 0
+        self.bytes_transferred = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._trace = None
+        self._trace_events = 0
+        if trace_path is not None:
+            self._trace = open(trace_path, 'w', encoding='utf-8')
+            self._trace.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def record(self, name, started, finished):
+        duration = finished - started
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats(self.sample_size)
+            stats.add(duration)
+            if self._trace is not None:
+                self._write_event(name, started, duration)
+
+    def _write_event(self, name, started, duration):
+        """Dopisuje zdarzenie 'X' (czas w mikrosekundach) do pliku śladu."""
+        event = {'name': name, 'cat': 'wiki', 'ph': 'X', 'pid': self._pid, 'tid': threading.get_ident(),
+                 'ts': (started - self.started) * 1e6, 'dur': duration * 1e6}
+        self._trace.write((',\n' if self._trace_events else '') + json.dumps(event))
+        self._trace_events += 1
+
+    def samples(self, name):
+        """Próbka czasów etapu `name` (w sekundach; pusta, gdy etapu nie mierzono)."""
+        with self._lock:
+            stats = self.stages.get(name)
+            return list(stats.samples) if stats is not None else []
+
+    def count_page(self, pages=1):
+        with self._lock:
+            self.pages += pages
+
+    def add_bytes(self, count):
+        with self._lock:
+            self.bytes_transferred += count
+
+    def as_dict(self):
+        """Podsumowanie: dla każdego etapu liczba, suma i percentyle (w ms)."""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            measured = {name: (stats.count, stats.total, sorted(stats.samples))
+                        for name, stats in self.stages.items()}
+            pages, transferred = self.pages, self.bytes_transferred
+        stages = {}
+        for name in sorted(measured, key=lambda n: (STAGES.index(n) if n in STAGES else len(STAGES), n)):
+            count, total, values = measured[name]
+            stages[name] = {
+                'count': count,
+                'total_ms': total * 1000,
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+            }
+        return {
+            'elapsed_s': elapsed,
+            'pages': pages,
+            'pages_per_s': pages / elapsed if elapsed > 0 else 0.0,
+            'bytes_transferred': transferred,
+            'stages': stages,
+        }
+
+    def report(self):
+        """Raport tekstowy (tabela etapów i podsumowanie)."""
+        summary = self.as_dict()
+        lines = [f"{'stage':<10} {'count':>7} {'total ms':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for name, stage in summary['stages'].items():
+            lines.append(f"{name:<10} {stage['count']:>7} {stage['total_ms']:>10.1f} {stage['p50_ms']:>9.2f} "
+                         f"{stage['p95_ms']:>9.2f} {stage['p99_ms']:>9.2f}")
+        lines.append(f"pages: {summary['pages']} in {summary['elapsed_s']:.2f} s "
+                     f"({summary['pages_per_s']:.2f} pages/s), transferred: {summary['bytes_transferred']} B")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=4)
+
+    def close(self):
+        """Domyka plik śladu (jeśli był), żeby był poprawnym JSON-em."""
+        with self._lock:
+            if self._trace is not None:
+                self._trace.write('\n]}\n')
+                self._trace.close()
+                self._trace = None
+
+_profiler = None
+
+def enable_profiling(trace_path=None):
+    """Włącza profilowanie w procesie i zwraca nowy Profiler (ślad do `trace_path`, jeśli podano)."""
+    global _profiler
+    _profiler = Profiler(trace_path=trace_path)
+    return _profiler
+
+def disable_profiling():
+    """Wyłącza profilowanie i domyka plik śladu aktywnego Profilera."""
+    global _profiler
+    if _profiler is not None:
+        _profiler.close()
+    _profiler = None
+
+def get_profiler():
+    """Zwraca aktywny Profiler albo None, gdy profilowanie jest wyłączone."""
+    return _profiler
+
+def span(name):
+    """
+    Kontekst mierzący etap `name`. Przy wyłączonym profilowaniu zwraca
+    współdzielony pusty obiekt, więc koszt to jedno wywołanie funkcji.
+    """
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name)
+
+def timed(name):
+    """Dekorator mierzący każde wywołanie funkcji jako span `name`."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count_page(pages=1):
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count_page(pages)
+
+def add_bytes(count):
+    profiler = _profiler
+    if profiler is not None:
+        profiler.add_bytes(count)
@@ -0,0 +1,252 @@
+import os
+import json
+import stat
+import time
+import socket
+import threading
+import socketserver
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from utils import Scraper
+from page_cache import normalize_cache_key
+from fetcher import get_default_fetcher
+
+DEFAULT_SERVICE_PORT = 8765
+DEFAULT_LRU_PAGES = 256
+DEFAULT_LRU_TTL = 300.0
+
+class ParsedPage:
+    """Sparsowana strona w ParsedPageLRU wraz z wynikami już policzonymi dla niej."""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.loaded_at = time.monotonic()
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def result(self, key, compute):
+        """Wynik compute() zapamiętany pod kluczem (np. ('table', 2, True, False))."""
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+        value = compute()
+        with self._lock:
+            return self._results.setdefault(key, value)
+
+class ParsedPageLRU:
+    """
+    Cache LRU sparsowanych stron (Scraper z gotowym drzewem) dla trybu usługi.
+
+    Trzyma najwyżej `max_pages` stron, każdą najwyżej `ttl` sekund. Równoczesne
+    żądania tej samej strony są łączone (request coalescing): pierwsze ją
+    pobiera i parsuje, pozostałe czekają na jego wynik, więc strona jest
+    pobierana i parsowana raz. Strony, których nie udało się pobrać, nie są
+    zapamiętywane. Bezpieczny dla wątków.
+    """
+
+    def __init__(self, base_url, max_pages=DEFAULT_LRU_PAGES, ttl=DEFAULT_LRU_TTL, fetcher=None):
+        self.base_url = base_url
+        self.max_pages = max_pages
+        self.ttl = ttl
+        self.fetcher = fetcher
+        self._pages = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, phrase):
+        """Zwraca ParsedPage dla frazy; scraper.soup jest None, jeśli strony nie udało się pobrać."""
+        key = normalize_cache_key(phrase)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None and time.monotonic() - page.loaded_at < self.ttl:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            if page is not None:
+                del self._pages[key]
+                self.evictions += 1
+            loading = self._loading.get(key)
+            owner = loading is None
+            if owner:
+                self.misses += 1
+                loading = self._loading[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return loading.result()
+
+        try:
+            page = ParsedPage(Scraper(self.base_url, key, fetcher=self.fetcher))
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[key]
+            if page.scraper.soup is not None:
+                self._pages[key] = page
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+                    self.evictions += 1
+        loading.set_result(page)
+        return page
+
+    def stats(self):
+        with self._lock:
+            return {'pages': len(self._pages), 'max_pages': self.max_pages, 'ttl_s': self.ttl,
+                    'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced,
+                    'evictions': self.evictions}
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Obsługuje żądania usługi (odpowiedzi w JSON, tabele także w CSV):
+      GET /summary?phrase=...
+      GET /table?phrase=...&number=N[&header=1][&typed=1][&format=csv|json]
+      GET /count-words?phrase=...[&limit=N]
+      GET /stats
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+        routes = {'/summary': self.summary, '/table': self.table, '/count-words': self.count_words,
+                  '/stats': self.stats}
+        route = routes.get(url.path)
+        if route is None:
+            self.send_json(404, {'error': f"Unknown endpoint {url.path}"})
+            return
+        try:
+            route(params)
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {'error': f"Bad request: {e}"})
+        except Exception as e:
+            self.send_json(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def load(self, params):
+        """ParsedPage dla parametru 'phrase' albo None (odpowiedź 404 już wysłana)."""
+        phrase = params['phrase']
+        page = self.server.pages.get(phrase)
+        if page.scraper.soup is None:
+            self.send_json(404, {'phrase': phrase, 'error': "Could not load page."})
+            return None
+        return page
+
+    def summary(self, params):
+        page = self.load(params)
+        if page is None:
+            return
+        summary = page.result(('summary',), page.scraper.get_summary)
+        if summary.startswith("Error: "):
+            self.send_json(404, {'phrase': params['phrase'], 'error': summary[len("Error: "):]})
+            return
+        self.send_json(200, {'phrase': params['phrase'], 'summary': summary})
+
+    def table(self, params):
+        number = int(params['number'])
+        header = params.get('header', '0') == '1'
+        typed = params.get('typed', '0') == '1'
+        output_format = params.get('format', 'csv')
+        if output_format not in ('csv', 'json'):
+            raise ValueError(f"unknown format '{output_format}'")
+        page = self.load(params)
+        if page is None:
+            return
+        tables = page.result(('tables',), page.scraper.get_tables)
+        if not 1 <= number <= len(tables):
+            self.send_json(404, {'phrase': params['phrase'],
+                                 'error': f"Table {number} not found (page has {len(tables)} tables)."})
+            return
+        try:
+            df = page.result(('table', number, header, typed),
+                             lambda: page.scraper.get_table(number, header, typed=typed))
+        except ValueError as e:
+            self.send_json(422, {'phrase': params['phrase'], 'error': f"Could not read table {number}: {e}"})
+            return
+        if output_format == 'json':
+            self.send_body(200, df.to_json(orient='split', index=False, force_ascii=False), 'application/json')
+        else:
+            self.send_body(200, df.to_csv(index=False), 'text/csv')
+
+    def count_words(self, params):
+        limit = int(params['limit']) if 'limit' in params else None
+        page = self.load(params)
+        if page is None:
+            return
+        counts = page.result(('count_words',), page.scraper.count_words)
+        words = counts.most_common(limit) if limit is not None else counts.items()
+        self.send_json(200, {'phrase': params['phrase'], 'total': sum(counts.values()), 'counts': dict(words)})
+
+    def stats(self, params):
+        fetcher = self.server.pages.fetcher or get_default_fetcher()
+        self.send_json(200, {'cache': self.server.pages.stats(), 'fetch': fetcher.stats.as_dict()})
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data, ensure_ascii=False), 'application/json')
+
+    def send_body(self, status, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+if hasattr(socket, 'AF_UNIX'):
+    class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """Serwer usługi na gnieździe Unix (bez warstwy TCP)."""
+        daemon_threads = True
+
+        def get_request(self):
+            request, _ = super().get_request()
+            # BaseHTTPRequestHandler oczekuje adresu klienta w postaci (host, port)
+            return request, ('unix', 0)
+
+def make_service(base_url, host='127.0.0.1', port=DEFAULT_SERVICE_PORT, socket_path=None,
+                 max_pages=DEFAULT_LRU_PAGES, ttl=DEFAULT_LRU_TTL, fetcher=None):
+    """
+    Tworzy serwer usługi (TCP albo gniazdo Unix pod `socket_path`) ze wspólnym
+    ParsedPageLRU; wywołujący uruchamia serve_forever() i zamyka go server_close().
+    """
+    if socket_path:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError("Unix sockets are not supported on this platform")
+        if os.path.exists(socket_path):
+            # Only a stale socket from an earlier run is removed, never a regular file
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise ValueError(f"{socket_path} exists and is not a socket")
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, ServiceHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+        server.daemon_threads = True
+    server.pages = ParsedPageLRU(base_url, max_pages, ttl, fetcher)
+    return server
+
+def run_service(base_url, host='127.0.0.1', port=DEFAULT_SERVICE_PORT, socket_path=None,
+                max_pages=DEFAULT_LRU_PAGES, ttl=DEFAULT_LRU_TTL):
+    """Uruchamia usługę i obsługuje żądania do przerwania (Ctrl+C)."""
+    server = make_service(base_url, host, port, socket_path, max_pages, ttl)
+    if socket_path:
+        print(f"Serving on unix socket {socket_path}")
+    else:
+        host, port = server.server_address[:2]
+        print(f"Serving on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,104 @@
+import gzip
+import json
+import heapq
+from frontier import title_key
+from count_store import atomic_write_text
+
+SHARD_HEADER = "# wiki-scraper word-count shard v1"
+
+def parse_shard_spec(text):
+    """
+    Zamienia "K/N" na krotkę (K, N) - węzeł K (od 0) z N węzłów.
+    Rzuca ValueError dla niepoprawnego zapisu.
+    """
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"invalid shard '{text}', expected K/N, e.g. 0/4") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"invalid shard '{text}', K must be between 0 and N-1")
+    return index, count
+
+def shard_of(title, shard_count):
+    """
+    Numer węzła, do którego należy tytuł. Deterministyczny na każdej maszynie
+    i w każdym procesie (blake2b, nie hash() z losowym ziarnem).
+    """
+    return title_key(title) % shard_count
+
+def _open_text(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def default_shard_path(shard):
+    index, count = shard
+    return f"word-counts.shard-{index}-of-{count}.tsv"
+
+def shard_store_path(shard):
+    """Plik JSON, w którym crawl węzła K/N liczy słowa (osobno od word-counts.json)."""
+    index, count = shard
+    return f"word-counts.shard-{index}-of-{count}.json"
+
+def write_shard(path, counts, shard=None):
+    """
+    Zapisuje liczniki jako shard: nagłówek i linie "słowo<TAB>liczba"
+    posortowane po słowie (pliki .gz są kompresowane). Zapis jest atomowy.
+    Posortowane shardy można scalać strumieniowo (merge_shards).
+    """
+    header = SHARD_HEADER + (f" {shard[0]}/{shard[1]}" if shard else "")
+
+    def write(f):
+        f.write(header + "\n")
+        f.writelines(f"{word}\t{count}\n" for word, count in sorted(counts.items()) if count)
+
+    atomic_write_text(path, write, compress=path.endswith('.gz'))
+
+def read_shard(path):
+    """Generator par (słowo, liczba) z pliku sharda; sprawdza, czy plik jest posortowany."""
+    previous = None
+    with _open_text(path, 'r') as f:
+        first = f.readline()
+        if not first.startswith(SHARD_HEADER):
+            raise ValueError(f"{path} is not a word-count shard")
+        for line_number, line in enumerate(f, start=2):
+            word, _, count = line.rstrip('\n').rpartition('\t')
+            if previous is not None and word <= previous:
+                raise ValueError(f"{path}:{line_number}: shard is not sorted by word")
+            previous = word
+            yield word, int(count)
+
+def iter_merged_counts(paths):
+    """
+    Scala posortowane shardy k-drożnie (heapq.merge) i zwraca kolejne pary
+    (słowo, suma liczników) w kolejności słów. W pamięci jest po jednej
+    linii z każdego sharda.
+    """
+    current, total = None, 0
+    for word, count in heapq.merge(*(read_shard(path) for path in paths)):
+        if word != current:
+            if current is not None:
+                yield current, total
+            current, total = word, 0
+        total += count
+    if current is not None:
+        yield current, total
+
+def merge_shards(paths, output_path):
+    """
+    Scala shardy do pliku w formacie word-counts.json (zapis strumieniowy
+    i atomowy). Zwraca (liczba różnych słów, suma liczników).
+    """
+    summary = {'words': 0, 'total': 0}
+
+    def write(f):
+        f.write("{")
+        for word, count in iter_merged_counts(paths):
+            f.write(",\n" if summary['words'] else "\n")
+            f.write(f"    {json.dumps(word, ensure_ascii=False)}: {count}")
+            summary['words'] += 1
+            summary['total'] += count
+        f.write("\n}" if summary['words'] else "}")
+
+    atomic_write_text(output_path, write)
+    return summary['words'], summary['total']
@@ -0,0 +1,138 @@
+import importlib.util
+
+MAX_SPAN = 1000
+
+def _span(cell, attribute):
+    """Wartość rowspan/colspan komórki jako liczba z zakresu 1..MAX_SPAN."""
+    try:
+        value = int(cell.get(attribute, 1))
+    except (TypeError, ValueError):
+        return 1
+    return min(max(value, 1), MAX_SPAN)
+
+def _cell_text(cell):
+    return cell.get_text(separator=" ", strip=True)
+
+def group_rows_by_table(soup):
+    """
+    Jednym przejściem po dokumencie przypisuje każdy wiersz <tr> do najbliższej
+    tabeli, w której leży. Zwraca słownik id(tabela) -> lista wierszy, dzięki
+    czemu wiersze tabel zagnieżdżonych nie trafiają do tabeli zewnętrznej.
+    """
+    rows = {}
+    for tr in soup.find_all('tr'):
+        table = tr.find_parent('table')
+        if table is not None:
+            rows.setdefault(id(table), []).append(tr)
+    return rows
+
+def expand_rows(rows):
+    """
+    Zamienia wiersze <tr> na listy tekstów komórek, rozwijając rowspan i colspan:
+    komórka łączona jest powtarzana w każdym polu siatki, które zajmuje,
+    więc kolumny pozostają wyrównane. Wiersze bez komórek są pomijane,
+    ale jak w przeglądarce zajmują wiersz siatki, więc skracają rowspan z wyższych wierszy.
+    """
+    pending = {}  # kolumna -> (pozostałe wiersze, tekst) dla rowspan z wierszy wyżej
+    result = []
+    for tr in rows:
+        cells = tr.find_all(['th', 'td'], recursive=False)
+        if not cells:
+            for column in list(pending):
+                _fill_pending([], pending, column)
+            continue
+        row = []
+        column = 0
+        for cell in cells:
+            while column in pending:
+                column = _fill_pending(row, pending, column)
+            text = _cell_text(cell)
+            rowspan, colspan = _span(cell, 'rowspan'), _span(cell, 'colspan')
+            for _ in range(colspan):
+                row.append(text)
+                pending.pop(column, None)
+                if rowspan > 1:
+                    pending[column] = (rowspan - 1, text)
+                column += 1
+        while pending and column <= max(pending):
+            if column in pending:
+                column = _fill_pending(row, pending, column)
+            else:
+                row.append("")
+                column += 1
+        result.append(row)
+    return result
+
+def _fill_pending(row, pending, column):
+    remaining, text = pending[column]
+    row.append(text)
+    if remaining > 1:
+        pending[column] = (remaining - 1, text)
+    else:
+        del pending[column]
+    return column + 1
+
+def flat_rows(table):
+    """
+    Dawny sposób odczytu: wszystkie <tr> pod tabelą (także zagnieżdżone),
+    komórki bez rozwijania rowspan/colspan.
+    """
+    rows = []
+    for tr in table.find_all('tr'):
+        row_data = [_cell_text(cell) for cell in tr.find_all(['th', 'td'])]
+        if row_data:
+            rows.append(row_data)
+    return rows
+
+def rows_to_dataframe(rows, first_row_is_header=True, typed=False):
+    """
+    Buduje DataFrame z list komórek, dopełniając krótsze wiersze pustymi polami.
+    Przy `typed` kolumny liczbowe są konwertowane (patrz convert_column_types).
+    """
+    import pandas as pd
+    max_columns = max((len(row) for row in rows), default=0)
+    normalized_rows = [row + [""] * (max_columns - len(row)) for row in rows]
+
+    if first_row_is_header and normalized_rows:
+        df = pd.DataFrame(normalized_rows[1:], columns=normalized_rows[0])
+    else:
+        df = pd.DataFrame(normalized_rows)
+
+    if typed:
+        convert_column_types(df)
+    return df
+
+def convert_column_types(df):
+    """
+    Zamienia w miejscu kolumny, w których każda niepusta wartość jest liczbą,
+    na typ liczbowy: Int64 dla liczb całkowitych, float64 dla pozostałych.
+    Puste pola stają się brakami (NA). Kolumny tekstowe zostają bez zmian.
+    """
+    import pandas as pd
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        values = column.where(column.astype(str).str.strip() != "")
+        present = values.notna()
+        if not present.any():
+            continue
+        numbers = pd.to_numeric(values, errors='coerce')
+        if numbers[present].isna().any():
+            continue
+        if (numbers[present] % 1 == 0).all():
+            numbers = numbers.astype('Int64')
+        df.isetitem(position, numbers)
+    return df
+
+def parse_table_numbers(text):
+    """Zamienia '1,3,5' na [1, 3, 5]; numery tabel liczone są od 1."""
+    numbers = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part.isdigit() or int(part) < 1:
+            raise ValueError(f"invalid table number '{part}' (expected positive integers like 1,3,5)")
+        numbers.append(int(part))
+    return numbers
+
+def parquet_available():
+    """Czy zainstalowano silnik zapisu Parquet dla pandas (pyarrow albo fastparquet)."""
+    return any(importlib.util.find_spec(module) is not None for module in ('pyarrow', 'fastparquet'))
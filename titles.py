@@ -0,0 +1,75 @@
+import os
+import json
+import urllib.parse
+from count_store import atomic_write_json
+
+WIKI_PATH_PREFIX = '/wiki/'
+
+def canonical_title(title):
+    """
+    Sprowadza tytuł artykułu do postaci kanonicznej, tak jak robi to MediaWiki:
+    dekoduje %XX, zamienia '_' na spacje, usuwa kotwicę (#...), scala białe
+    znaki i zamienia pierwszą literę na wielką ("pikachu_%28anime%29#Moves"
+    -> "Pikachu (anime)").
+    """
+    if '%' in title:
+        title = urllib.parse.unquote(title)
+    title = title.split('#', 1)[0].replace('_', ' ')
+    title = ' '.join(title.split())
+    if title:
+        title = title[0].upper() + title[1:]
+    return title
+
+def title_from_href(href):
+    """
+    Zwraca kanoniczny tytuł z linku '/wiki/...' albo None, jeśli link nie
+    prowadzi do zwykłego artykułu (strony specjalne, pliki, kategorie itp.).
+    Linki z protokołem lub hostem (np. do Wikipedii) prowadzą poza wiki.
+    """
+    url = urllib.parse.urlsplit(href)
+    if url.scheme or url.netloc or not url.path.startswith(WIKI_PATH_PREFIX):
+        return None
+    title = canonical_title(url.path[len(WIKI_PATH_PREFIX):])
+    if not title or ':' in title:
+        return None
+    return title
+
+def dedupe_titles(titles):
+    """Usuwa powtórzenia, zachowując kolejność pierwszego wystąpienia."""
+    return list(dict.fromkeys(titles))
+
+class RedirectMap:
+    """
+    Mapa przekierowań tytuł -> tytuł docelowy, opcjonalnie zapisywana w pliku JSON,
+    żeby kolejne crawle od razu wiedziały, że dwa tytuły to ten sam artykuł.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.redirects = {}
+        self.changed = False
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.redirects = json.load(f)
+
+    def add(self, source, target):
+        """Zapamiętuje przekierowanie (oba tytuły w postaci kanonicznej)."""
+        if source != target and self.redirects.get(source) != target:
+            self.redirects[source] = target
+            self.changed = True
+
+    def resolve(self, title):
+        """Zwraca tytuł docelowy, idąc po łańcuchu przekierowań (z ochroną przed pętlami)."""
+        seen = {title}
+        while title in self.redirects:
+            title = self.redirects[title]
+            if title in seen:
+                break
+            seen.add(title)
+        return title
+
+    def save(self):
+        """Zapisuje mapę do pliku, jeśli podano ścieżkę i coś się zmieniło."""
+        if self.path and self.changed:
+            atomic_write_json(self.path, self.redirects)
+            self.changed = False
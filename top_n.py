@@ -0,0 +1,26 @@
+import heapq
+
+def top_n_items(items, n):
+    """
+    Zwraca `n` par (klucz, wartość) o największych wartościach, malejąco.
+    Przy remisie zachowuje kolejność wejścia. Używa kopca (O(len * log n)),
+    więc nie sortuje całych danych i działa też na strumieniu par.
+
+    Args:
+        items: dict/Counter albo iterowalny zbiór par (klucz, wartość)
+        n (int): Liczba zwracanych pozycji (None = wszystkie)
+    """
+    if hasattr(items, 'items'):
+        items = items.items()
+    if n is None:
+        return sorted(items, key=lambda item: item[1], reverse=True)
+    # heapq.nlargest jest równoważne sorted(..., reverse=True)[:n], więc remisy są stabilne
+    return heapq.nlargest(n, items, key=lambda item: item[1])
+
+def top_n_counts(values, n):
+    """
+    Liczy wystąpienia wartości z pd.Series i zwraca `n` najczęstszych
+    (jak values.value_counts().head(n)), bez sortowania wszystkich
+    unikalnych wartości. Remisy w kolejności pierwszego wystąpienia.
+    """
+    return values.value_counts(sort=False).nlargest(n, keep='first')
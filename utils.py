@@ -1,8 +1,13 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import os
 import json
+import urllib.parse
+from fetcher import FetchError, get_default_fetcher
+from page_cache import normalize_cache_key, get_default_cache
+from parsers import make_soup
+from titles import title_from_href
+from top_n import top_n_counts
+from profiling import timed, span, count_page
+from tables import group_rows_by_table, expand_rows, flat_rows, rows_to_dataframe
 
 def string_to_windows_safe(text):
     unsafe_chars = r':<>"/\|?*'
@@ -11,31 +16,53 @@ def string_to_windows_safe(text):
         safe_text = safe_text.replace(char, '-')
     return safe_text
 
-def get_soup_from_url(url):
+def article_url(base_url, phrase):
     """
-    Pobiera treść strony z podanego adresu URL i zwraca obiekt BeautifulSoup.
+    Buduje adres artykułu z bazowego URL i frazy (spacje zamieniane na '_').
+    """
+    return f"{base_url}{phrase.replace(' ', '_')}"
+
+def get_html_from_url(url, fetcher=None, cache=None, cache_key=None):
     """
+    Pobiera HTML strony z podanego adresu URL przez współdzielony Fetcher.
+    Jeśli podano cache i klucz, strona jest najpierw szukana w cache.
+    Zwraca None, jeśli strony nie udało się pobrać.
+    """
+    fetcher = fetcher or get_default_fetcher()
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return BeautifulSoup(response.text, 'html.parser')
-    except requests.exceptions.RequestException:
+        if cache is not None and cache_key is not None:
+            return cache.get_html(cache_key, url, fetcher)
+        return fetcher.get_text(url)
+    except FetchError:
         return None
 
-def get_soup_from_file(filepath):
+def get_soup_from_url(url, fetcher=None, cache=None, cache_key=None, parser=None):
+    """
+    Pobiera treść strony z podanego adresu URL i zwraca obiekt BeautifulSoup.
+    """
+    html = get_html_from_url(url, fetcher, cache, cache_key)
+    if html is None:
+        return None
+    return make_soup(html, parser)
+
+def get_soup_from_file(filepath, parser=None):
     """
     Wczytuje HTML z pliku lokalnego i zwraca obiekt BeautifulSoup.
     """
     with open(filepath, 'r', encoding='utf-8') as f:
-        return BeautifulSoup(f.read(), 'html.parser')
+        return make_soup(f.read(), parser)
 
 class Scraper:
     """
     Scraper do pobierania danych z Bulbapedii.
     Wspiera zarówno pobieranie online jak i offline z plików HTML.
+
+    Strona jest parsowana raz, a podsumowanie, tabele, liczniki słów
+    i linki korzystają z tego samego drzewa (żadna z metod go nie zmienia).
     """
     
-    def __init__(self, base_url, phrase, use_local_html_file=False, html_file_path=None, html_content=None):
+    def __init__(self, base_url, phrase, use_local_html_file=False, html_file_path=None, html_content=None,
+                 fetcher=None, cache=None, parser=None):
         """
         Inicjalizuje scraper.
         
@@ -45,23 +72,36 @@ class Scraper:
             use_local_html_file: Czy czytać z pliku zamiast pobierać
             html_file_path: Ścieżka do pliku HTML (jeśli use_local_html_file=True)
             html_content: Bezpośrednia zawartość HTML jako string
+            fetcher: Fetcher do pobierania stron (domyślnie współdzielony w procesie)
+            cache: PageCache z pobranymi stronami (domyślnie skonfigurowany w procesie, o ile jest)
+            parser: Backend parsera HTML (np. 'lxml'; domyślnie ustawiony w module parsers)
         """
         self.base_url = base_url
         self.phrase = phrase
         self.use_local_html_file = use_local_html_file
         self.html_file_path = html_file_path
         self.html_content = html_content
+        self.fetcher = fetcher
+        self.cache = cache if cache is not None else get_default_cache()
+        self.parser = parser
         self.soup = None
+        self._tables = None
+        self._table_rows = None
+        self._word_counts = None
         
         # Załaduj HTML
         if self.html_content:
-            self.soup = BeautifulSoup(self.html_content, 'html.parser')
+            self.soup = make_soup(self.html_content, self.parser)
         elif self.use_local_html_file and self.html_file_path:
-            self.soup = get_soup_from_file(self.html_file_path)
+            self.soup = get_soup_from_file(self.html_file_path, self.parser)
         else:
-            url = f"{self.base_url}{self.phrase.replace(' ', '_')}"
-            self.soup = get_soup_from_url(url)
+            url = article_url(self.base_url, self.phrase)
+            self.soup = get_soup_from_url(url, self.fetcher, self.cache, normalize_cache_key(self.phrase),
+                                          self.parser)
+        if self.soup is not None:
+            count_page()
     
+    @timed('extract')
     def get_summary(self):
         """
         Pobiera pierwsze akapity ze strony.
@@ -75,46 +115,137 @@ class Scraper:
                 return text
         return "Error: No summary found."
     
-    def get_table(self, table_number, first_row_is_header=True):
+    @timed('extract')
+    def get_tables(self):
+        """
+        Zwraca listę wszystkich tabel strony (wyszukiwanych tylko raz).
+        """
+        if self._tables is None:
+            self._tables = self.soup.find_all('table') if self.soup else []
+        return self._tables
+
+    def count_words(self):
+        """
+        Zwraca Counter słów artykułu (liczony raz dla strony).
+        """
+        if self._word_counts is None:
+            from count import count_words_from_html
+            self._word_counts = count_words_from_html(self.soup)
+        return self._word_counts
+
+    @timed('extract')
+    def get_canonical_title(self):
+        """
+        Zwraca kanoniczny tytuł artykułu z <link rel="canonical"> albo None.
+        Różni się od frazy, gdy strona była przekierowaniem.
+        """
+        if not self.soup:
+            return None
+        link = self.soup.find('link', rel='canonical', href=True)
+        if not link:
+            return None
+        # Kanoniczny link jest pełnym adresem URL tej samej wiki
+        return title_from_href(urllib.parse.urlsplit(link['href']).path)
+
+    @timed('extract')
+    def get_links(self, exclude_tags=None):
+        """
+        Zwraca linki do innych artykułów z treści strony.
+        """
+        from auto_count import extract_wiki_links
+        return extract_wiki_links(self.soup, exclude_tags)
+
+    @timed('extract')
+    def get_table(self, table_number, first_row_is_header=True, expand_spans=True, typed=False):
         """
         Pobiera tabelę ze strony i zwraca DataFrame.
+
+        Args:
+            table_number: Numer tabeli na stronie (od 1)
+            first_row_is_header: Czy pierwszy wiersz to nagłówek
+            expand_spans: Czy rozwijać rowspan/colspan (False = dawny, płaski odczyt wierszy)
+            typed: Czy konwertować kolumny liczbowe na typy liczbowe
         """
-        tables = self.soup.find_all('table')
-        target_table = tables[table_number - 1]
-        
-        rows = []
-        for tr in target_table.find_all('tr'):
-            cells = tr.find_all(['th', 'td'])
-            row_data = [cell.get_text(separator=" ", strip=True) for cell in cells]
-            if row_data:
-                rows.append(row_data)
-
-        # Normalizuj liczbę kolumn
-        max_columns = max(len(row) for row in rows)
-        normalized_rows = [row + [""] * (max_columns - len(row)) for row in rows]
-        
-        if first_row_is_header:
-            df = pd.DataFrame(normalized_rows[1:], columns=normalized_rows[0])
+        target_table = self.get_tables()[table_number - 1]
+        if expand_spans:
+            rows = expand_rows(self._get_table_rows().get(id(target_table), []))
         else:
-            df = pd.DataFrame(normalized_rows)
-        
-        return df
+            rows = flat_rows(target_table)
+        return rows_to_dataframe(rows, first_row_is_header, typed)
 
-def save_dataframe_to_csv(df, phrase):
+    def get_table_frames(self, table_numbers=None, first_row_is_header=True, expand_spans=True, typed=False):
+        """
+        Zwraca listę par (numer, DataFrame) dla podanych numerów tabel
+        (None = wszystkie tabele strony). Wiersze wszystkich tabel są zbierane
+        jednym przejściem po dokumencie.
+        """
+        if table_numbers is None:
+            table_numbers = range(1, len(self.get_tables()) + 1)
+        return [(number, self.get_table(number, first_row_is_header, expand_spans, typed))
+                for number in table_numbers]
+
+    def _get_table_rows(self):
+        """Wiersze <tr> pogrupowane według tabel (liczone raz dla strony)."""
+        if self._table_rows is None:
+            self._table_rows = group_rows_by_table(self.soup) if self.soup else {}
+        return self._table_rows
+
+def write_dataframe_csv(df, phrase):
     """
-    Zapisuje DataFrame do pliku CSV.
+    Zapisuje DataFrame do pliku CSV nazwanego od frazy i zwraca nazwę pliku.
     """
     safe_filename = string_to_windows_safe(phrase)
     filename = f"{safe_filename}.csv"
-    df.to_csv(filename, index=False, encoding='utf-8-sig')
+    with span('persist'):
+        df.to_csv(filename, index=False, encoding='utf-8-sig')
+    return filename
+
+def write_dataframe_parquet(df, phrase):
+    """
+    Zapisuje DataFrame do pliku Parquet nazwanego od frazy i zwraca nazwę pliku.
+    Wymaga pyarrow albo fastparquet. Nazwy kolumn są zamieniane na unikalne napisy,
+    bo Parquet nie dopuszcza liczbowych ani powtarzających się nazw.
+    """
+    safe_filename = string_to_windows_safe(phrase)
+    filename = f"{safe_filename}.parquet"
+    df = df.copy(deep=False)
+    df.columns = unique_column_names(df.columns)
+    with span('persist'):
+        df.to_parquet(filename, index=False)
+    return filename
+
+def unique_column_names(columns):
+    """Zamienia nazwy kolumn na napisy, dodając '.1', '.2'... do powtórzeń (jak pandas.read_csv)."""
+    seen = {}
+    names = []
+    for column in columns:
+        name = str(column)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+def save_dataframe_to_csv(df, phrase):
+    """
+    Zapisuje DataFrame do pliku CSV.
+    """
+    filename = write_dataframe_csv(df, phrase)
     print(f"Table saved to {filename}")
 
-def analyze_frequency(df, phrase):
+def analyze_frequency(df, phrase, limit=None):
     """
     Wyświetla analizę częstości wartości w DataFrame.
+    Przy podanym `limit` wypisuje tylko tyle najczęstszych wartości
+    (bez sortowania wszystkich unikalnych wartości).
     """
     print("\nValue Frequency Analysis:")
-    freq = df.stack().value_counts()
+    values = df.stack()
+    if limit is None:
+        freq = values.value_counts()
+    else:
+        freq = top_n_counts(values, limit)
     print(freq.to_string())
 
 def get_word_count_from_json(filepath):
@@ -1,7 +1,11 @@
 import sys
+import itertools
 import argparse
-from utils import Scraper, save_dataframe_to_csv, analyze_frequency
-from count import count_words_for_phrase
+from parsers import PARSER_BACKENDS, DEFAULT_PARSER
+from tables import parse_table_numbers
+
+# Heavy modules (pandas, requests, bs4, matplotlib, wordfreq) are imported
+# inside the branch that needs them, so short calls start fast.
 
 BULBAPEDIA_URL = "https://bulbapedia.bulbagarden.net/wiki/"
 
@@ -14,52 +18,349 @@ class WikiController:
         self.args = args
 
     def run(self):
+        profiler = None
+        if self.args.profile or self.args.profile_json or self.args.profile_trace:
+            from profiling import enable_profiling
+            profiler = enable_profiling(trace_path=self.args.profile_trace)
+        try:
+            self.run_selected()
+        finally:
+            if profiler is not None:
+                self.report_profile(profiler)
+
+    def report_profile(self, profiler):
+        profiler.close()
+        print(profiler.report(), file=sys.stderr)
+        if self.args.profile_json:
+            profiler.write_json(self.args.profile_json)
+
+    def run_selected(self):
+        if self.args.index_add:
+            self.run_index_add()
+            return
+        if self.args.merge_shards:
+            self.run_merge_shards()
+            return
         if self.args.analyze_relative_word_frequency:
+            self.run_relative_frequency()
+            return
+        if self.args.detect_language:
+            self.run_detect_language()
+            return
+
+        fetcher = self.configure_network()
+        try:
+            self.run_command()
+        finally:
+            if self.args.fetch_stats:
+                print(fetcher.stats.report(), file=sys.stderr)
+
+    def configure_network(self):
+        """Sets up the shared fetcher, parser backend and page cache for commands that load pages."""
+        from fetcher import configure_default_fetcher
+        from page_cache import configure_default_cache
+        from parsers import set_default_parser
+
+        fetcher = configure_default_fetcher(
+            timeout=self.args.timeout,
+            max_retries=self.args.retries,
+            pool_size=max(self.args.concurrency or 1, 10)
+        )
+        try:
+            set_default_parser(self.args.parser)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if self.args.offline and not self.args.cache_dir:
+            print("Error: --cache-dir is required when using --offline")
+            sys.exit(1)
+        if self.args.cache_dir:
+            configure_default_cache(
+                self.args.cache_dir,
+                ttl=self.args.cache_ttl,
+                max_bytes=int(self.args.cache_max_mb * 1024 * 1024),
+                offline=self.args.offline
+            )
+        return fetcher
+
+    def run_relative_frequency(self):
+        reports = self.args.report or []
+        if self.args.mode or self.args.count:
             if not self.args.mode or not self.args.count:
                 print("Error: --mode and --count are required when using --analyze-relative-word-frequency")
                 sys.exit(1)
-            from word_frequency import analyze_relative_frequency
-            analyze_relative_frequency(self.args.mode, self.args.count, self.args.chart)
+            reports.insert(0, (self.args.mode, self.args.count, self.args.chart))
+        if not reports:
+            print("Error: --mode and --count (or --report) are required when using --analyze-relative-word-frequency")
+            sys.exit(1)
+        from word_frequency import run_reports
+        run_reports(reports, counts=self.load_counts())
+
+    def load_counts(self):
+        """Word counts from --index/--crawl, or None for word-counts.json."""
+        if not self.args.index:
+            return None
+        from word_index import WordIndex
+        try:
+            return WordIndex(self.args.index).crawl(self.args.crawl)
+        except KeyError as e:
+            print(f"Error: {e.args[0]}")
+            sys.exit(1)
+
+    def run_detect_language(self):
+        from language_score import LanguageDetector
+        counts = self.load_counts()
+        if counts is None:
+            from word_frequency import get_word_counts
+            counts = get_word_counts()
+        if not counts:
+            print("Error: no word counts found. Run --count-words first or pass --index.")
+            sys.exit(1)
+
+        languages = self.args.languages.split(",") if self.args.languages else None
+        try:
+            detector = LanguageDetector(languages, self.args.top_k, cache_dir=self.args.language_cache_dir)
+        except LookupError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"{'language':<10} {'score':>8}")
+        for lang, score in detector.detect(counts, self.args.count or 5):
+            print(f"{lang:<10} {score:>8.2f}")
+
+    def run_index_add(self):
+        if not self.args.index:
+            print("Error: --index is required when using --index-add")
+            sys.exit(1)
+        from word_index import WordIndex
+        index = WordIndex(self.args.index)
+        for path in self.args.index_add:
+            name = index.add_json(path)
+            print(f"Added crawl '{name}' ({index.totals[index.crawl_position(name)]} words)")
+        print(f"Index {self.args.index}: {len(index.crawls)} crawls, {len(index)} distinct words")
+
+    def run_merge_shards(self):
+        from shards import merge_shards
+        try:
+            words, total = merge_shards(self.args.merge_shards, self.args.merged_output)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot merge shards: {e}")
+            sys.exit(1)
+        print(f"Merged {len(self.args.merge_shards)} shards into {self.args.merged_output}: "
+              f"{words} distinct words, {total} in total")
+
+    def run_command(self):
+        if self.args.serve:
+            from service import run_service
+            try:
+                run_service(BULBAPEDIA_URL, self.args.host, self.args.port, self.args.socket,
+                            self.args.serve_cache_pages, self.args.serve_cache_ttl)
+            except (OSError, ValueError) as e:
+                print(f"Error: cannot start service: {e}")
+                sys.exit(1)
             return
 
         if self.args.auto_count_words:
             from auto_count import auto_count_bfs
-            auto_count_bfs(BULBAPEDIA_URL, self.args.auto_count_words, self.args.depth, self.args.wait)
+            from checkpoint import CheckpointError, DEFAULT_CHECKPOINT_FILE
+            from page_ledger import LedgerError
+            scorer = None
+            if self.args.scheduler == 'best-first':
+                from frontier import LinkScorer
+                scorer = LinkScorer(self.args.score_inlinks, self.args.score_position,
+                                    prefer=self.args.prefer_titles, exclude=self.args.exclude_titles)
+            # Checkpoints are opt-in; --resume alone uses the default checkpoint file
+            checkpoint_path = self.args.checkpoint or (DEFAULT_CHECKPOINT_FILE if self.args.resume else None)
+            try:
+                auto_count_bfs(BULBAPEDIA_URL, self.args.auto_count_words, self.args.depth, self.args.wait,
+                               self.args.concurrency or 1, count_store=self.args.count_store,
+                               flush_interval=self.args.flush_interval, checkpoint_path=checkpoint_path,
+                               resume=self.args.resume, workers=self.args.workers,
+                               redirect_map_path=self.args.redirect_map, max_pages=self.args.max_pages,
+                               visited=self.args.visited, bloom_capacity=self.args.bloom_capacity,
+                               bloom_error_rate=self.args.bloom_error_rate,
+                               frontier_memory=self.args.frontier_memory, frontier_dir=self.args.frontier_dir,
+                               scorer=scorer, time_budget=self.args.time_budget, shard=self.args.shard,
+                               shard_output=self.args.shard_output,
+                               ledger_path=self.args.ledger if self.args.incremental else None)
+            except CheckpointError as e:
+                print(f"Error: cannot resume crawl: {e}")
+                sys.exit(1)
+            except LedgerError as e:
+                print(f"Error: cannot recount incrementally: {e}")
+                sys.exit(1)
             return
 
         if self.args.count_words:
+            from count import count_words_for_phrase
             count_words_for_phrase(BULBAPEDIA_URL, self.args.count_words)
             return
-        
+
+        if self.args.batch_summary or self.args.batch_table:
+            self.run_batch()
+            return
+
+        from utils import Scraper
         scraper = Scraper(BULBAPEDIA_URL, self.args.summary or self.args.table)
         
         if self.args.summary:
             print(scraper.get_summary())
             
         if self.args.table:
-            if not self.args.number:
-                print("Error: --number argument is required when using --table.")
-                sys.exit(1)
-            
-            df = scraper.get_table(self.args.number, self.args.first_row_is_header)
-            if df is not None:
-                save_dataframe_to_csv(df, self.args.table)
-                analyze_frequency(df, self.args.table)
+            self.run_tables(scraper)
+
+    def run_tables(self, scraper):
+        from utils import save_dataframe_to_csv, write_dataframe_parquet, analyze_frequency
+        from tables import parquet_available
+        if not self.args.number and not self.args.all_tables:
+            print("Error: --number or --all-tables argument is required when using --table.")
+            sys.exit(1)
+        if self.args.format == "parquet" and not parquet_available():
+            print("Error: --format parquet requires pyarrow (pip install pyarrow)")
+            sys.exit(1)
+        if not scraper.soup:
+            print("Error: Could not load page.")
+            sys.exit(1)
+
+        table_count = len(scraper.get_tables())
+        numbers = None if self.args.all_tables else self.args.number
+        missing = [n for n in numbers or [] if n > table_count]
+        if missing:
+            print(f"Error: Table {missing[0]} not found (page has {table_count} tables).")
+            sys.exit(1)
+
+        frames = scraper.get_table_frames(numbers, self.args.first_row_is_header, typed=self.args.typed_columns)
+        single = len(frames) == 1 and not self.args.all_tables
+        for number, df in frames:
+            # A single table keeps the old file name; several get the table number appended
+            name = self.args.table if single else f"{self.args.table} {number}"
+            if not single:
+                print(f"\n=== Table {number} ===")
+            if self.args.format == "parquet":
+                print(f"Table saved to {write_dataframe_parquet(df, name)}")
+            else:
+                save_dataframe_to_csv(df, name)
+            analyze_frequency(df, name, self.args.count)
+
+    def run_batch(self):
+        from batch import read_phrases, batch_summaries, batch_tables, DEFAULT_BATCH_CONCURRENCY
+        if self.args.batch_table and not self.args.number:
+            print("Error: --number argument is required when using --batch-table.", file=sys.stderr)
+            sys.exit(1)
+        if self.args.batch_table and len(self.args.number) > 1:
+            print("Error: --batch-table takes a single --number.", file=sys.stderr)
+            sys.exit(1)
+
+        # zip advances the counter once per phrase read, so next(read) is the number of phrases
+        read = itertools.count()
+        phrases = (phrase for phrase, _ in zip(read_phrases(self.args.batch_summary or self.args.batch_table), read))
+        concurrency = self.args.concurrency or DEFAULT_BATCH_CONCURRENCY
+        out = open(self.args.output, 'w', encoding='utf-8') if self.args.output else sys.stdout
+        try:
+            if self.args.batch_summary:
+                errors = batch_summaries(BULBAPEDIA_URL, phrases, out, concurrency)
+            else:
+                errors = batch_tables(BULBAPEDIA_URL, phrases, self.args.number[0], self.args.first_row_is_header,
+                                      out, concurrency)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if errors:
+            print(f"{errors} of {next(read)} phrases failed", file=sys.stderr)
+            sys.exit(1)
+
+def table_numbers(text):
+    """argparse type for --number: '5' or '1,3,5'."""
+    try:
+        return parse_table_numbers(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def report_spec(text):
+    """argparse type for --report: 'MODE:N' or 'MODE:N:CHART'."""
+    parts = text.split(':', 2)
+    if len(parts) < 2 or parts[0] not in ("article", "language") or not parts[1].isdigit() or int(parts[1]) < 1:
+        raise argparse.ArgumentTypeError(f"invalid report '{text}', expected article|language:N[:CHART]")
+    return parts[0], int(parts[1]), parts[2] if len(parts) > 2 else None
+
+def shard_spec(text):
+    """argparse type for --shard: 'K/N'."""
+    from shards import parse_shard_spec
+    try:
+        return parse_shard_spec(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 def main():
     parser = argparse.ArgumentParser(description="Wiki Scraper Tool")
     parser.add_argument("--summary", help="Fetch a short summary for the given phrase")
     parser.add_argument("--table", help="Fetch a table for the given phrase")
-    parser.add_argument("--number", type=int, help="The number of the table to extract (1-based)")
+    parser.add_argument("--number", type=table_numbers, help="The number of the table to extract (1-based), or several like 1,3,5")
+    parser.add_argument("--all-tables", action="store_true", help="Extract every table on the page (with --table)")
+    parser.add_argument("--typed-columns", action="store_true", help="Convert numeric table columns to numbers")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Output format for --table (parquet needs pyarrow)")
     parser.add_argument("--first-row-is-header", action="store_true", help="Treat the first row as the header")
+    parser.add_argument("--batch-summary", help="Fetch summaries for phrases from this file ('-' for stdin), as JSON Lines")
+    parser.add_argument("--batch-table", help="Fetch table --number for phrases from this file ('-' for stdin), one CSV each")
+    parser.add_argument("--output", help="File for batch JSON Lines output (default stdout)")
     parser.add_argument("--count-words", help="Count words in the article and save to word-counts.json")
     parser.add_argument("--auto-count-words", help="BFS crawl starting from this phrase and count words")
     parser.add_argument("--depth", type=int, default=1, help="Maximum depth for BFS crawl")
     parser.add_argument("--wait", type=float, default=0.1, help="Wait time between requests in seconds")
+    parser.add_argument("--concurrency", type=int, help="Number of pages fetched in parallel (BFS crawl default 1, batch default 8)")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes for parsing and counting during BFS crawl (0 = parse in fetch threads); the crawl fetches with at least this many threads")
+    parser.add_argument("--redirect-map", help="JSON file with known redirects, reused and updated by BFS crawls")
+    parser.add_argument("--count-store", choices=["json", "sqlite"], default="json", help="Backend for word counts during BFS crawl")
+    parser.add_argument("--flush-interval", type=float, default=5.0, help="Seconds between word count flushes during BFS crawl")
+    parser.add_argument("--max-pages", type=int, help="Stop the BFS crawl after fetching this many pages")
+    parser.add_argument("--time-budget", type=float, help="Stop the BFS crawl from fetching new pages after this many seconds")
+    parser.add_argument("--scheduler", choices=["bfs", "best-first"], default="bfs", help="Crawl order: breadth-first, or best-scored links first")
+    parser.add_argument("--score-inlinks", type=float, default=1.0, help="Best-first weight of the number of links to a page seen so far")
+    parser.add_argument("--score-position", type=float, default=1.0, help="Best-first weight of how early the link appears on the page")
+    parser.add_argument("--prefer-titles", help="Best-first: regex of titles to crawl sooner")
+    parser.add_argument("--exclude-titles", help="Best-first: regex of titles never to crawl")
+    parser.add_argument("--visited", choices=["hashed", "bloom"], default="hashed", help="Visited set for BFS crawl: 64-bit title hashes (8 bytes per title in memory and in the checkpoint's .visited log), or a fixed-size Bloom filter that may skip a few pages")
+    parser.add_argument("--bloom-capacity", type=int, default=1_000_000, help="Titles the --visited bloom filter is sized for")
+    parser.add_argument("--bloom-error-rate", type=float, default=0.001, help="False-positive rate of the --visited bloom filter")
+    parser.add_argument("--frontier-memory", type=int, default=100_000, help="Queued titles kept in memory before the BFS queue spills to disk")
+    parser.add_argument("--frontier-dir", help="Directory for the spilled BFS queue (default: system temp directory)")
+    parser.add_argument("--shard", type=shard_spec, metavar="K/N", help="Count only shard K (0..N-1) of a BFS crawl split across N nodes by title hash")
+    parser.add_argument("--shard-output", help="Sorted shard file written by a --shard crawl (default word-counts.shard-K-of-N.tsv, .gz to compress)")
+    parser.add_argument("--merge-shards", nargs="+", metavar="SHARD", help="Merge shard files from --shard crawls into --merged-output")
+    parser.add_argument("--merged-output", default="word-counts.json", help="Word count JSON written by --merge-shards")
+    parser.add_argument("--incremental", action="store_true", help="Recount only pages that changed since the last --incremental BFS crawl, keeping per-page counts in --ledger")
+    parser.add_argument("--ledger", default="word-counts.pages.sqlite", help="Per-page content hashes and counts used by --incremental")
+    parser.add_argument("--checkpoint", nargs="?", const="crawl-checkpoint.json", help="Save BFS crawl checkpoints to this file (default crawl-checkpoint.json) so it can be resumed")
+    parser.add_argument("--resume", action="store_true", help="Resume an interrupted BFS crawl from --checkpoint (default crawl-checkpoint.json)")
+    parser.add_argument("--serve", action="store_true", help="Run as a local HTTP service answering /summary, /table, /count-words and /stats")
+    parser.add_argument("--host", default="127.0.0.1", help="Address the --serve service listens on")
+    parser.add_argument("--port", type=int, default=8765, help="Port the --serve service listens on")
+    parser.add_argument("--socket", help="Unix socket path for --serve instead of a TCP port")
+    parser.add_argument("--serve-cache-pages", type=int, default=256, help="Parsed pages kept in memory by --serve")
+    parser.add_argument("--serve-cache-ttl", type=float, default=300.0, help="Seconds a parsed page is kept by --serve")
+    parser.add_argument("--timeout", type=float, default=10.0, help="HTTP timeout in seconds")
+    parser.add_argument("--retries", type=int, default=3, help="Number of retries for failed HTTP requests")
+    parser.add_argument("--fetch-stats", action="store_true", help="Print HTTP transfer statistics at the end")
+    parser.add_argument("--profile", action="store_true", help="Print per-stage timings (p50/p95/p99), pages/s and bytes at the end")
+    parser.add_argument("--profile-json", help="Write the --profile summary to this JSON file")
+    parser.add_argument("--profile-trace", help="Stream a Chrome trace (chrome://tracing, Perfetto) of all spans to this file")
+    parser.add_argument("--cache-dir", help="Directory of the persistent page cache")
+    parser.add_argument("--cache-ttl", type=float, default=24 * 60 * 60, help="Seconds before a cached page is revalidated")
+    parser.add_argument("--cache-max-mb", type=float, default=500, help="Maximum size of the page cache in megabytes")
+    parser.add_argument("--offline", action="store_true", help="Serve pages only from the page cache")
+    parser.add_argument("--parser", choices=list(PARSER_BACKENDS), default=DEFAULT_PARSER, help="HTML parser backend")
     parser.add_argument("--analyze-relative-word-frequency", action="store_true", help="Analyze relative word frequency compared to language")
     parser.add_argument("--mode", choices=["article", "language"], help="Sorting mode for frequency analysis")
-    parser.add_argument("--count", type=int, help="Number of rows/bars to display")
+    parser.add_argument("--count", type=int, help="Number of rows/bars to display (with --table: most frequent values to print)")
     parser.add_argument("--chart", help="Path to save the frequency chart")
+    parser.add_argument("--report", type=report_spec, action="append", metavar="MODE:N[:CHART]", help="Extra relative frequency report from the same loaded counts, e.g. language:50:lang.png (repeatable)")
+    parser.add_argument("--index", help="Directory of the word frequency index (used instead of word-counts.json)")
+    parser.add_argument("--index-add", nargs="+", metavar="COUNTS_JSON", help="Add word count JSON files to --index as crawls named after the files")
+    parser.add_argument("--detect-language", action="store_true", help="Rank languages by top-k word coverage of word-counts.json (or --index)")
+    parser.add_argument("--languages", help="Comma-separated wordfreq language codes for --detect-language (default: all)")
+    parser.add_argument("--top-k", type=int, default=1000, help="Most frequent words per language used by --detect-language")
+    parser.add_argument("--language-cache-dir", help="Directory where --detect-language keeps its language word matrix between runs")
+    parser.add_argument("--crawl", help="Crawl in --index to analyze (default: the most recently added)")
 
     if len(sys.argv) == 1:
         parser.print_help()
@@ -1,9 +1,39 @@
 import unittest
 import os
+import re
+import io
+import math
 import json
+import shutil
+import tempfile
+import contextlib
+import threading
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from utils import Scraper, string_to_windows_safe
-from count import count_words_for_phrase, WORD_COUNTS_FILE
+from count import count_words_for_phrase, count_tokens, iter_article_strings, WORD_COUNTS_FILE
+from auto_count import auto_count_bfs, Crawler
+from checkpoint import CrawlCheckpoint, reconcile_state
+from fetcher import Fetcher, FetchError, parse_retry_after
+from page_cache import PageCache
+from count_store import open_count_store, load_json_counts, CountStore
+from parsers import available_parsers
+from titles import canonical_title, title_from_href, RedirectMap
+from batch import batch_summaries, batch_tables, read_phrases
+from top_n import top_n_items
+from word_index import WordIndex
+from profiling import Profiler, enable_profiling, disable_profiling, percentile
+from language_score import lang_confidence_score, LanguageDetector
+from word_frequency import (get_language_frequency, get_wiki_language_frequency, run_reports, analyze_relative_frequency,
+                            FrequencyReport)
+from benchmarks.stand_in_server import run_stand_in_server
+from benchmarks.synthetic_wiki import SyntheticWiki
+from service import make_service
+from shards import parse_shard_spec, write_shard, read_shard, merge_shards
+from frontier import SpillingFrontier, BestFirstFrontier, LinkScorer, HashedTitleSet, make_title_set
+from page_ledger import PageLedger, LedgerError
 
 TEST_DIR = "test"
 BULBAPEDIA_URL = "https://bulbapedia.bulbagarden.net/wiki/"
@@ -101,6 +131,672 @@ class TestWikiScraper(unittest.TestCase):
             if os.path.exists(output_file):
                 os.remove(output_file)
 
+    def test_concurrent_crawl_matches_sequential(self):
+        """Test that --concurrency does not change BFS crawl word counts"""
+        results = []
+        try:
+            with run_stand_in_server(TEST_DIR) as base_url:
+                for concurrency in (1, 8):
+                    if os.path.exists(WORD_COUNTS_FILE):
+                        os.remove(WORD_COUNTS_FILE)
+                    auto_count_bfs(base_url, "Tao trio", 1, 0.0, concurrency)
+                    with open(WORD_COUNTS_FILE, 'r', encoding='utf-8') as f:
+                        results.append(json.load(f))
+        finally:
+            if os.path.exists(WORD_COUNTS_FILE):
+                os.remove(WORD_COUNTS_FILE)
+
+        self.assertTrue(results[0])
+        self.assertEqual(results[0], results[1], "Concurrent crawl differs from sequential!")
+
+    def test_multiprocess_crawl_matches_single_process(self):
+        """Test that parsing in worker processes gives the same crawl counts"""
+        with tempfile.TemporaryDirectory() as tmp_dir, run_stand_in_server(TEST_DIR) as base_url:
+            results = []
+            for workers, concurrency in ((0, 4), (2, 1)):
+                json_path = os.path.join(tmp_dir, f"workers-{workers}.json")
+                crawler = Crawler(base_url, 1, 0.0, concurrency, store=open_count_store(json_path), workers=workers)
+                # Enough fetch threads to keep every worker process busy
+                self.assertEqual(crawler.concurrency, 4 if workers == 0 else 2)
+                crawler.crawl("Tao trio")
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    results.append(json.load(f))
+
+        self.assertTrue(results[0])
+        self.assertEqual(results[0], results[1])
+
+    def test_fetcher_stats_and_errors(self):
+        """Test pooled Fetcher counters and that 404 is reported without retries"""
+        fetcher = Fetcher(max_retries=2, backoff_factor=0.0)
+        with run_stand_in_server(TEST_DIR) as base_url:
+            html = fetcher.get_text(f"{base_url}Tao_trio")
+            with self.assertRaises(FetchError) as ctx:
+                fetcher.fetch(f"{base_url}adgadadagdasg")
+
+        self.assertIn("Tao trio", html)
+        self.assertEqual(ctx.exception.status_code, 404)
+        stats = fetcher.stats.as_dict()
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['retries'], 0)
+        self.assertEqual(stats['failures'], 1)
+        self.assertEqual(stats['bytes_decoded'], len(html.encode('utf-8')))
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_page_cache_revalidation_and_offline(self):
+        """Test that cached pages are revalidated with 304 and served offline"""
+        fetcher = Fetcher(max_retries=0)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PageCache(cache_dir, ttl=0)
+            with run_stand_in_server(TEST_DIR) as base_url:
+                first = Scraper(base_url, "Tao trio", fetcher=fetcher, cache=cache)
+                second = Scraper(base_url, "Tao_trio", fetcher=fetcher, cache=cache)
+
+            offline_cache = PageCache(cache_dir, offline=True)
+            offline = Scraper("http://127.0.0.1:9/wiki/", "Tao trio", cache=offline_cache)
+            missing = Scraper("http://127.0.0.1:9/wiki/", "Lugia", cache=offline_cache)
+
+        stats = fetcher.stats.as_dict()
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['bytes_decoded'], os.path.getsize(os.path.join(TEST_DIR, "Tao trio.html")))
+        self.assertEqual(first.get_summary(), second.get_summary())
+        self.assertEqual(offline.get_summary(), first.get_summary())
+        self.assertEqual(missing.get_summary(), "Error: Could not load page.")
+
+    def test_count_stores_export_same_json(self):
+        """Test that json and sqlite count stores accumulate to the same word-counts.json"""
+        pages = [Counter({"the": 3, "type": 1}), Counter({"type": 2, "fire": 5}), Counter({"the": 1})]
+        exported = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for backend in ("json", "sqlite"):
+                json_path = os.path.join(tmp_dir, f"{backend}.json")
+                with open(json_path, 'w', encoding='utf-8') as f:
+                    json.dump({"the": 10}, f)
+                with open_count_store(json_path, backend, flush_interval=0.0) as store:
+                    for page in pages:
+                        store.merge(page)
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    exported.append(json.load(f))
+
+        self.assertEqual(exported[0], {"the": 14, "type": 3, "fire": 5})
+        self.assertEqual(exported[0], exported[1])
+
+        # word-counts.json changed outside an existing sqlite store: the store picks the change up
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "counts.json")
+            with open_count_store(json_path, 'sqlite') as store:
+                store.merge(Counter({"a": 2}))
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({"a": 2, "b": 5}, f)
+            with open_count_store(json_path, 'sqlite') as store:
+                store.merge(Counter({"c": 1}))
+            self.assertEqual(load_json_counts(json_path), Counter({"a": 2, "b": 5, "c": 1}))
+        # A backend without counts()/_write() fails when created, not during a crawl
+        with self.assertRaises(TypeError):
+            CountStore("word-counts.json")
+
+    def test_crawl_resume_does_not_double_count(self):
+        """Test that an interrupted crawl resumed from a checkpoint gives the full-crawl counts"""
+        class InterruptedCrawler(Crawler):
+            calls = 0
+            def process_page(self, phrase, depth):
+                InterruptedCrawler.calls += 1
+                if InterruptedCrawler.calls == 20:
+                    raise RuntimeError("interrupted")
+                return super().process_page(phrase, depth)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, run_stand_in_server(TEST_DIR) as base_url:
+            full_path = os.path.join(tmp_dir, "full.json")
+            Crawler(base_url, 1, 0.0, 4, store=open_count_store(full_path)).crawl("Tao trio")
+
+            resumed_path = os.path.join(tmp_dir, "resumed.json")
+            checkpoint_path = os.path.join(tmp_dir, "checkpoint.json")
+            crawler = InterruptedCrawler(base_url, 1, 0.0, 4, store=open_count_store(resumed_path),
+                                         checkpoint=CrawlCheckpoint(checkpoint_path, interval=0.0))
+            with self.assertRaises(RuntimeError):
+                crawler.crawl("Tao trio")
+            self.assertTrue(os.path.exists(checkpoint_path))
+            self.assertTrue(os.path.getsize(checkpoint_path + ".pages") > 0)
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                log_size = json.load(f)['visited']['log_size']
+            self.assertTrue(log_size > 0 and log_size % 8 == 0)
+            self.assertGreaterEqual(os.path.getsize(checkpoint_path + ".visited"), log_size)
+
+            Crawler(base_url, 1, 0.0, 4, store=open_count_store(resumed_path),
+                    checkpoint=CrawlCheckpoint(checkpoint_path)).crawl("Tao trio", resume=True)
+            self.assertFalse(os.path.exists(checkpoint_path))
+            self.assertFalse(os.path.exists(checkpoint_path + ".pages"))
+            self.assertFalse(os.path.exists(checkpoint_path + ".visited"))
+
+            with open(full_path, 'r', encoding='utf-8') as f:
+                full = json.load(f)
+            with open(resumed_path, 'r', encoding='utf-8') as f:
+                resumed = json.load(f)
+        self.assertEqual(full, resumed)
+
+        # Flush after the checkpoint never happened: unflushed pages go back to the queue
+        state = {'queue': [["B", 1]], 'unflushed': [["A", 1]], 'pages_size': 40, 'previous_pages_size': 25,
+                 'previous_total': 10, 'total': 15}
+        state = reconcile_state(state, 10)
+        self.assertEqual(state['queue'], [["A", 1], ["B", 1]])
+        self.assertEqual(state['pages_size'], 25)
+
+    def test_single_parse_page_reuse(self):
+        """Test that counting words leaves the parsed page intact for table extraction"""
+        html_file = os.path.join(TEST_DIR, "Tao trio.html")
+        scraper = Scraper(BULBAPEDIA_URL, "Tao trio", use_local_html_file=True, html_file_path=html_file)
+        tables_before = len(scraper.get_tables())
+        table_before = scraper.get_table(5, first_row_is_header=True)
+
+        self.assertTrue(scraper.count_words())
+        self.assertEqual(len(scraper.soup.find_all('table')), tables_before)
+        self.assertTrue(scraper.get_table(5, first_row_is_header=True).equals(table_before))
+
+    @unittest.skipUnless('lxml' in available_parsers(), "lxml is not installed")
+    def test_lxml_parser_matches_html_parser(self):
+        """Test that the lxml backend gives the same summary, table and word counts"""
+        html_file = os.path.join(TEST_DIR, "Lugia.html")
+        pages = [Scraper(BULBAPEDIA_URL, "Lugia", use_local_html_file=True, html_file_path=html_file, parser=parser)
+                 for parser in ('html.parser', 'lxml')]
+
+        self.assertEqual(pages[0].get_summary(), pages[1].get_summary())
+        self.assertEqual(pages[0].count_words(), pages[1].count_words())
+        self.assertEqual(pages[0].get_links(), pages[1].get_links())
+        self.assertTrue(pages[0].get_table(3, False).equals(pages[1].get_table(3, False)))
+
+    def test_streaming_tokenizer_matches_whole_text(self):
+        """Test that chunked tokenization gives the same counts as tokenizing the whole text"""
+        html_file = os.path.join(TEST_DIR, "Lugia.html")
+        scraper = Scraper(BULBAPEDIA_URL, "Lugia", use_local_html_file=True, html_file_path=html_file)
+        content = scraper.soup.find('div', id='mw-content-text')
+        strings = list(iter_article_strings(content)) + ["ΟΔΟΣ x" * 500, "İstanbul" * 300]
+
+        expected = Counter(re.findall(r'\b\w+\b', ' '.join(strings).lower()))
+        for chunk_size in (7, 100, 8 * 1024):
+            self.assertEqual(count_tokens(strings, chunk_size=chunk_size), expected)
+
+    def test_canonical_titles(self):
+        """Test MediaWiki-style title normalization"""
+        self.assertEqual(canonical_title("pikachu_%28anime%29#Moves"), "Pikachu (anime)")
+        self.assertEqual(canonical_title("  Team__Rocket "), "Team Rocket")
+        self.assertEqual(title_from_href("/wiki/Lugia_(Pok%C3%A9mon)#Biology"), "Lugia (Pokémon)")
+        self.assertIsNone(title_from_href("/wiki/Category:Pok%C3%A9mon"))
+        self.assertIsNone(title_from_href("https://example.com/page"))
+        self.assertIsNone(title_from_href("https://en.wikipedia.org/wiki/Taoism"))
+        self.assertIsNone(title_from_href("//en.wikipedia.org/wiki/Noah%27s_Ark"))
+
+    def test_crawl_counts_redirected_article_once(self):
+        """Test that links reaching one article through redirects and spellings fetch it once"""
+        start_html = (
+            '<html><body><div id="mw-content-text"><p>Start page</p>'
+            '<a href="/wiki/Lugia">a</a> <a href="/wiki/lugia">b</a>'
+            '<a href="/wiki/Lugia_(Pok%C3%A9mon)">c</a> <a href="/wiki/Lugia#Biology">d</a>'
+            '</div></body></html>'
+        )
+        with tempfile.TemporaryDirectory() as pages_dir:
+            with open(os.path.join(pages_dir, "Start.html"), 'w', encoding='utf-8') as f:
+                f.write(start_html)
+            # "Lugia" serves the same article as "Lugia (Pokémon)", like a MediaWiki redirect
+            for title in ("Lugia", "Lugia (Pokémon)"):
+                shutil.copy(os.path.join(TEST_DIR, "Lugia.html"), os.path.join(pages_dir, f"{title}.html"))
+
+            json_path = os.path.join(pages_dir, "counts.json")
+            redirects = RedirectMap(os.path.join(pages_dir, "redirects.json"))
+            with run_stand_in_server(pages_dir) as base_url:
+                Crawler(base_url, 1, 0.0, 4, store=open_count_store(json_path), redirects=redirects).crawl("start")
+            with open(json_path, 'r', encoding='utf-8') as f:
+                counts = json.load(f)
+            with open(os.path.join(pages_dir, "redirects.json"), 'r', encoding='utf-8') as f:
+                saved_redirects = json.load(f)
+
+        lugia = Scraper(BULBAPEDIA_URL, "Lugia", use_local_html_file=True,
+                        html_file_path=os.path.join(TEST_DIR, "Lugia.html")).count_words()
+        start = Scraper(BULBAPEDIA_URL, "Start", html_content=start_html).count_words()
+        expected = start + lugia
+        self.assertEqual(counts, dict(expected))
+        self.assertEqual(saved_redirects, {"Lugia": "Lugia (Pokémon)"})
+
+    def test_batch_mode_streams_records_with_errors(self):
+        """Test batch summaries/tables: JSON Lines in input order, per-item errors"""
+        summaries = io.StringIO()
+        tables = io.StringIO()
+        output_files = ["Tao trio.csv", "Lugia.csv"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            phrases_path = os.path.join(tmp_dir, "phrases.txt")
+            with open(phrases_path, 'w', encoding='utf-8') as f:
+                f.write("Lugia\n\n  adgadadagdasg \nTao trio\n")
+            phrases = read_phrases(phrases_path)
+            self.assertIs(iter(phrases), phrases)
+            phrases = list(phrases)
+        try:
+            with run_stand_in_server(TEST_DIR) as base_url:
+                summary_errors = batch_summaries(base_url, phrases, summaries, 4)
+                table_errors = batch_tables(base_url, ["Tao trio", "Lugia"], 5, True, tables, 2)
+            self.assertTrue(all(os.path.exists(f) for f in output_files))
+        finally:
+            for output_file in output_files:
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+
+        records = [json.loads(line) for line in summaries.getvalue().splitlines()]
+        self.assertEqual([r['phrase'] for r in records], ["Lugia", "adgadadagdasg", "Tao trio"])
+        self.assertTrue(records[0]['summary'].startswith("Lugia (Japanese:"))
+        self.assertIn('error', records[1])
+        self.assertEqual(summary_errors, 1)
+
+        records = [json.loads(line) for line in tables.getvalue().splitlines()]
+        self.assertEqual([r['file'] for r in records], output_files)
+        self.assertEqual(table_errors, 0)
+
+    def test_bulk_language_frequencies_match_wordfreq(self):
+        """Test dictionary language frequency lookup against per-word wordfreq calls"""
+        with open(os.path.join(TEST_DIR, "PE08-depth-1.json"), 'r', encoding='utf-8') as f:
+            words = list(json.load(f))
+        words += ["pokémon", "x1", "2005", "qqqzzz", "don't", "foo_bar"]
+
+        fast = [get_language_frequency(w, 'en') for w in words]
+        self.assertEqual(fast, [get_wiki_language_frequency(w, 'en') for w in words])
+
+    def test_top_n_keeps_ties_in_input_order(self):
+        """Test top-N selection and report rows: ties in input order, unknown words as NaN"""
+        counts = Counter({"b": 2, "a": 3, "c": 2, "d": 1, "e": 3})
+        self.assertEqual(top_n_items(counts, 3), [("a", 3), ("e", 3), ("b", 2)])
+
+        # Report rows: top words of the article in count order, both columns scaled to their maximum
+        report = FrequencyReport(Counter({"pokemon": 2, "the": 6, "qqqzzz": 2}))
+        rows = report.rows('article', 3)
+        self.assertEqual([row[0] for row in rows], ["the", "pokemon", "qqqzzz"])
+        self.assertEqual([round(row[1], 6) for row in rows], [1.0, 0.333333, 0.333333])
+        self.assertEqual(rows[0][2], 1.0)
+        self.assertTrue(math.isnan(rows[2][2]))
+
+    def test_table_span_expansion_and_typed_columns(self):
+        """Test rowspan/colspan expansion, nested tables and typed columns"""
+        html = """<html><body><table>
+            <tr><th colspan="2">Type</th><th>Power</th></tr>
+            <tr><td rowspan="2">Fire</td><td>Ember</td><td>40</td></tr>
+            <tr><td>Flamethrower</td><td>90</td></tr>
+            <tr><td>Water</td><td>Surf <table><tr><td>nested</td></tr></table></td><td></td></tr>
+        </table></body></html>"""
+        scraper = Scraper(BULBAPEDIA_URL, "Moves", html_content=html)
+
+        df = scraper.get_table(1, first_row_is_header=True, typed=True)
+        self.assertEqual(list(df.columns), ["Type", "Type", "Power"])
+        self.assertEqual(df.iloc[:, 0].tolist(), ["Fire", "Fire", "Water"])
+        self.assertEqual(df.iloc[:, 1].tolist(), ["Ember", "Flamethrower", "Surf nested"])
+        self.assertEqual(str(df["Power"].dtype), "Int64")
+        self.assertEqual(df["Power"].tolist()[:2], [40, 90])
+        self.assertTrue(pd.isna(df["Power"].iloc[2]))
+
+        frames = scraper.get_table_frames(first_row_is_header=False)
+        self.assertEqual([number for number, _ in frames], [1, 2])
+        self.assertEqual(frames[1][1].values.tolist(), [["nested"]])
+
+        # An empty <tr> inside a rowspan still uses up one of its rows
+        html = """<html><body><table>
+            <tr><td rowspan="3">Fire</td><td>Ember</td></tr>
+            <tr></tr>
+            <tr><td>Flamethrower</td></tr>
+            <tr><td>Water</td><td>Surf</td></tr>
+        </table></body></html>"""
+        rows = Scraper(BULBAPEDIA_URL, "Moves", html_content=html).get_table(1, first_row_is_header=False)
+        self.assertEqual(rows.values.tolist(), [["Fire", "Ember"], ["Fire", "Flamethrower"], ["Water", "Surf"]])
+
+    def test_word_index_add_crawl_and_queries(self):
+        """Test the persistent word index: incremental crawls, lookups and top-N"""
+        with tempfile.TemporaryDirectory() as directory:
+            index = WordIndex(directory)
+            index.add_crawl("first", Counter({"pikachu": 3, "lugia": 5, "ash": 3}))
+            index.add_crawl("second", Counter({"zekrom": 2, "lugia": 1}))
+            index.add_crawl("first", Counter({"pikachu": 4, "ash": 4, "brock": 1}))
+
+            # One segment per crawl; replacing "first" leaves the segment of "second" alone
+            segments = sorted(name for name in os.listdir(directory) if name.startswith("crawl-"))
+            self.assertEqual(segments, ["crawl-1.counts.npy", "crawl-1.ids.npy", "crawl-2.counts.npy", "crawl-2.ids.npy"])
+
+            reopened = WordIndex(directory)
+            self.assertEqual(reopened.crawls, ["first", "second"])
+            self.assertEqual(reopened.words(), ["ash", "brock", "lugia", "pikachu", "zekrom"])
+            self.assertEqual(reopened.count("lugia", "second"), 1)
+            self.assertEqual(reopened.count("lugia", "first"), 0)
+            self.assertIsNone(reopened.word_id("missingno"))
+
+            first = reopened.crawl("first")
+            self.assertEqual(first.total(), 9)
+            self.assertEqual(first.most_common(2), [("ash", 4), ("pikachu", 4)])
+            self.assertNotIn("lugia", first)
+            self.assertEqual(dict(reopened.crawl().items()), {"lugia": 1, "zekrom": 2})
+
+    def test_language_detector_matches_per_language_scores(self):
+        """Test vectorized language detection against lang_confidence_score and its disk cache"""
+        from wordfreq import top_n_list
+        languages = ['en', 'pl', 'de', 'fr']
+        expected_languages = {'article-de': 'de', 'article-fr': 'fr', 'article-pl': 'pl',
+                              'long-article-wiki': 'en', 'short-article-en': 'en'}
+        with tempfile.TemporaryDirectory() as cache_dir:
+            detector = LanguageDetector(languages, 100, cache_dir=cache_dir)
+            cached = LanguageDetector(languages, 100, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        for name, lang in expected_languages.items():
+            with open(os.path.join("analysis", f"{name}.json"), 'r', encoding='utf-8') as f:
+                counts = json.load(f)
+            scores = detector.scores(counts)
+            for candidate in languages:
+                top_words = dict.fromkeys(top_n_list(candidate, 100))
+                self.assertEqual(scores[candidate], lang_confidence_score(counts, top_words))
+            self.assertEqual(cached.scores(counts), scores)
+            self.assertEqual(detector.detect(counts, 1)[0][0], lang)
+
+    def test_profiling_spans_and_trace_export(self):
+        """Test per-stage spans, percentiles and the Chrome trace export"""
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.99), 4)
+
+        with tempfile.TemporaryDirectory() as directory:
+            trace_path = os.path.join(directory, "trace.json")
+            profiler = enable_profiling(trace_path=trace_path)
+            try:
+                scraper = Scraper(BULBAPEDIA_URL, "Tao trio", use_local_html_file=True,
+                                  html_file_path=os.path.join(TEST_DIR, "Tao trio.html"))
+                scraper.count_words()
+                scraper.get_table(5)
+            finally:
+                disable_profiling()
+            with open(trace_path, 'r', encoding='utf-8') as f:
+                events = json.load(f)['traceEvents']
+
+        summary = profiler.as_dict()
+        self.assertEqual(summary['pages'], 1)
+        self.assertEqual(list(summary['stages']), ['parse', 'extract', 'count'])
+        self.assertEqual(summary['stages']['extract']['count'], 2)
+        self.assertEqual(sorted(e['name'] for e in events), ['count', 'extract', 'extract', 'parse'])
+
+        bounded = Profiler(sample_size=100)
+        for i in range(10_000):
+            bounded.record('fetch', 0.0, i / 1000)
+        stage = bounded.as_dict()['stages']['fetch']
+        self.assertEqual(stage['count'], 10_000)
+        self.assertAlmostEqual(stage['total_ms'], sum(range(10_000)))
+        self.assertEqual(len(bounded.samples('fetch')), 100)
+
+    def test_synthetic_wiki_crawl(self):
+        """Test the synthetic link graph: deterministic pages and a BFS crawl over its links"""
+        wiki = SyntheticWiki(pages=30, fanout=3, words_per_page=50)
+        self.assertEqual(wiki.page(wiki.title(5)), SyntheticWiki(pages=30, fanout=3, words_per_page=50).page(wiki.title(5)))
+        self.assertIsNone(wiki.page(wiki.title(30)))
+
+        with tempfile.TemporaryDirectory() as tmp_dir, run_stand_in_server(wiki) as base_url:
+            scraper = Scraper(base_url, wiki.start_title())
+            self.assertTrue(scraper.get_summary().startswith(wiki.start_title()))
+            self.assertEqual(scraper.get_links(['table']), [wiki.title(n) for n in wiki.links(0)])
+
+            json_path = os.path.join(tmp_dir, "counts.json")
+            Crawler(base_url, 1, 0.0, 4, store=open_count_store(json_path)).crawl(wiki.start_title())
+            with open(json_path, 'r', encoding='utf-8') as f:
+                counts = json.load(f)
+        expected = Counter()
+        for number in [0] + wiki.links(0):
+            html = wiki.page(wiki.title(number))[0].decode('utf-8')
+            expected += Scraper(base_url, wiki.title(number), html_content=html).count_words()
+        self.assertEqual(counts, dict(expected))
+
+    def test_bounded_frontier_and_page_limit(self):
+        """Test the spilling frontier keeps FIFO order, title sets, and a crawl capped by max_pages"""
+        with tempfile.TemporaryDirectory() as spill_dir:
+            frontier = SpillingFrontier(memory_limit=4, spill_dir=spill_dir)
+            items = [(f"Page {i}", i % 3) for i in range(23)]
+            for item in items[:10]:
+                frontier.append(item)
+            popped = [frontier.popleft() for _ in range(3)]
+            for item in items[10:]:
+                frontier.append(item)
+            self.assertGreater(frontier.spilled_segments, 0)
+            self.assertEqual(list(frontier), items[3:])
+            while frontier:
+                popped.append(frontier.popleft())
+            self.assertEqual(popped, items)
+            frontier.close()
+            self.assertEqual(os.listdir(spill_dir), [])
+
+        for kind in ("hashed", "bloom"):
+            titles = make_title_set(kind, capacity=1000, saved=["Pikachu", "Lugia"])
+            titles.add("Tao trio")
+            restored = make_title_set(saved=titles.to_state())
+            self.assertTrue(all(t in restored for t in ("Pikachu", "Lugia", "Tao trio")))
+            self.assertNotIn("Mew", restored)
+
+        titles = make_title_set("hashed", saved=["Pikachu"])
+        logged = titles.to_bytes()
+        titles.track_new_keys()
+        titles.add("Lugia")
+        titles.add("Pikachu")
+        logged += titles.take_new_keys()
+        self.assertEqual(len(logged), 16)
+        self.assertEqual(len(titles.take_new_keys()), 0)
+        self.assertEqual(len(HashedTitleSet.from_bytes(logged)), 2)
+
+        wiki = SyntheticWiki(pages=40, fanout=4, words_per_page=30)
+        with tempfile.TemporaryDirectory() as tmp_dir, run_stand_in_server(wiki) as base_url:
+            results = []
+            for options in ({}, {'frontier_memory': 2, 'frontier_dir': tmp_dir}, {'max_pages': 5}):
+                json_path = os.path.join(tmp_dir, "counts.json")
+                if os.path.exists(json_path):
+                    os.remove(json_path)
+                Crawler(base_url, 2, 0.0, 3, store=open_count_store(json_path), **options).crawl(wiki.start_title())
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    results.append(json.load(f))
+        self.assertEqual(results[0], results[1])
+        pages = [wiki.start_title()] + [wiki.title(n) for n in wiki.links(0)]
+        self.assertEqual(results[2]["synthmon"], sum(
+            Scraper(base_url, title, html_content=wiki.page(title)[0].decode('utf-8')).count_words()["synthmon"]
+            for title in pages))
+
+    def test_best_first_crawl_order(self):
+        """Test the best-first frontier: in-links raise priority, excluded titles are skipped, budget stops the crawl"""
+        frontier = BestFirstFrontier(scorer=LinkScorer(exclude="^Nav"))
+        for number, title in enumerate(["A", "B", "Nav 1", "C"]):
+            frontier.push(title, 1, number / 4)
+        frontier.relink("C", 0.5)
+        self.assertEqual(len(frontier), 3)
+        self.assertEqual([frontier.popleft() for _ in range(3)], [("C", 1), ("A", 1), ("B", 1)])
+
+        def page(links):
+            paragraph = " ".join(f'<a href="/wiki/{link.replace(" ", "_")}">{link}</a>' for link in links)
+            return f'<html><body><div id="mw-content-text"><p>words {paragraph}</p></div></body></html>'
+
+        pages = {"Start": ["A", "B", "C", "Nav 1", "Nav 2"], "A": ["Hub"], "B": ["Hub"], "C": ["Hub"]}
+        with tempfile.TemporaryDirectory() as pages_dir:
+            for title, links in pages.items():
+                with open(os.path.join(pages_dir, f"{title}.html"), 'w', encoding='utf-8') as f:
+                    f.write(page(links))
+            orders = []
+            with run_stand_in_server(pages_dir) as base_url:
+                for scorer in (None, LinkScorer(exclude="^Nav")):
+                    output = io.StringIO()
+                    with contextlib.redirect_stdout(output):
+                        Crawler(base_url, 2, 0.0, 1, store=open_count_store(os.path.join(pages_dir, "counts.json")),
+                                scorer=scorer, max_pages=5).crawl("Start")
+                    orders.append([line.split(": ", 1)[1] for line in output.getvalue().splitlines()
+                                   if line.startswith("Przetwarzanie")])
+        self.assertEqual(orders[0], ["Start", "A", "B", "C", "Nav 1"])
+        self.assertEqual(orders[1], ["Start", "A", "Hub", "B", "C"])
+
+    def test_service_coalesces_and_caches_pages(self):
+        """Test service mode: concurrent requests share one fetch, endpoints answer from the parsed-page LRU"""
+        fetcher = Fetcher(max_retries=0)
+        with run_stand_in_server(TEST_DIR, latency=0.2) as base_url:
+            service = make_service(base_url, port=0, max_pages=1, fetcher=fetcher)
+            threading.Thread(target=service.serve_forever, daemon=True).start()
+            host, port = service.server_address
+            service_url = f"http://{host}:{port}"
+
+            def get(path):
+                try:
+                    with urllib.request.urlopen(service_url + path) as response:
+                        return response.status, response.read().decode('utf-8')
+                except urllib.error.HTTPError as e:
+                    return e.code, e.read().decode('utf-8')
+
+            try:
+                with ThreadPoolExecutor(max_workers=6) as executor:
+                    results = list(executor.map(get, ["/summary?phrase=Lugia"] * 6))
+                table_status, table_csv = get("/table?phrase=Lugia&number=1&format=csv")
+                counts = json.loads(get("/count-words?phrase=lugia&limit=3")[1])
+                missing_status, _ = get("/summary?phrase=adgadadagdasg")
+                get("/summary?phrase=Tao_trio")
+                stats = json.loads(get("/stats")[1])
+            finally:
+                service.shutdown()
+                service.server_close()
+
+        summaries = {json.loads(body)['summary'] for _, body in results}
+        self.assertEqual(len(summaries), 1)
+        self.assertTrue(summaries.pop().startswith("Lugia (Japanese:"))
+        self.assertEqual(table_status, 200)
+        self.assertTrue(table_csv)
+        lugia = Scraper(BULBAPEDIA_URL, "Lugia", use_local_html_file=True,
+                        html_file_path=os.path.join(TEST_DIR, "Lugia.html")).count_words()
+        self.assertEqual(counts['counts'], dict(lugia.most_common(3)))
+        self.assertEqual(missing_status, 404)
+        self.assertEqual(stats['cache']['misses'], 3)
+        self.assertEqual(stats['cache']['hits'] + stats['cache']['coalesced'], 7)
+        self.assertEqual(stats['cache']['evictions'], 1)
+        self.assertEqual(stats['fetch']['pages'], 2)
+
+        # --socket pointing at a regular file must not delete it
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "notes.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("keep me")
+            with self.assertRaises(ValueError):
+                make_service("http://127.0.0.1", socket_path=path)
+            self.assertTrue(os.path.exists(path))
+
+    def test_sharded_crawl_merges_to_single_crawl(self):
+        """Test sharded crawls: merged shards equal the counts of one unsharded crawl"""
+        self.assertEqual(parse_shard_spec("2/4"), (2, 4))
+        for spec in ("4/4", "1", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard_spec(spec)
+
+        wiki = SyntheticWiki(pages=60, fanout=4, words_per_page=40)
+        with tempfile.TemporaryDirectory() as tmp_dir, run_stand_in_server(wiki) as base_url:
+            def crawl(name, shard=None):
+                json_path = os.path.join(tmp_dir, f"{name}.json")
+                Crawler(base_url, 2, 0.0, 4, store=open_count_store(json_path), shard=shard).crawl(wiki.start_title())
+                return load_json_counts(json_path)
+
+            reference = crawl("all")
+            shard_paths = []
+            for index in range(3):
+                path = os.path.join(tmp_dir, f"shard-{index}.tsv" + (".gz" if index == 1 else ""))
+                write_shard(path, crawl(f"shard-{index}", (index, 3)), (index, 3))
+                shard_paths.append(path)
+            words = [word for word, _ in read_shard(shard_paths[0])]
+            self.assertEqual(words, sorted(words))
+
+            merged_path = os.path.join(tmp_dir, "merged.json")
+            distinct, total = merge_shards(shard_paths, merged_path)
+            with open(merged_path, 'r', encoding='utf-8') as f:
+                merged = json.load(f)
+
+            # Counts left in word-counts.json by earlier runs must not leak into the shard
+            cwd = os.getcwd()
+            os.chdir(tmp_dir)
+            try:
+                with open(WORD_COUNTS_FILE, 'w', encoding='utf-8') as f:
+                    json.dump({"leaked": 5}, f)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for _ in range(2):
+                        auto_count_bfs(base_url, wiki.start_title(), 2, 0.0, 4, shard=(0, 1),
+                                       shard_output="all.tsv.gz")
+                single_shard = dict(read_shard("all.tsv.gz"))
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(merged, dict(reference))
+        self.assertEqual(single_shard, dict(reference))
+        self.assertEqual((distinct, total), (len(reference), sum(reference.values())))
+
+    def test_incremental_recount_applies_only_changes(self):
+        """Test incremental recount: unchanged pages are not parsed, counts equal a fresh full crawl"""
+        class EditableWiki(SyntheticWiki):
+            def render(self, number):
+                return self.edits.get(number) or super().render(number)
+
+        class ParseCountingCrawler(Crawler):
+            parsed = 0
+            def parse(self, html, with_links):
+                ParseCountingCrawler.parsed += 1
+                return super().parse(html, with_links)
+
+        wiki = EditableWiki(pages=40, fanout=3, words_per_page=40)
+        wiki.edits = {}
+        with tempfile.TemporaryDirectory() as tmp_dir, run_stand_in_server(wiki) as base_url:
+            def crawl(name, ledger_path=None):
+                json_path = os.path.join(tmp_dir, f"{name}.json")
+                ParseCountingCrawler.parsed = 0
+                ledger = PageLedger(ledger_path) if ledger_path else None
+                ParseCountingCrawler(base_url, 2, 0.0, 4, store=open_count_store(json_path),
+                                     ledger=ledger).crawl(wiki.start_title())
+                return load_json_counts(json_path)
+
+            ledger_path = os.path.join(tmp_dir, "pages.sqlite")
+            first = crawl("incremental", ledger_path)
+            self.assertTrue(ParseCountingCrawler.parsed > 1)
+            self.assertEqual(crawl("incremental", ledger_path), first)
+            self.assertEqual(ParseCountingCrawler.parsed, 0)
+
+            edited = wiki.links(0)[0]
+            wiki.edits[edited] = wiki.render(edited).replace("is a synthetic", "is a recounted", 1)
+            recounted = crawl("incremental", ledger_path)
+            self.assertEqual(ParseCountingCrawler.parsed, 1)
+            self.assertEqual(recounted, crawl("fresh"))
+            self.assertEqual(recounted["synthetic"], first["synthetic"] - 1)
+
+            # Crash after the counts were flushed but before the ledger commit
+            class CrashingLedger(PageLedger):
+                def commit(self, store):
+                    raise RuntimeError("crashed")
+
+            wiki.edits[edited] = wiki.render(edited).replace("is a recounted", "is a crashed", 1)
+            json_path = os.path.join(tmp_dir, "incremental.json")
+            with self.assertRaises(RuntimeError):
+                Crawler(base_url, 2, 0.0, 4, store=open_count_store(json_path),
+                        ledger=CrashingLedger(ledger_path)).crawl(wiki.start_title())
+            ledger = PageLedger(ledger_path)
+            with self.assertRaises(LedgerError):
+                Crawler(base_url, 2, 0.0, 4, store=open_count_store(json_path), ledger=ledger).crawl(wiki.start_title())
+            ledger.close()
+
+    def test_several_reports_from_one_dataset(self):
+        """Test run_reports: same output as separate analyses, one most_common pass, chart written"""
+        class CountingCounter(Counter):
+            calls = 0
+
+            def most_common(self, n=None):
+                CountingCounter.calls += 1
+                return super().most_common(n)
+
+        with open(os.path.join(TEST_DIR, "PE08-depth-1.json"), 'r', encoding='utf-8') as f:
+            counts = CountingCounter(json.load(f))
+        reports = [("article", 10, None), ("language", 5, None), ("article", 3, None)]
+
+        separate = io.StringIO()
+        with contextlib.redirect_stdout(separate):
+            for mode, n, _ in reports:
+                analyze_relative_frequency(mode, n, counts=counts)
+        CountingCounter.calls = 0
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            chart_path = os.path.join(tmp_dir, "chart.png")
+            combined = io.StringIO()
+            with contextlib.redirect_stdout(combined):
+                run_reports(reports[:1] + [("language", 5, chart_path)] + reports[2:], counts=counts)
+            self.assertTrue(os.path.getsize(chart_path) > 0)
+
+        self.assertEqual(CountingCounter.calls, 1)
+        self.assertEqual(combined.getvalue().replace(f"Wykres zapisano do: {chart_path}\n", ""), separate.getvalue())
+
     def test_string_to_windows_safe(self):
         """Test Windows-safe filename conversion"""
         self.assertEqual(string_to_windows_safe("Pokémon: Red"), "Pokémon- Red")
@@ -1,13 +1,23 @@
+import re
 import json
 import os
+import math
 import argparse
-import pandas as pd
-import matplotlib.pyplot as plt
-from wordfreq import word_frequency, get_frequency_dict
+import functools
+from wordfreq import word_frequency, get_frequency_dict, get_language_info
 from collections import Counter
+from top_n import top_n_items
 
 WORD_COUNTS_FILE = "word-counts.json"
 
+# Słowa, dla których wordfreq.word_frequency sprowadza się do jednego odczytu
+# ze słownika: tokenizacja ich nie zmienia i nie zawierają cyfr.
+PLAIN_WORD_PATTERN = r'^[a-z]+$'
+_PLAIN_WORD = re.compile(PLAIN_WORD_PATTERN)
+
+REPORT_MODES = ('article', 'language')
+REPORT_COLUMNS = ['word', 'frequency in the article', 'frequency in wiki language']
+
 def get_word_counts():
     """Wczytuje licznik słów z pliku JSON."""
     if not os.path.exists(WORD_COUNTS_FILE):
@@ -15,84 +25,172 @@ def get_word_counts():
     with open(WORD_COUNTS_FILE, 'r', encoding='utf-8') as f:
         return Counter(json.load(f))
 
-def normalize_frequencies(df, col_name):
-    """Normalizuje kolumnę dzieląc przez wartość maksymalną (skala 0-1)."""
-    max_val = df[col_name].max()
-    if max_val > 0:
-        df[col_name] = df[col_name] / max_val
-    return df
-
 def get_wiki_language_frequency(word, lang='en'):
     """Zwraca częstotliwość słowa w danym języku (biblioteka wordfreq)."""
     return word_frequency(word, lang)
 
-def analyze_relative_frequency(mode, count_n, chart_path=None, lang='en'):
-    """Analizuje częstotliwość słów artykułu na tle całego języka."""
-    article_counts = get_word_counts()
-    
-    if not article_counts:
-        print("Nie znaleziono danych. Uruchom najpierw --count-words.")
-        return
+def _round_like_wordfreq(freq):
+    """Zaokrągla częstotliwość pojedynczego tokenu dokładnie tak jak word_frequency."""
+    freq = 1.0 / (1.0 / freq)
+    leading_zeroes = math.floor(-math.log(freq, 10))
+    return round(freq, leading_zeroes + 3)
+
+@functools.lru_cache(maxsize=None)
+def get_language_frequency_dict(lang='en'):
+    """
+    Ładuje raz słownik częstotliwości wordfreq dla języka (słowo -> częstotliwość)
+    z wartościami zaokrąglonymi tak jak w word_frequency. Wynik jest trzymany
+    w pamięci do końca procesu.
+    """
+    freqs = get_frequency_dict(lang)
+    rounded = {freq: _round_like_wordfreq(freq) for freq in set(freqs.values())}
+    return {word: rounded[freq] for word, freq in freqs.items()}
+
+@functools.lru_cache(maxsize=None)
+def _uses_regex_tokenizer(lang):
+    return get_language_info(lang)['tokenizer'] == 'regex'
+
+def get_language_frequency(word, lang='en'):
+    """
+    To samo co word_frequency(word, lang), ale zwykłe słowa z małych liter ASCII
+    są odczytywane wprost ze słownika z get_language_frequency_dict.
+    """
+    if _uses_regex_tokenizer(lang) and _PLAIN_WORD.match(word):
+        return get_language_frequency_dict(lang).get(word, 0.0)
+    return word_frequency(word, lang)
 
-    df_article = pd.DataFrame.from_dict(article_counts, orient='index', columns=['raw_count']).reset_index()
-    df_article.columns = ['word', 'raw_count']
-    
-    total_words_article = df_article['raw_count'].sum()
-    df_article['frequency in the article'] = df_article['raw_count'] / total_words_article
-    df_article['frequency in wiki language'] = df_article['word'].apply(get_wiki_language_frequency, lang=lang)
-    
-    # Obsługa słów, których nie ma w słowniku języka
-    mask_missing_words = df_article['frequency in wiki language'] == 0.0
-    df_article.loc[mask_missing_words, 'frequency in wiki language'] = float('nan')
-
-    if mode == 'article':
-        df_sorted = df_article.sort_values(by='frequency in the article', ascending=False)
-        df_final = df_sorted.head(count_n).copy()
-        
-    elif mode == 'language':
-        from wordfreq import top_n_list
-        # Pobieramy więcej słów na wypadek braków w dopasowaniu
-        top_lang_words = top_n_list(lang, count_n * 2) 
-        
-        df_lang = pd.DataFrame(top_lang_words, columns=['word'])
-        df_lang['frequency in wiki language'] = df_lang['word'].apply(get_wiki_language_frequency, lang=lang)
-        
-        df_merged = pd.merge(df_lang, df_article[['word', 'frequency in the article']], on='word', how='left')
-        df_sorted = df_merged.sort_values(by='frequency in wiki language', ascending=False)
-        df_final = df_sorted.head(count_n).copy()
-
-    else:
-        print(f"Nieznany tryb: {mode}")
-        return
+class FrequencyReport:
+    """
+    Dane raportów względnej częstotliwości wczytane raz: liczniki słów artykułu
+    (Counter albo widok z WordIndex - cokolwiek z get, total i most_common)
+    i częstotliwości słów w języku. Kolejne raporty (tryby, liczby wierszy,
+    wykresy) korzystają z tych samych danych i wyliczają tylko potrzebne
+    N wierszy, bez pośrednich DataFrame'ów.
+    """
+
+    def __init__(self, counts, lang='en'):
+        self.counts = counts
+        self.lang = lang
+        self.total = counts.total()
+        self._most_common = []
+        self._most_common_n = 0
+        self._language = {}
+
+    def most_common(self, n):
+        """counts.most_common(n), liczone raz dla największego dotąd N."""
+        if n > self._most_common_n:
+            self._most_common = self.counts.most_common(n)
+            self._most_common_n = n
+        return self._most_common[:n]
+
+    def language_frequency(self, word):
+        if word not in self._language:
+            self._language[word] = get_language_frequency(word, self.lang)
+        return self._language[word]
+
+    def rows(self, mode, n):
+        """
+        Wiersze (słowo, częstotliwość w artykule, częstotliwość w języku),
+        obie kolumny znormalizowane do maksimum; brak wartości to NaN.
+
+        'article' - N najczęstszych słów artykułu (słowa spoza słownika języka: NaN),
+        'language' - N najczęstszych słów języka (spośród top 2N z wordfreq).
+        """
+        nan = float('nan')
+        if mode == 'article':
+            rows = []
+            for word, count in self.most_common(n):
+                lang_freq = self.language_frequency(word)
+                rows.append((word, count / self.total, lang_freq if lang_freq != 0.0 else nan))
+        elif mode == 'language':
+            from wordfreq import top_n_list
+            # Pobieramy więcej słów na wypadek braków w dopasowaniu
+            candidates = [(word, self.language_frequency(word)) for word in top_n_list(self.lang, n * 2)]
+            rows = []
+            for word, lang_freq in top_n_items(candidates, n):
+                count = self.counts.get(word)
+                rows.append((word, count / self.total if count is not None else nan, lang_freq))
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+        return normalize_rows(rows)
+
+def normalize_rows(rows):
+    """Dzieli kolumny częstotliwości przez ich maksimum (skala 0-1, NaN pomijane)."""
+    columns = [[row[i] for row in rows] for i in (1, 2)]
+    for i, values in enumerate(columns):
+        present = [value for value in values if not math.isnan(value)]
+        max_val = max(present) if present else 0.0
+        if max_val > 0:
+            columns[i] = [value / max_val for value in values]
+    return [(row[0], article, language) for row, article, language in zip(rows, *columns)]
+
+def print_report(rows):
+    """Wypisuje wiersze raportu jako tabelę (jedyna ramka danych ma tylko N wierszy)."""
+    import pandas as pd
+    print("\n--- Analiza Częstotliwości Słów (Normalized) ---")
+    print(pd.DataFrame(rows, columns=REPORT_COLUMNS).to_string(index=False))
 
-    df_final = normalize_frequencies(df_final, 'frequency in the article')
-    df_final = normalize_frequencies(df_final, 'frequency in wiki language')
+def run_reports(reports, counts=None, lang='en'):
+    """
+    Wykonuje kilka raportów na jednym wczytanym zbiorze liczników.
 
-    print("\n--- Analiza Częstotliwości Słów (Normalized) ---")
-    cols_to_show = ['word', 'frequency in the article', 'frequency in wiki language']
-    print(df_final[cols_to_show].to_string(index=False))
+    Args:
+        reports: Lista krotek (tryb, liczba wierszy, ścieżka wykresu albo None)
+        counts: Liczniki słów artykułu (domyślnie word-counts.json)
+        lang: Język porównania (kod wordfreq)
+    """
+    article_counts = get_word_counts() if counts is None else counts
 
-    if chart_path:
-        df_chart = df_final.fillna(0.0)
-        generate_chart(df_chart, chart_path, count_n)
+    if not article_counts:
+        print("Nie znaleziono danych. Uruchom najpierw --count-words.")
+        return
 
-def generate_chart(df, chart_path, n):
-    """Generuje wykres słupkowy i zapisuje go do pliku."""
-    if df.empty:
+    data = FrequencyReport(article_counts, lang)
+    for mode, count_n, chart_path in reports:
+        if mode not in REPORT_MODES:
+            print(f"Nieznany tryb: {mode}")
+            continue
+        rows = data.rows(mode, count_n)
+        print_report(rows)
+        if chart_path:
+            chart_rows = [(word, 0.0 if math.isnan(article) else article, 0.0 if math.isnan(language) else language)
+                          for word, article, language in rows]
+            generate_chart(chart_rows, chart_path, count_n)
+
+def analyze_relative_frequency(mode, count_n, chart_path=None, lang='en', counts=None):
+    """
+    Analizuje częstotliwość słów artykułu na tle całego języka.
+
+    `counts` to liczniki słów artykułu: Counter albo widok z WordIndex
+    (cokolwiek z get, total i most_common); domyślnie word-counts.json.
+    Częstotliwości w języku liczone są tylko dla wyświetlanych słów.
+    """
+    run_reports([(mode, count_n, chart_path)], counts, lang)
+
+def generate_chart(rows, chart_path, n):
+    """Generuje wykres słupkowy z wierszy (słowo, artykuł, język) i zapisuje go do pliku."""
+    if not rows:
         print("Brak danych do wygenerowania wykresu.")
         return
 
-    chart_data = df.head(n).copy()
-    words_list = chart_data['word']
+    # matplotlib ładowany dopiero przy --chart; Figure z płótnem Agg nie wymaga
+    # ekranu ani globalnego stanu pyplot, więc kolejne wykresy są niezależne
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    chart_data = rows[:n]
+    words_list = [row[0] for row in chart_data]
     x_positions = range(len(words_list))
     bar_width = 0.35
 
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     pos_left = [i - bar_width/2 for i in x_positions]
     pos_right = [i + bar_width/2 for i in x_positions]
     
-    ax.bar(pos_left, chart_data['frequency in the article'], bar_width, label='Częstotliwość w artykule', color='blue')
-    ax.bar(pos_right, chart_data['frequency in wiki language'], bar_width, label='Częstotliwość w języku wiki', color='red')
+    ax.bar(pos_left, [row[1] for row in chart_data], bar_width, label='Częstotliwość w artykule', color='blue')
+    ax.bar(pos_right, [row[2] for row in chart_data], bar_width, label='Częstotliwość w języku wiki', color='red')
 
     ax.set_ylabel('Znormalizowana częstotliwość')
     ax.set_title(f'Częstotliwość top {n} słów: Wiki vs Język')
@@ -100,10 +198,9 @@ def generate_chart(df, chart_path, n):
     ax.set_xticklabels(words_list, rotation=45, ha='right')
     ax.legend()
 
-    plt.tight_layout()
-    plt.savefig(chart_path)
+    fig.tight_layout()
+    fig.savefig(chart_path)
     print(f"Wykres zapisano do: {chart_path}")
-    plt.close()
 
 if __name__ == "__main__":
     pass
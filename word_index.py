@@ -0,0 +1,306 @@
+import os
+import json
+import bisect
+import tempfile
+import numpy as np
+from count_store import atomic_write_json, load_json_counts
+
+INDEX_VERSION = 2
+META_FILE = "meta.json"
+VOCAB_FILE = "vocab.bin"
+OFFSETS_FILE = "offsets.bin"
+ORDER_FILE = "order.npy"
+SEGMENT_IDS = "crawl-{}.ids.npy"
+SEGMENT_COUNTS = "crawl-{}.counts.npy"
+
+# Pliki indeksu w wersji 1 (jedna gęsta macierz crawl x słowo), przenoszone przy otwarciu
+V1_OFFSETS_FILE = "offsets.npy"
+V1_COUNTS_FILE = "counts.npy"
+
+class WordIndex:
+    """
+    Trwały indeks liczników słów z wielu crawli.
+
+    Katalog indeksu zawiera:
+      - vocab.bin    - słowa (UTF-8) sklejone w jeden blok w kolejności dodania, tylko dopisywany,
+      - offsets.bin  - początki słów w vocab.bin (uint64, n + 1 pozycji), id słowa = jego pozycja,
+      - order.npy    - id słów posortowane bajtowo po słowie (do wyszukiwania binarnego),
+      - crawl-K.ids.npy / crawl-K.counts.npy - segment crawla: rosnące id słów i ich liczniki
+        (tylko niezerowe),
+      - meta.json    - nazwy crawli, ich segmenty, sumy słów i rozmiar słownika;
+        zapisywany na końcu, jak commit.
+
+    Dodanie crawla dopisuje nowe słowa na koniec słownika, wstawia je do order.npy
+    i zapisuje jeden nowy segment, więc jego koszt nie zależy od liczby crawli
+    już w indeksie. Pliki są otwierane przez mmap, więc otwarcie indeksu nie
+    wczytuje danych, a procesy czytające ten sam indeks współdzielą strony pamięci.
+    Indeks zapisuje jeden proces naraz.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.crawls = []
+        self.totals = []
+        self._segments = []
+        self._next_segment = 0
+        self._vocab = np.zeros(0, dtype=np.uint8)
+        self._offsets = np.zeros(1, dtype=np.uint64)
+        self._order = np.zeros(0, dtype=np.int64)
+        self._ranks = None
+        self._segment_cache = {}
+        if os.path.exists(self._path(META_FILE)):
+            self._open()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        with open(self._path(META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') == 1:
+            meta = self._migrate_v1(meta)
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported word index version {meta.get('version')} in {self.directory}")
+        self.crawls = meta['crawls']
+        self.totals = meta['totals']
+        self._segments = meta['segments']
+        self._next_segment = meta['next_segment']
+        self._ranks = None
+        self._segment_cache = {}
+        # Pliki dopisywane mogą mieć ogon po przerwanym zapisie - liczy się rozmiar z meta.json
+        self._offsets = np.memmap(self._path(OFFSETS_FILE), dtype=np.uint64, mode='r')[:meta['words'] + 1]
+        self._order = np.load(self._path(ORDER_FILE), mmap_mode='r')
+        self._vocab = np.zeros(0, dtype=np.uint8)
+        if int(self._offsets[-1]):
+            self._vocab = np.memmap(self._path(VOCAB_FILE), dtype=np.uint8, mode='r')[:int(self._offsets[-1])]
+
+    def _migrate_v1(self, meta):
+        """
+        Przenosi indeks z wersji 1: posortowany vocab.bin zostaje (id się nie zmieniają),
+        a wiersze gęstej macierzy liczników stają się segmentami crawli.
+        """
+        offsets = np.load(self._path(V1_OFFSETS_FILE))
+        counts = np.load(self._path(V1_COUNTS_FILE))
+        self._replace(OFFSETS_FILE, lambda f: f.write(offsets.astype(np.uint64).tobytes()))
+        self._replace(ORDER_FILE, lambda f: np.save(f, np.arange(len(offsets) - 1, dtype=np.int64)))
+        for segment, row in enumerate(counts):
+            ids = np.flatnonzero(row)
+            self._write_segment(segment, ids, row[ids])
+        meta = {'version': INDEX_VERSION, 'words': len(offsets) - 1, 'crawls': meta['crawls'],
+                'totals': meta['totals'], 'segments': list(range(len(counts))), 'next_segment': len(counts)}
+        atomic_write_json(self._path(META_FILE), meta)
+        del counts
+        for name in (V1_OFFSETS_FILE, V1_COUNTS_FILE):
+            os.remove(self._path(name))
+        return meta
+
+    def __len__(self):
+        """Liczba słów w słowniku (suma słowników wszystkich crawli)."""
+        return len(self._offsets) - 1
+
+    def _word_bytes(self, word_id):
+        start, end = int(self._offsets[word_id]), int(self._offsets[word_id + 1])
+        return self._vocab[start:end].tobytes()
+
+    def word(self, word_id):
+        """Zwraca słowo o podanym id."""
+        return self._word_bytes(word_id).decode('utf-8')
+
+    def _lower_bound(self, key):
+        """Pozycja w order.npy pierwszego słowa >= key (bajtowo)."""
+        low, high = 0, len(self._order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._word_bytes(int(self._order[middle])) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, key):
+        position = self._lower_bound(key)
+        if position < len(self._order) and self._word_bytes(int(self._order[position])) == key:
+            return int(self._order[position])
+        return None
+
+    def word_id(self, word):
+        """Zwraca id słowa (wyszukiwanie binarne po order.npy) albo None."""
+        return self._find(word.encode('utf-8'))
+
+    def words(self):
+        """Wszystkie słowa w kolejności alfabetycznej (bajtowej)."""
+        return [self.word(int(word_id)) for word_id in self._order]
+
+    def ranks(self):
+        """Pozycja każdego id słowa w kolejności alfabetycznej (liczona raz na otwarcie)."""
+        if self._ranks is None:
+            self._ranks = np.empty(len(self), dtype=np.int64)
+            self._ranks[self._order] = np.arange(len(self), dtype=np.int64)
+        return self._ranks
+
+    def crawl_position(self, name=None):
+        """Pozycja crawla na liście crawli; None oznacza ostatnio dodany crawl."""
+        if not self.crawls:
+            raise KeyError("The word index is empty")
+        if name is None:
+            return len(self.crawls) - 1
+        if name not in self.crawls:
+            raise KeyError(f"No crawl named '{name}' in the word index (known: {', '.join(self.crawls)})")
+        return self.crawls.index(name)
+
+    def segment(self, position):
+        """(id słów, liczniki) crawla na danej pozycji, zmapowane z dysku."""
+        segment = self._segments[position]
+        if segment not in self._segment_cache:
+            self._segment_cache[segment] = (np.load(self._path(SEGMENT_IDS.format(segment)), mmap_mode='r'),
+                                            np.load(self._path(SEGMENT_COUNTS.format(segment)), mmap_mode='r'))
+        return self._segment_cache[segment]
+
+    def crawl(self, name=None):
+        """Zwraca CrawlCounts - widok liczników jednego crawla zachowujący się jak Counter."""
+        return CrawlCounts(self, self.crawl_position(name))
+
+    def count(self, word, crawl=None):
+        """Liczba wystąpień słowa w crawlu (0, jeśli słowa nie ma)."""
+        return self.crawl(crawl)[word]
+
+    def add_crawl(self, name, counts):
+        """
+        Dodaje liczniki crawla (dict/Counter słowo -> liczba) do indeksu i zapisuje go.
+        Nowe słowa dostają kolejne id na końcu słownika; dotychczasowe segmenty
+        się nie zmieniają. Crawl o istniejącej nazwie jest zastępowany.
+        """
+        words = [(word.encode('utf-8'), count) for word, count in counts.items() if count]
+        ids = {key: self._find(key) for key, _ in words}
+        new_words = sorted(key for key, word_id in ids.items() if word_id is None)
+        # Miejsca wstawienia liczone względem starego order.npy, przed dopisaniem słów
+        insert_at = [self._lower_bound(key) for key in new_words]
+        for offset, key in enumerate(new_words):
+            ids[key] = len(self) + offset
+
+        lengths = np.fromiter((len(key) for key in new_words), dtype=np.uint64, count=len(new_words))
+        offsets = int(self._offsets[-1]) + np.cumsum(lengths, dtype=np.uint64)
+        order = np.insert(np.asarray(self._order), insert_at,
+                          np.arange(len(self), len(self) + len(new_words), dtype=np.int64))
+
+        segment_ids = np.fromiter((ids[key] for key, _ in words), dtype=np.int64, count=len(words))
+        segment_counts = np.fromiter((count for _, count in words), dtype=np.int64, count=len(words))
+        sort = np.argsort(segment_ids)
+
+        crawls, totals, segments = list(self.crawls), list(self.totals), list(self._segments)
+        segment = self._next_segment
+        replaced = None
+        if name in crawls:
+            position = crawls.index(name)
+            replaced = segments[position]
+            totals[position], segments[position] = int(segment_counts.sum()), segment
+        else:
+            crawls.append(name)
+            totals.append(int(segment_counts.sum()))
+            segments.append(segment)
+
+        os.makedirs(self.directory, exist_ok=True)
+        vocab_size, words_count = int(self._offsets[-1]), len(self)
+        # Zamknij mapowania przed zmianą plików
+        self._vocab, self._offsets, self._order, self._segment_cache = None, None, None, {}
+        self._append(VOCAB_FILE, vocab_size, b"".join(new_words))
+        self._append(OFFSETS_FILE, (words_count + 1) * 8, offsets.tobytes(),
+                     initial=np.zeros(1, dtype=np.uint64).tobytes())
+        self._replace(ORDER_FILE, lambda f: np.save(f, order))
+        self._write_segment(segment, segment_ids[sort], segment_counts[sort])
+        atomic_write_json(self._path(META_FILE), {
+            'version': INDEX_VERSION, 'words': words_count + len(new_words), 'crawls': crawls,
+            'totals': totals, 'segments': segments, 'next_segment': segment + 1,
+        })
+        if replaced is not None:
+            for pattern in (SEGMENT_IDS, SEGMENT_COUNTS):
+                os.remove(self._path(pattern.format(replaced)))
+        self._open()
+
+    def add_json(self, filepath, name=None):
+        """Dodaje plik word-counts.json jako crawl (domyślnie nazwany od pliku)."""
+        if name is None:
+            name = os.path.splitext(os.path.basename(filepath))[0]
+        self.add_crawl(name, load_json_counts(filepath))
+        return name
+
+    def _append(self, name, committed_size, data, initial=b""):
+        """Dopisuje dane za zatwierdzoną częścią pliku (ogon po przerwanym zapisie jest obcinany)."""
+        path = self._path(name)
+        with open(path, 'ab') as f:
+            if f.tell() == 0 and initial:
+                f.write(initial)
+            f.truncate(max(committed_size, len(initial)))
+            f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_segment(self, segment, ids, counts):
+        self._replace(SEGMENT_IDS.format(segment), lambda f: np.save(f, np.asarray(ids, dtype=np.int64)))
+        self._replace(SEGMENT_COUNTS.format(segment), lambda f: np.save(f, np.asarray(counts, dtype=np.int64)))
+
+    def _replace(self, name, write):
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, self._path(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+class CrawlCounts:
+    """
+    Widok liczników jednego crawla z WordIndex z interfejsem podzbioru Counter
+    (get, [], in, len, total, most_common, items), czytający segment crawla z mmap.
+    """
+
+    def __init__(self, index, position):
+        self.index = index
+        self.name = index.crawls[position]
+        self._ids, self._counts = index.segment(position)
+        self._total = index.totals[position]
+
+    def get(self, word, default=None):
+        word_id = self.index.word_id(word)
+        if word_id is None:
+            return default
+        position = int(np.searchsorted(self._ids, word_id))
+        if position == len(self._ids) or self._ids[position] != word_id:
+            return default
+        return int(self._counts[position])
+
+    def __getitem__(self, word):
+        return self.get(word, 0)
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __bool__(self):
+        return self._total > 0
+
+    def total(self):
+        return self._total
+
+    def most_common(self, n=None):
+        """
+        Lista `n` par (słowo, liczba) o największych licznikach, jak Counter.most_common.
+        Bez pełnego sortowania (argpartition); remisy w kolejności alfabetycznej.
+        """
+        selected = np.arange(len(self._counts))
+        if n is not None and n < len(selected):
+            threshold = np.partition(self._counts, len(self._counts) - n)[len(self._counts) - n]
+            selected = np.flatnonzero(self._counts >= threshold)
+        ids = self._ids[selected]
+        order = np.lexsort((self.index.ranks()[ids], -self._counts[selected]))[:n]
+        return [(self.index.word(int(ids[i])), int(self._counts[selected[i]])) for i in order]
+
+    def items(self):
+        """Pary (słowo, liczba) w kolejności alfabetycznej."""
+        order = np.argsort(self.index.ranks()[self._ids])
+        return ((self.index.word(int(self._ids[i])), int(self._counts[i])) for i in order)